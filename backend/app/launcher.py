@@ -0,0 +1,138 @@
+"""
+Production Launcher
+Runs the server under uvicorn with workers and limits sized for the container
+"""
+
+import importlib.util
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+import sendfile_http
+from observability import get_logger
+
+# Load environment variables from .env file
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0"))  # Worker processes (0 = one per available CPU)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "8"))  # Upper bound for the automatic worker count
+BACKLOG = int(os.getenv("BACKLOG", "2048"))  # Pending connections queued by the kernel per listening socket
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "75"))  # Seconds; longer than the ingress idle timeout (60s)
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", "512"))  # Connections per worker before 503s (0 = unlimited)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))  # Restart a worker after this many requests (0 = never)
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "45"))  # Seconds to drain in-flight requests
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")  # Proxies trusted for X-Forwarded-*
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"  # Per-request lines (latency is in /metrics)
+SESSION_LEASES_ENABLED = os.getenv("SESSION_LEASES_ENABLED", "false").lower() == "true"
+# Zero-copy file responses; they need the asyncio loop, so this trades uvloop's
+# cheaper upload handling for cheaper downloads (see the production overlay)
+SENDFILE = os.getenv("SENDFILE", "false").lower() == "true"
+
+APP_DIR = Path(__file__).parent
+
+log = get_logger("launcher")
+
+
+def available_cpus(cgroup_root: Path = Path("/sys/fs/cgroup")) -> float:
+    """
+    CPUs this process may use: the cgroup CPU quota (v2 cpu.max or v1
+    cfs_quota/cfs_period) when one is set, else the scheduler affinity.
+    """
+    cpus = float(len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+    quota: Optional[float] = None
+    try:
+        limit, period = (cgroup_root / "cpu.max").read_text().split()[:2]
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            limit = int((cgroup_root / "cpu" / "cpu.cfs_quota_us").read_text())
+            period = int((cgroup_root / "cpu" / "cpu.cfs_period_us").read_text())
+            if limit > 0 and period > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    return min(cpus, quota) if quota else cpus
+
+
+def worker_count(configured: int = WEB_CONCURRENCY, cpus: Optional[float] = None,
+                 leases_enabled: bool = SESSION_LEASES_ENABLED) -> int:
+    """
+    Explicit WEB_CONCURRENCY, else one worker per available CPU (rounded
+    up, capped at MAX_WORKERS). Workers keep their own session caches, so
+    the automatic count stays at 1 unless session leases coordinate them.
+    """
+    if configured > 0:
+        if configured > 1 and not leases_enabled:
+            log.warning("launcher_unsafe_workers", "Multiple workers without SESSION_LEASES_ENABLED",
+                        workers=configured)
+        return configured
+    if cpus is None:
+        cpus = available_cpus()
+    if not leases_enabled:
+        if cpus > 1:
+            log.info("launcher_single_worker", "Starting one worker: SESSION_LEASES_ENABLED is off, "
+                     "so workers cannot share sessions", cpus=cpus)
+        return 1
+    return max(1, min(MAX_WORKERS, math.ceil(cpus)))
+
+
+def sendfile_enabled(sendfile: bool = SENDFILE) -> bool:
+    """SENDFILE, unless the installed uvicorn is not one the zero-copy protocols were tested with"""
+    if sendfile and not sendfile_http.uvicorn_supported():
+        log.warning("sendfile_unsupported", "Untested uvicorn release, using the stock HTTP protocols",
+                    uvicorn=uvicorn.__version__)
+        return False
+    return sendfile
+
+
+def select_loop(sendfile: bool = SENDFILE) -> str:
+    # uvloop does not implement loop.sendfile(), which zero-copy responses need
+    if sendfile_enabled(sendfile):
+        return "asyncio"
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def select_http(sendfile: bool = SENDFILE) -> str:
+    """httptools when installed, else h11; with SENDFILE, their zero-copy variants (sendfile_http.py)"""
+    parser = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    if sendfile_enabled(sendfile):
+        return "sendfile_http:SendfileHttpToolsProtocol" if parser == "httptools" else "sendfile_http:SendfileH11Protocol"
+    return parser
+
+
+def server_options(workers: Optional[int] = None) -> dict:
+    """Keyword arguments for uvicorn.run()"""
+    return {
+        "host": HOST,
+        "port": PORT,
+        "app_dir": str(APP_DIR),
+        "workers": workers or worker_count(),
+        "loop": select_loop(),
+        "http": select_http(),
+        "backlog": BACKLOG,
+        "timeout_keep_alive": KEEP_ALIVE_TIMEOUT,
+        "limit_concurrency": LIMIT_CONCURRENCY or None,
+        "limit_max_requests": MAX_REQUESTS or None,
+        "timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_TIMEOUT,
+        "proxy_headers": True,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        "access_log": ACCESS_LOG,
+        "server_header": False,
+    }
+
+
+def main():
+    options = server_options()
+    log.info("launcher_start", "Starting server", **{k: v for k, v in options.items() if k != "app_dir"})
+    uvicorn.run("server:app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Observability package initialization
+Prometheus metrics and structured logging for the upload, assembly and serving paths
+"""
+
+from .log import get_logger
+
+from .metrics import (
+    Counter, Gauge, Histogram, MetricsMiddleware, MetricsRegistry, monitor_event_loop, registry, stats_collector
+)
+
+__all__ = [
+    'Counter', 'Gauge', 'Histogram', 'MetricsMiddleware', 'MetricsRegistry',
+    'monitor_event_loop', 'registry', 'stats_collector', 'get_logger',
+]
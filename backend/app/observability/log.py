@@ -0,0 +1,200 @@
+"""
+Structured Logging
+JSON log lines written by a background thread, with per-event sampling
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+# Fraction of hot-path events that are logged, by event name
+LOG_SAMPLING = json.loads(os.getenv(
+    "LOG_SAMPLING", '{"chunk_created": 0.01, "chunk_uploaded": 0.01, "chunk_saved": 0.01, "chunk_exists": 0.1}'
+))
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "50"))  # Max records per second per event (0 = unlimited)
+
+ROOT_LOGGER = "waveforge"
+
+# Standard LogRecord attributes, everything else set via `extra` is a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, msg and all extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{k}={v}" for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        line = f"{record.levelname:<7} [{record.name}] {record.getMessage()}"
+        if fields:
+            line += f" ({fields})"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class EventSampler:
+    """
+    Decides per event name whether a record is emitted.
+
+    Events listed in `rates` are kept with that probability; every event is
+    additionally capped at `rate_limit` records per second by a token
+    bucket. The number of records dropped by the cap is reported on the
+    next record of the same event as `suppressed`.
+    """
+
+    def __init__(self, rates: Dict[str, float], rate_limit: float):
+        self.rates = rates
+        self.rate_limit = rate_limit
+        self._buckets: Dict[str, list] = {}  # event -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def admit(self, event: str) -> Optional[dict]:
+        """Fields to add to the record if it should be logged, None to drop it"""
+        fields = {}
+        rate = self.rates.get(event, 1.0)
+        if rate < 1.0:
+            if random.random() >= rate:
+                return None
+            fields["sample_rate"] = rate
+        if self.rate_limit <= 0:
+            return fields
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(event)
+            if bucket is None:
+                bucket = self._buckets[event] = [self.rate_limit, now, 0]
+            bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return None
+            bucket[0] -= 1
+            if bucket[2]:
+                fields["suppressed"] = bucket[2]
+                bucket[2] = 0
+        return fields
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with the message merged and the traceback as text, fields intact"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+sampler = EventSampler(LOG_SAMPLING, LOG_RATE_LIMIT)
+
+
+class StructuredLogger:
+    """
+    Logger taking an event name, a message and keyword fields:
+
+        log.info("chunk_uploaded", "Uploaded chunk data", session_id=sid, chunk=3)
+
+    Level and sampling are checked before a record is built, so dropped
+    hot-path events cost a dict lookup.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def log(self, level: int, event: str, msg: str, exc_info=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        extra = sampler.admit(event)
+        if extra is None:
+            return
+        extra["event"] = event
+        extra.update(fields)
+        self.logger.log(level, msg, exc_info=exc_info, extra=extra)
+
+    def debug(self, event: str, msg: str, **fields):
+        self.log(logging.DEBUG, event, msg, **fields)
+
+    def info(self, event: str, msg: str, **fields):
+        self.log(logging.INFO, event, msg, **fields)
+
+    def warning(self, event: str, msg: str, **fields):
+        self.log(logging.WARNING, event, msg, **fields)
+
+    def error(self, event: str, msg: str, **fields):
+        self.log(logging.ERROR, event, msg, **fields)
+
+    def exception(self, event: str, msg: str, **fields):
+        self.log(logging.ERROR, event, msg, exc_info=True, **fields)
+
+
+def configure_logging(stream=None):
+    """
+    Route the `waveforge` logger tree through a queue to a background
+    thread writing to `stream` (stdout). Safe to call more than once.
+    """
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+        _listener.start()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.addHandler(_QueueHandler(log_queue))
+        root.setLevel(logging.getLevelNamesMapping().get(LOG_LEVEL, logging.INFO))
+        root.propagate = False
+        atexit.register(shutdown_logging)
+        _configured = True
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Structured logger `waveforge.<name>`; configures logging on first use"""
+    configure_logging()
+    return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
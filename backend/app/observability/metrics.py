@@ -0,0 +1,328 @@
+"""
+Prometheus Metrics
+Per-thread counters and histograms rendered in the text exposition format
+"""
+
+import asyncio
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .log import get_logger
+
+log = get_logger("metrics")
+
+# Upper bounds (seconds) of the default latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+# (name, type, help, [(labels dict, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class _ShardedMetric:
+    """
+    Metric whose values live in one dict per writing thread.
+
+    An observation only touches the calling thread's shard, so the hot path
+    takes no lock; the shard list lock is taken once per thread and on
+    collection, which sums all shards.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self) -> List[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: Labels = ()):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return sum(shard.get(labels, 0) for shard in self._snapshots())
+
+    def collect(self) -> List[Family]:
+        totals: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        samples = [(dict(zip(self.labelnames, labels)), value) for labels, value in totals.items()]
+        return [(self.name, self.kind, self.documentation, samples)]
+
+
+class Histogram(_ShardedMetric):
+    """Cumulative-bucket histogram; each shard cell is [per-bucket counts..., +Inf count, sum]"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0] * (len(self.buckets) + 2)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        return sum(sum(shard[labels][:-1]) for shard in self._snapshots() if labels in shard)
+
+    def collect(self) -> List[Family]:
+        totals: Dict[Labels, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, cell in shard.items():
+                cell = list(cell)
+                total = totals.setdefault(labels, [0] * len(cell))
+                for i, value in enumerate(cell):
+                    total[i] += value
+        samples = []
+        for labels, cell in totals.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), cell[:-1]):
+                cumulative += count
+                samples.append(({**base, "le": format_value(bound)}, cumulative, "_bucket"))
+            samples.append((base, cumulative, "_count"))
+            samples.append((base, cell[-1], "_sum"))
+        families = {}
+        for labels, value, suffix in samples:
+            families.setdefault(suffix, []).append((labels, value))
+        return [(self.name, self.kind, self.documentation, [])] + [
+            (self.name + suffix, "", "", values) for suffix, values in families.items()
+        ]
+
+
+class Gauge:
+    """Last value set per label set (set from one place, e.g. the event loop)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, labels: Labels = ()):
+        self._values[labels] = value
+
+    def collect(self) -> List[Family]:
+        samples = [(dict(zip(self.labelnames, labels)), value) for labels, value in self._values.copy().items()]
+        return [(self.name, self.kind, self.documentation, samples)]
+
+
+class MetricsRegistry:
+    """Metrics and collector callbacks rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def register(self, collector: Callable[[], Iterable[Family]]):
+        """Add a callback returning metric families, called on every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        families = [family for metric in self._metrics for family in metric.collect()]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                log.exception("metrics_collector_failed", "Metrics collector failed", error=str(e))
+        for name, kind, documentation, samples in families:
+            if kind:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def stats_collector(prefix: str, stats: Callable[[], dict], counters: Sequence[str] = ()):
+    """
+    Collector exposing the numeric fields of a stats() dict as
+    `<prefix>_<field>`; fields named in `counters` are typed as counters
+    and named `<prefix>_<field>_total` (unless the field already ends in
+    `_total`), per the Prometheus naming conventions.
+
+    A `<name>_buckets` field mapping bucket upper bounds ("0.1", ..., "+Inf")
+    to per-bucket counts becomes the histogram `<prefix>_<name>`, with its
+    `_sum` taken from the `<name>_total` field when there is one.
+    """
+    def collect() -> List[Family]:
+        families = []
+        fields = stats()
+        for key, value in fields.items():
+            if key.endswith("_buckets") and isinstance(value, dict):
+                base = key[:-len("_buckets")]
+                families.extend(bucket_families(f"{prefix}_{base}", f"{prefix} {base}", value,
+                                                fields.get(f"{base}_total", 0)))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"{prefix}_{key}"
+                kind = "gauge"
+                if key in counters:
+                    kind = "counter"
+                    if not name.endswith("_total"):
+                        name += "_total"
+                families.append((name, kind, f"{prefix} {key}", [({}, value)]))
+        return families
+    return collect
+
+
+def bucket_families(name: str, documentation: str, buckets: Dict[str, int], total: float) -> List[Family]:
+    """Histogram families from per-bucket counts keyed by upper bound"""
+    bounds = sorted((math.inf if bound == "+Inf" else float(bound), count) for bound, count in buckets.items())
+    samples = []
+    cumulative = 0
+    for bound, count in bounds:
+        cumulative += count
+        samples.append(({"le": format_value(bound)}, cumulative))
+    return [
+        (name, "histogram", documentation, []),
+        (name + "_bucket", "", "", samples),
+        (name + "_count", "", "", [({}, cumulative)]),
+        (name + "_sum", "", "", [({}, total)]),
+    ]
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "waveforge_http_request_duration_seconds", "Request latency by route template",
+    ("method", "route", "status")
+)
+ingested_bytes = registry.counter(
+    "waveforge_ingested_bytes_total", "Chunk bytes written by upload endpoint", ("endpoint",)
+)
+chunks_received = registry.counter(
+    "waveforge_chunks_received_total", "Chunks completed by upload endpoint", ("endpoint",)
+)
+assembly_seconds = registry.histogram(
+    "waveforge_assembly_duration_seconds", "Recording assembly duration by method", ("method",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+assembly_bytes = registry.counter(
+    "waveforge_assembly_bytes_total", "Recording bytes assembled by method", ("method",)
+)
+storage_call_seconds = registry.histogram(
+    "waveforge_storage_call_duration_seconds", "Blocking storage call run time on the I/O pool", ("call",)
+)
+storage_wait_seconds = registry.histogram(
+    "waveforge_storage_call_wait_seconds", "Time storage calls waited for an I/O pool thread"
+)
+event_loop_lag_seconds = registry.histogram(
+    "waveforge_event_loop_lag_seconds", "Delay of event loop timer callbacks beyond their deadline",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+event_loop_lag_last = registry.gauge(
+    "waveforge_event_loop_lag_last_seconds", "Most recent event loop lag sample"
+)
+
+
+def observe_storage_call(name: str, waited: float, elapsed: float):
+    """IOExecutor observer: called in the worker thread after each call"""
+    storage_call_seconds.observe(elapsed, (name,))
+    storage_wait_seconds.observe(waited)
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Measure how late a sleep wakes up; runs until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        event_loop_lag_seconds.observe(lag)
+        event_loop_lag_last.set(lag)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template
+    (not per raw path, which would explode label cardinality).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route: Optional[str] = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_seconds.observe(
+                time.perf_counter() - started, (scope["method"], route, str(status[0]))
+            )
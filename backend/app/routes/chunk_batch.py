@@ -0,0 +1,91 @@
+"""
+Chunk Batch Framing
+Length-prefixed (index, size, bytes) records carrying many chunks in one request
+"""
+
+import struct
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+# Each record: chunk index and body size as big-endian uint32, then the body
+FRAME_HEADER = struct.Struct("!II")
+MEDIA_TYPE = "application/vnd.waveforge.chunk-batch"
+
+
+class FramingError(ValueError):
+    """The request body is not a valid sequence of chunk records"""
+
+
+def encode_frames(chunks: Iterable[Tuple[int, bytes]]) -> bytes:
+    """Build a batch body from (index, data) pairs"""
+    return b"".join(FRAME_HEADER.pack(index, len(data)) + data for index, data in chunks)
+
+
+class FrameReader:
+    """
+    Reads chunk records from a streamed request body.
+
+        reader = FrameReader(request.stream())
+        while (frame := await reader.next_frame()) is not None:
+            index, size = frame
+            async for data in reader.body(size):
+                ...
+
+    Bodies are passed through as they arrive and never buffered whole;
+    only a partial header is carried between stream pieces. Every body must
+    be consumed (or skipped) before the next frame is read.
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes]):
+        self._stream = stream.__aiter__()
+        self._buffer = b""
+        self._eof = False
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FrameReader":
+        """Reader over a body that is already in memory (e.g. a WebSocket message)"""
+        async def stream():
+            yield data
+        return cls(stream())
+
+    async def _read(self) -> bytes:
+        """Next non-empty piece of the stream, b"" at the end"""
+        while not self._eof:
+            try:
+                data = await self._stream.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+                break
+            if data:
+                return data
+        return b""
+
+    async def next_frame(self) -> Optional[Tuple[int, int]]:
+        """(index, size) of the next record, None at the end of the body"""
+        while len(self._buffer) < FRAME_HEADER.size:
+            data = await self._read()
+            if not data:
+                if self._buffer:
+                    raise FramingError(f"Truncated record header ({len(self._buffer)} bytes)")
+                return None
+            self._buffer += data
+        index, size = FRAME_HEADER.unpack_from(self._buffer)
+        self._buffer = self._buffer[FRAME_HEADER.size:]
+        return index, size
+
+    async def body(self, size: int) -> AsyncIterator[bytes]:
+        """Yield exactly `size` bytes of the current record"""
+        remaining = size
+        while remaining > 0:
+            data = self._buffer or await self._read()
+            self._buffer = b""
+            if not data:
+                raise FramingError(f"Record body ended {remaining} bytes short")
+            if len(data) > remaining:
+                data, self._buffer = data[:remaining], data[remaining:]
+            remaining -= len(data)
+            yield data
+
+    async def skip(self, size: int):
+        """Discard the current record's body"""
+        async for _ in self.body(size):
+            pass
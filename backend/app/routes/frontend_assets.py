@@ -0,0 +1,175 @@
+"""
+Frontend Assets
+In-memory, precompressed and content-hashed frontend files
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .ranged_response import etag_matches
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+ASSET_BROTLI_QUALITY = int(os.getenv("ASSET_BROTLI_QUALITY", "11"))  # 0-11
+ASSET_GZIP_LEVEL = int(os.getenv("ASSET_GZIP_LEVEL", "9"))  # 1-9
+ASSET_COMPRESS_MIN_BYTES = int(os.getenv("ASSET_COMPRESS_MIN_BYTES", "1024"))  # Smaller files are sent as-is
+ASSET_RELOAD = os.getenv("ASSET_RELOAD", "false").lower() == "true"  # Rebuild when files change (development)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first; identity is always available
+ENCODINGS = ("br", "gzip")
+
+
+class Asset:
+    """One frontend file held in memory with its compressed variants"""
+
+    def __init__(self, url: str, path: Path, media_type: str, body: bytes, mtime: float):
+        self.url = url
+        self.path = path
+        self.media_type = media_type
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= ASSET_COMPRESS_MIN_BYTES:
+            compressed = {"gzip": gzip.compress(body, ASSET_GZIP_LEVEL, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=ASSET_BROTLI_QUALITY)
+            for encoding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[encoding] = data
+
+    @property
+    def versioned_url(self) -> str:
+        return f"{self.url}?v={self.digest}"
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+def negotiate(accept_encoding: Optional[str], available) -> str:
+    """Pick the preferred encoding the client accepts (q > 0), else identity"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+class AssetBundle:
+    """
+    Frontend files served from memory.
+
+    build() reads every file once, precompresses it (gzip, plus brotli when
+    installed) and rewrites references to the `hashed` files inside the
+    `entrypoints` (index.html) to content-hashed URLs
+    (`/tus.min.js?v=<hash>`). Requests carrying the current hash are
+    cacheable forever; plain URLs, including the entry points and sw.js,
+    revalidate with a cheap 304.
+    """
+
+    def __init__(self, files: Dict[str, Tuple[Path, str]], entrypoints: List[str], hashed: List[str]):
+        self.files = files
+        self.entrypoints = entrypoints
+        self.hashed = hashed
+        self._assets: Optional[Dict[str, Asset]] = None
+        self._lock = threading.Lock()
+
+    def build(self) -> Dict[str, Asset]:
+        """(Re)build all assets (blocking)"""
+        assets = {}
+        for url, (path, media_type) in self.files.items():
+            try:
+                body = path.read_bytes()
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if url not in self.entrypoints:
+                assets[url] = Asset(url, path, media_type, body, mtime)
+        for url in self.entrypoints:
+            path, media_type = self.files[url]
+            try:
+                text = path.read_text()
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            for hashed_url in self.hashed:
+                asset = assets.get(hashed_url)
+                if asset is not None:
+                    text = text.replace(f'"./{hashed_url.lstrip("/")}"', f'"{asset.versioned_url}"')
+            assets[url] = Asset(url, path, media_type, text.encode(), mtime)
+        with self._lock:
+            self._assets = assets
+        return assets
+
+    def get(self, url: str) -> Optional[Asset]:
+        """Built asset for `url`, building the bundle on first use"""
+        assets = self._assets
+        if assets is None or (ASSET_RELOAD and self._changed(assets)):
+            assets = self.build()
+        return assets.get(url)
+
+    def _changed(self, assets: Dict[str, Asset]) -> bool:
+        for url, (path, _) in self.files.items():
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                mtime = None
+            asset = assets.get(url)
+            if mtime != (asset.mtime if asset is not None else None):
+                return True
+        return False
+
+    def stats(self) -> dict:
+        assets = self._assets or {}
+        return {
+            "assets": len(assets),
+            "bytes": {
+                encoding: sum(len(a.variants.get(encoding, a.variants["identity"])) for a in assets.values())
+                for encoding in ("identity",) + ENCODINGS
+            }
+        }
+
+    def response(self, request: Request, url: str) -> Response:
+        """Serve an asset with encoding negotiation, ETag/304 and cache policy"""
+        asset = self.get(url)
+        if asset is None:
+            return Response(status_code=404)
+        encoding = negotiate(request.headers.get("accept-encoding"), asset.variants)
+        versioned = request.query_params.get("v") == asset.digest
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Last-Modified": formatdate(asset.mtime, usegmt=True),
+            "Cache-Control": IMMUTABLE if versioned else REVALIDATE,
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and any(
+            etag_matches(if_none_match, asset.etag(candidate)) for candidate in asset.variants
+        ):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=asset.variants[encoding], headers=headers, media_type=asset.media_type)
@@ -0,0 +1,297 @@
+"""
+Ranged File Responses
+Range (single and multipart), If-Range and conditional GET over byte sources
+"""
+
+import bisect
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from storage import IOExecutor
+
+READ_BLOCK_SIZE = 256 * 1024
+MAX_RANGES = 16  # More ranges than this are ignored (full 200 response)
+
+Segment = Tuple[Path, int, int]  # (path, offset in file, length)
+
+
+class ByteSource:
+    """
+    One resource made of byte segments taken from one or more files.
+
+    A cumulative offset index maps a resource offset to its segment with a
+    binary search, so a range read touches only the files it overlaps.
+    `whole_file` is set when the only segment is an entire file, which lets
+    a full response be handed to the server as a path.
+    """
+
+    def __init__(self, segments: List[Segment], etag: str, last_modified: float):
+        self.segments = segments
+        self.etag = etag
+        self.last_modified = last_modified
+        self.whole_file = False
+        self.starts = []
+        position = 0
+        for _, _, length in segments:
+            self.starts.append(position)
+            position += length
+        self.size = position
+
+    @classmethod
+    def from_file(cls, path: Path) -> "ByteSource":
+        """Whole file; the strong ETag comes from inode, size and mtime"""
+        st = path.stat()
+        etag = f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+        source = cls([(path, 0, st.st_size)], etag, st.st_mtime)
+        source.whole_file = True
+        return source
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read up to `length` bytes at resource `offset` (blocking)"""
+        parts = []
+        index = bisect.bisect_right(self.starts, offset) - 1
+        while length > 0 and 0 <= index < len(self.segments):
+            path, file_offset, segment_length = self.segments[index]
+            skip = offset - self.starts[index]
+            count = min(length, segment_length - skip)
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                data = os.pread(fd, count, file_offset + skip)
+            finally:
+                os.close(fd)
+            if len(data) < count:
+                raise IOError(f"{path} is shorter than expected")
+            parts.append(data)
+            offset += count
+            length -= count
+            index += 1
+        return b"".join(parts)
+
+
+class FileRangeResponse(Response):
+    """
+    One byte range (start..end inclusive) of one file.
+
+    When the server offers the ASGI http.response.zerocopysend extension
+    (uvicorn with sendfile_http's protocols), the open file and the range are
+    handed over and the server transmits them with sendfile, without the
+    bytes passing through Python. http.response.pathsend is used the same
+    way for a whole file. Otherwise blocks are pread on `executor` from one
+    descriptor.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, whole_file: bool, executor: IOExecutor,
+                 status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.whole_file = whole_file
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        extensions = scope.get("extensions", {})
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        elif self.start > self.end:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            f = await self.executor.run(open, self.path, "rb")
+            try:
+                await send({
+                    "type": "http.response.zerocopysend", "file": f,
+                    "offset": self.start, "count": self.end - self.start + 1, "more_body": False
+                })
+            finally:
+                await self.executor.run(f.close)
+        else:
+            fd = await self.executor.run(os.open, self.path, os.O_RDONLY)
+            try:
+                position = self.start
+                while position <= self.end:
+                    count = min(READ_BLOCK_SIZE, self.end - position + 1)
+                    data = await self.executor.run(os.pread, fd, count, position)
+                    if not data:
+                        raise IOError(f"{self.path} is shorter than expected")
+                    position += len(data)
+                    await send({"type": "http.response.body", "body": data, "more_body": position <= self.end})
+            finally:
+                os.close(fd)
+        if self.background is not None:
+            await self.background()
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted, merged inclusive (start, end) ranges.
+    Returns None if the header should be ignored (bad syntax, other units,
+    too many ranges) and [] if no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+            else:
+                suffix = int(last)
+                if suffix == 0:
+                    continue
+                start, end = max(0, size - suffix), size - 1
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+    
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """If-None-Match style comparison (weak by default; If-Range needs strong)"""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified_since(header: str, last_modified: float) -> bool:
+    try:
+        return int(last_modified) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def if_range_holds(header: str, source: ByteSource) -> bool:
+    if header.strip().startswith(('"', 'W/')):
+        return etag_matches(header, source.etag, weak=False)
+    try:
+        return int(source.last_modified) == parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def ranged_response(
+    request: Request,
+    source: ByteSource,
+    media_type: str,
+    executor: IOExecutor,
+    filename: Optional[str] = None,
+    headers: Optional[dict] = None
+) -> Response:
+    """
+    Serve a ByteSource honoring If-None-Match / If-Modified-Since (304),
+    Range / If-Range (206, multipart/byteranges for several ranges, 416).
+    Single-file sources without multipart are sent by FileRangeResponse,
+    everything else is streamed with body blocks read on `executor`.
+    """
+    base_headers = {
+        "ETag": source.etag,
+        "Last-Modified": formatdate(source.last_modified, usegmt=True),
+        "Accept-Ranges": "bytes"
+    }
+    if filename:
+        base_headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    base_headers.update(headers or {})
+    
+    # Conditional GET: If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, source.etag):
+            return Response(status_code=304, headers=base_headers)
+    elif if_modified_since and not_modified_since(if_modified_since, source.last_modified):
+        return Response(status_code=304, headers=base_headers)
+    
+    ranges = None
+    range_header = request.headers.get("range")
+    if range_header and request.method == "GET":
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range_holds(if_range, source):
+            ranges = parse_range_header(range_header, source.size)
+    
+    if ranges == []:
+        return Response(
+            status_code=416,
+            headers={**base_headers, "Content-Range": f"bytes */{source.size}"}
+        )
+    
+    if not ranges:
+        status_code, parts, content_type = 200, [(0, source.size - 1, b"")], media_type
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        base_headers["Content-Range"] = f"bytes {start}-{end}/{source.size}"
+        status_code, parts, content_type = 206, [(start, end, b"")], media_type
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [
+            (start, end, (
+                f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{source.size}\r\n\r\n"
+            ).encode())
+            for start, end in ranges
+        ]
+        # Every part after the first starts with the CRLF ending the previous one
+        parts = [parts[0]] + [(start, end, b"\r\n" + head) for start, end, head in parts[1:]]
+        parts.append((0, -1, f"\r\n--{boundary}--\r\n".encode()))
+        status_code, content_type = 206, f"multipart/byteranges; boundary={boundary}"
+    
+    length = sum(end - start + 1 + len(head) for start, end, head in parts)
+    base_headers["Content-Length"] = str(length)
+    
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=base_headers, media_type=content_type)
+    if len(source.segments) == 1 and len(parts) == 1:
+        path, file_offset, _ = source.segments[0]
+        start, end, _ = parts[0]
+        return FileRangeResponse(
+            path, file_offset + start, file_offset + end, source.whole_file and status_code == 200,
+            executor, status_code, base_headers, content_type
+        )
+    return StreamingResponse(
+        stream_parts(source, parts, executor),
+        status_code=status_code,
+        headers=base_headers,
+        media_type=content_type
+    )
+
+
+async def stream_parts(source: ByteSource, parts, executor: IOExecutor) -> AsyncIterator[bytes]:
+    """Yield each part's header followed by its byte range in READ_BLOCK_SIZE blocks"""
+    for start, end, head in parts:
+        if head:
+            yield head
+        position = start
+        while position <= end:
+            count = min(READ_BLOCK_SIZE, end - position + 1)
+            yield await executor.run(source.read, position, count)
+            position += count
@@ -3,20 +3,115 @@ Recording Complete Endpoint
 Handles recording completion signals from client and triggers server-side assembly
 """
 
-from fastapi import APIRouter, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Form, HTTPException, BackgroundTasks, Request
+from starlette.background import BackgroundTask
+import asyncio
 import json
 import os
 import shutil
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 router = APIRouter()
 
 # Import from tus_upload
 from .tus_upload import UPLOAD_DIR
+from .ranged_response import ByteSource, parse_range_header, ranged_response
 
-@router.get("/recordings/{session_id}/{file_name}")
-async def get_recording(session_id: str, file_name: str):
+MEDIA_TYPES = {
+    '.webm': 'audio/webm',
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mpeg',
+    '.ogg': 'audio/ogg'
+}
+
+# Live playback long-polling: a reader that has caught up may wait this long for new chunks
+LIVE_POLL_MAX = float(os.getenv("LIVE_POLL_MAX", "30"))  # Seconds
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "0.5"))  # Seconds between session checks
+
+
+# Ranged reads served per manifest-backed recording since it was assembled (this
+# process), least recently read first; recordings past MANIFEST_READS_MAX are forgotten
+MANIFEST_READS_MAX = int(os.getenv("MANIFEST_READS_MAX", "4096"))
+manifest_reads: "OrderedDict[str, int]" = OrderedDict()
+
+
+def count_manifest_read(key: str) -> int:
+    """Count one read of a manifest-backed recording; returns its reads so far"""
+    reads = manifest_reads.pop(key, 0) + 1
+    manifest_reads[key] = reads
+    while len(manifest_reads) > MANIFEST_READS_MAX:
+        manifest_reads.popitem(last=False)
+    return reads
+
+
+def find_recording(session_id: str, file_name: str):
+    """Path of a recording: completed/ first, then the session directory itself"""
+    session_dir = UPLOAD_DIR / session_id
+    for candidate in (session_dir / "completed" / file_name, session_dir / file_name):
+        if candidate.is_file() and candidate.resolve().is_relative_to(session_dir.resolve()):
+            return candidate
+    return None
+
+
+def open_recording(session_id: str, recording_path: Path):
+    """
+    Byte source for a completed recording, real or manifest-backed (blocking).
+    Returns (source, is_manifest), or (None, False) if neither exists.
+    """
+    from .tus_upload import get_recording_manifest
+    if recording_path.is_file():
+        return ByteSource.from_file(recording_path), False
+    manifest = get_recording_manifest(session_id, recording_path)
+    data = manifest.load()
+    if data is None:
+        return None, False
+    return ByteSource(manifest.segments(data), data['etag'], manifest.path.stat().st_mtime), True
+
+
+# Under "_live", so a recording named "live" stays reachable at /recordings/{session_id}/live
+@router.api_route("/recordings/{session_id}/_live", methods=["GET", "HEAD"])
+async def get_live_recording(session_id: str, request: Request, wait: float = 0):
+    """
+    Play a recording while it is still being uploaded.
+    
+    Serves the contiguous prefix of received chunks as one growing file with
+    Range support. With ?wait=N a reader whose range starts at or past the
+    current end waits up to N seconds (max LIVE_POLL_MAX) for more chunks.
+    Once assembled, the completed recording is served.
+    """
+    from .tus_upload import contiguous_chunk_sizes, fetch_session_info, live_source, storage_io
+    deadline = time.monotonic() + min(max(wait, 0.0), LIVE_POLL_MAX)
+    range_header = request.headers.get("range")
+    
+    while True:
+        session = await fetch_session_info(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        
+        source = None
+        if session.get('assembled'):
+            source, _ = await storage_io.run(open_recording, session_id, Path(session['output_file']))
+        if source is not None:
+            break
+        source = await storage_io.run(live_source, session_id, contiguous_chunk_sizes(session))
+        
+        caught_up = parse_range_header(range_header, source.size) == [] if range_header else source.size == 0
+        if not caught_up or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(LIVE_POLL_INTERVAL)
+    
+    media_type = MEDIA_TYPES.get(f".{session.get('format', '')}".lower(), 'application/octet-stream')
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Recording-Complete": "true" if session.get('assembled') else "false"
+    }
+    return ranged_response(request, source, media_type, storage_io, headers=headers)
+
+
+@router.api_route("/recordings/{session_id}/{file_name}", methods=["GET", "HEAD"])
+async def get_recording(session_id: str, file_name: str, request: Request):
     """
     Retrieve a completed recording file from the server
     
@@ -25,31 +120,38 @@ async def get_recording(session_id: str, file_name: str):
         file_name: The filename to retrieve
     
     Returns:
-        The audio file as streaming response
+        The audio file, honoring Range, If-Range, If-None-Match and If-Modified-Since
     """
-    file_path = UPLOAD_DIR / session_id / file_name
+    from .tus_upload import MANIFEST_COMPACT_ACCESSES, materialize_recording, storage_io
+    file_path = await storage_io.run(find_recording, session_id, file_name)
+    is_manifest = False
+    if file_path is None and Path(file_name).name == file_name:
+        file_path = UPLOAD_DIR / session_id / "completed" / file_name
+        source, is_manifest = await storage_io.run(open_recording, session_id, file_path)
+        if source is None:
+            file_path = None
     
-    if not file_path.exists():
+    if file_path is None:
         raise HTTPException(
             status_code=404, 
             detail=f"Recording not found: {session_id}/{file_name}"
         )
     
     # Determine media type from extension
-    ext = file_path.suffix.lower()
-    media_types = {
-        '.webm': 'audio/webm',
-        '.wav': 'audio/wav',
-        '.mp3': 'audio/mpeg',
-        '.ogg': 'audio/ogg'
-    }
-    media_type = media_types.get(ext, 'application/octet-stream')
+    media_type = MEDIA_TYPES.get(file_path.suffix.lower(), 'application/octet-stream')
     
-    return FileResponse(
-        path=file_path,
-        media_type=media_type,
-        filename=file_name
-    )
+    if not is_manifest:
+        source = await storage_io.run(ByteSource.from_file, file_path)
+    response = ranged_response(request, source, media_type, storage_io, filename=file_name)
+    
+    # Virtual recordings become real files on the first full download or
+    # once they have been read often enough
+    if is_manifest and request.method == "GET" and response.status_code in (200, 206):
+        key = str(file_path)
+        if count_manifest_read(key) >= MANIFEST_COMPACT_ACCESSES or response.status_code == 200:
+            manifest_reads.pop(key, None)
+            response.background = BackgroundTask(materialize_recording, session_id, file_path)
+    return response
 
 
 @router.post("/recording/complete")
@@ -72,8 +174,8 @@ async def recording_complete(
             raise HTTPException(status_code=400, detail="Invalid metadata JSON")
     
     # Check if session exists in TUS session info
-    from .tus_upload import load_session_info, assemble_chunks
-    session_info = load_session_info(session_id)
+    from .tus_upload import fetch_session_info, request_assembly, storage_io
+    session_info = await fetch_session_info(session_id)
     
     if not session_info:
         raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
@@ -81,7 +183,8 @@ async def recording_complete(
     # Fast path: if the file is already assembled, return success
     completed_dir = UPLOAD_DIR / session_id / "completed"
     output_file = completed_dir / file_name
-    if output_file.exists():
+    existing, _ = await storage_io.run(open_recording, session_id, output_file)
+    if existing is not None:
         return {
             "status": "already_completed",
             "message": "Recording already assembled",
@@ -89,14 +192,22 @@ async def recording_complete(
             "file_name": file_name
         }
     
-    # Trigger TUS assembly in background
-    background_tasks.add_task(
-        assemble_chunks,
+    # Trigger TUS assembly in background. One already in flight (e.g. started
+    # by the upload stream) may use another name: the client retries, and the
+    # retry renames the assembled recording.
+    scheduled = await request_assembly(
+        background_tasks,
         session_id,
         metadata_dict.get('name', file_name.split('.')[0]) if metadata_dict else file_name.split('.')[0],
         metadata_dict.get('extension', file_name.split('.')[-1]) if metadata_dict else file_name.split('.')[-1],
         metadata_dict or {}
     )
+    if not scheduled:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Session {session_id} is being assembled, retry shortly",
+            headers={"Retry-After": "2"}
+        )
     
     return {
         "status": "assembling",
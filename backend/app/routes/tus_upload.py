@@ -3,55 +3,349 @@ TUS Protocol Upload Routes
 Implements tus.io resumable upload protocol for audio chunks
 """
 
+import asyncio
 import base64
 import json
 import os
 import shutil
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import unquote
 from datetime import datetime
 
-from fastapi import APIRouter, Header, Request, Response, HTTPException, BackgroundTasks, Form, UploadFile, File
+from fastapi import (
+    APIRouter, Header, Query, Request, Response, HTTPException, BackgroundTasks, Form, UploadFile, File,
+    WebSocket, WebSocketDisconnect
+)
 from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+
+from .chunk_batch import FrameReader, FramingError
+from .ranged_response import ByteSource
+from observability import get_logger, metrics
+from storage import (
+    AssemblyEngine, AssemblyQueue, DirectDataFile, IOExecutor, Lease, LeaseManager, LeaseUnavailable,
+    PartialRecording, RecordingManifest, SessionCache, SessionJournal, SessionLockRegistry, SingleFlight
+)
 
 router = APIRouter()
+log = get_logger("tus")
 
 # Storage configuration
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", str(Path(__file__).parent.parent.parent.parent / "backend" / "uploaded_data")))
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-print(f"📂 UPLOAD_DIR configured: {UPLOAD_DIR.absolute()}")
+log.info("upload_dir", "UPLOAD_DIR configured", path=str(UPLOAD_DIR.absolute()))
+
+# Request body ingestion: bodies are streamed to disk in blocks, never buffered whole
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", "65536"))  # Default 64KB write blocks
+MAX_CHUNK_BODY_SIZE = int(os.getenv("MAX_CHUNK_BODY_SIZE", "16777216"))  # Default 16MB per chunk
+VERIFY_BATCH_MAX = int(os.getenv("VERIFY_BATCH_MAX", "10000"))  # Chunk indices per batch verify request
+
+# TUS protocol support (creation-with-upload lets the POST carry the chunk body)
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = ("creation", "creation-with-upload")
+TUS_CONTENT_TYPE = "application/offset+octet-stream"
+
+# Blocking filesystem calls made by async handlers run on this dedicated pool
+STORAGE_IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS", "8"))
+storage_io = IOExecutor(STORAGE_IO_WORKERS, observer=metrics.observe_storage_call)
+
+# Session state cache configuration (flushed through storage_io, never on the event loop)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))  # Sessions kept in memory
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "2.0"))  # Seconds, 0 = write-through
+session_cache = SessionCache(SESSION_CACHE_SIZE, SESSION_FLUSH_INTERVAL, inline_flush=False)
+
+# Per-session concurrency control: state mutations for one session are
+# serialized, and at most one assembly per session is pending or running.
+session_locks = SessionLockRegistry()
+assembly_flights = SingleFlight()
+
+# Event loop serving requests; session locks are only taken on this loop,
+# so worker threads submit their session updates to it (see run_on_event_loop)
+event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Cross-replica coordination through lease files on the shared volume.
+# Enable when several replicas serve the same UPLOAD_DIR.
+SESSION_LEASES_ENABLED = os.getenv("SESSION_LEASES_ENABLED", "false").lower() == "true"
+SESSION_LEASE_TTL = float(os.getenv("SESSION_LEASE_TTL", "30"))  # Seconds
+SESSION_LEASE_TIMEOUT = float(os.getenv("SESSION_LEASE_TIMEOUT", "10"))  # Max wait for a busy session
+SESSION_LEASE_HOLD = float(os.getenv("SESSION_LEASE_HOLD", "1.0"))  # Idle seconds before release, 0 = per mutation
+ASSEMBLY_LEASE_TTL = float(os.getenv("ASSEMBLY_LEASE_TTL", "300"))  # Renewed while copying
+session_leases = LeaseManager(ttl=SESSION_LEASE_TTL, acquire_timeout=SESSION_LEASE_TIMEOUT)
+held_leases: Dict[str, Lease] = {}  # Session dir -> session lease held by this process (changed on the loop only)
+
+# Chunk storage layout. "chunks" keeps one file per chunk and copies them into
+# the recording at assembly. "direct" writes each finished chunk once into a
+# per-session data file at a reserved offset; when chunks arrive in order the
+# data file is renamed into place instead of copied.
+STORAGE_MODE = os.getenv("STORAGE_MODE", "chunks").lower()
+DIRECT_PREALLOCATE_BYTES = int(os.getenv("DIRECT_PREALLOCATE_BYTES", "8388608"))  # Data file growth step, 8MB
+
+# Recording assembly copies chunk ranges in the kernel (copy_file_range, then sendfile).
+# Large recordings are copied by ASSEMBLY_COPY_THREADS threads into disjoint ranges,
+# which keeps latency-bound network volumes busy.
+ASSEMBLY_COPY_THREADS = int(os.getenv("ASSEMBLY_COPY_THREADS", "1"))  # 1 = sequential
+ASSEMBLY_PARALLEL_MIN_BYTES = int(os.getenv("ASSEMBLY_PARALLEL_MIN_BYTES", "67108864"))  # Default 64MB
+assembly_engine = AssemblyEngine(workers=ASSEMBLY_COPY_THREADS, parallel_min_bytes=ASSEMBLY_PARALLEL_MIN_BYTES)
+
+# Durable assembly queue (SQLite on the upload volume) worked by a dedicated
+# thread pool. When disabled, assembly runs as a request background task.
+ASSEMBLY_QUEUE_ENABLED = os.getenv("ASSEMBLY_QUEUE_ENABLED", "false").lower() == "true"
+ASSEMBLY_QUEUE_DB = os.getenv("ASSEMBLY_QUEUE_DB", ".assembly_queue.sqlite3")  # Relative to UPLOAD_DIR
+ASSEMBLY_WORKERS = int(os.getenv("ASSEMBLY_WORKERS", "2"))
+ASSEMBLY_MAX_ATTEMPTS = int(os.getenv("ASSEMBLY_MAX_ATTEMPTS", "5"))
+ASSEMBLY_RETRY_BACKOFF = float(os.getenv("ASSEMBLY_RETRY_BACKOFF", "5"))  # Seconds, doubled per attempt
+
+# Incremental assembly (chunks mode): the in-order prefix of received chunks
+# is appended to a partial recording as they arrive, so finalizing only
+# copies the out-of-order tail.
+INCREMENTAL_ASSEMBLY = os.getenv("INCREMENTAL_ASSEMBLY", "false").lower() == "true"
+partial_flights = SingleFlight()
+
+# Completed recording layout. "materialize" concatenates chunks into one file.
+# "manifest" only writes a manifest of the chunk segments and serves it as a
+# virtual file; the real file is built on the first full download or once
+# MANIFEST_COMPACT_ACCESSES ranged reads have been served.
+RECORDING_MODE = os.getenv("RECORDING_MODE", "materialize").lower()
+MANIFEST_COMPACT_ACCESSES = int(os.getenv("MANIFEST_COMPACT_ACCESSES", "3"))
+materialize_flights = SingleFlight()
 
 def get_session_info_path(session_id: str) -> Path:
     """Get path to session info JSON file"""
     return UPLOAD_DIR / session_id / "session_info.json"
 
+def get_session_store(session_id: str) -> SessionJournal:
+    """Get the journaled store for a session"""
+    return SessionJournal(UPLOAD_DIR / session_id)
+
 def save_session_info(session_id: str, info: dict):
-    """Save session info to disk"""
-    path = get_session_info_path(session_id)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Convert sets to lists for JSON serialization
-    serialized_info = info.copy()
-    if 'uploaded_chunks' in serialized_info and isinstance(serialized_info['uploaded_chunks'], set):
-        serialized_info['uploaded_chunks'] = list(serialized_info['uploaded_chunks'])
-    
-    with open(path, 'w') as f:
-        json.dump(serialized_info, f, indent=2)
+    """Save a full session snapshot to disk now (compacts the chunk journal)"""
+    session_cache.compact(get_session_store(session_id), info)
+
+def save_session_header(session_id: str, info: dict):
+    """Queue a session metadata write (write-behind)"""
+    session_cache.mark_header_dirty(get_session_store(session_id), info)
+
+def record_chunk(session_id: str, info: dict, chunk_index: int, size: int):
+    """Queue a completed chunk record for the session journal (write-behind)"""
+    session_cache.record_chunk(get_session_store(session_id), info, chunk_index, size)
 
 def load_session_info(session_id: str) -> Optional[dict]:
-    """Load session info from disk"""
-    path = get_session_info_path(session_id)
-    if not path.exists():
+    """Load session info from the cache, falling back to disk"""
+    store = get_session_store(session_id)
+    if SESSION_LEASES_ENABLED and held_session_lease(store) is None \
+            and session_leases.changed_elsewhere(store.session_dir, "session"):
+        # Another replica mutated the session since we cached it
+        session_cache.discard(store)
+    return session_cache.get(store)
+
+
+def bind_event_loop():
+    """Remember the running event loop for session updates made from worker threads"""
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+
+
+def run_on_event_loop(coro, timeout: float):
+    """
+    Run a coroutine on the request event loop from a worker thread (e.g. an
+    assembly thread) and wait for its result. Without a running request loop,
+    e.g. when called directly from a script, it runs on a new loop instead.
+    Must not be called from the event loop thread itself.
+    """
+    loop = event_loop
+    if loop is None or not loop.is_running():
+        return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def fetch_session_info(session_id: str) -> Optional[dict]:
+    """
+    Async load_session_info: cache hits are answered on the event loop,
+    misses and lease checks go through the storage I/O executor.
+    While this process holds the session lease no other replica can have
+    changed the session, so the cached copy is used without a check.
+    """
+    store = get_session_store(session_id)
+    if not SESSION_LEASES_ENABLED or held_session_lease(store) is not None:
+        info = session_cache.get_cached(store)
+        if info is not None:
+            return info
+    return await storage_io.run(load_session_info, session_id)
+
+
+def held_session_lease(store: SessionJournal) -> Optional[Lease]:
+    """The session lease this process holds, None if not held or expired"""
+    lease = held_leases.get(str(store.session_dir))
+    if lease is None or lease.remaining() <= 0:
         return None
+    return lease
+
+
+async def hold_session_lease(store: SessionJournal) -> Lease:
+    """
+    Session lease for a mutation. A held lease is reused as is while more than
+    half its TTL is left and renewed otherwise; only a session this process
+    does not hold yet acquires the lease file (waiting for other replicas).
+    """
+    key = str(store.session_dir)
+    lease = held_leases.get(key)
+    if lease is not None:
+        if lease.remaining() > SESSION_LEASE_TTL / 2:
+            return lease
+        if await storage_io.run(session_leases.renew, lease):
+            return lease
+        del held_leases[key]
+        log.warning("session_lease_lost", "Session lease lost, dropping cached state", session_id=store.session_dir.name)
+        session_cache.discard(store)
     
-    with open(path, 'r') as f:
-        info = json.load(f)
-    
-    # Convert lists back to sets
-    if 'uploaded_chunks' in info:
-        info['uploaded_chunks'] = set(info['uploaded_chunks'])
-    
-    return info
+    lease = await session_leases.acquire_async(storage_io.run, store.session_dir, "session")
+    if lease.handed_over:
+        # Another replica held the session since we last did
+        session_cache.discard(store)
+    held_leases[key] = lease
+    return lease
+
+
+@asynccontextmanager
+async def locked_session(session_id: str, persist: bool = False):
+    """
+    Hold the session lock for a state mutation.
+    With SESSION_LEASES_ENABLED the session lease is held too, which excludes
+    other replicas. The lease is kept across a burst of requests and released,
+    after pending state is written back, once idle for SESSION_LEASE_HOLD seconds.
+    With `persist` the mutation is written back before the block exits (503 if
+    the lease was lost meanwhile), for callers acknowledging durable state.
+    """
+    async with session_locks.lock(session_id):
+        store = get_session_store(session_id)
+        if not SESSION_LEASES_ENABLED:
+            yield
+            if persist or session_cache.is_due(store):
+                await storage_io.run(session_cache.flush, store)
+            return
+        
+        try:
+            lease = await hold_session_lease(store)
+        except LeaseUnavailable:
+            raise HTTPException(
+                status_code=503,
+                detail="Session is busy on another replica",
+                headers={"Retry-After": "1"}
+            )
+        persisted = False
+        try:
+            yield
+        finally:
+            lease.last_used = time.monotonic()
+            release = SESSION_LEASE_HOLD <= 0
+            if release or persist or session_cache.is_due(store):
+                persisted = await write_back_session(store, lease, release)
+        if persist and not persisted:
+            raise HTTPException(
+                status_code=503,
+                detail="Session lease lost before the session was saved",
+                headers={"Retry-After": "1"}
+            )
+
+
+async def write_back_session(store: SessionJournal, lease: Lease, release: bool) -> bool:
+    """
+    Flush a session under its lease, optionally releasing the lease. Caller holds the session lock.
+    Returns False if the lease was lost and the pending state dropped.
+    """
+    persisted = await storage_io.run(_flush_under_lease, store, lease, release)
+    if not persisted or release:
+        if held_leases.get(str(store.session_dir)) is lease:
+            del held_leases[str(store.session_dir)]
+    return persisted
+
+
+def _flush_under_lease(store: SessionJournal, lease: Lease, release: bool) -> bool:
+    """Persist pending state if the lease is still ours; False if it is gone"""
+    if not store.session_dir.exists():
+        return False  # Session was cancelled under the lease
+    if not session_leases.is_current(lease):
+        # Fenced out: a newer owner exists, so our cached view is stale
+        log.warning("session_lease_lost", "Session lease lost, dropping cached state", session_id=store.session_dir.name)
+        session_cache.discard(store)
+        return False
+    session_cache.flush(store)
+    if release:
+        session_leases.release(lease)
+    return True
+
+
+async def maintain_session_leases(release_all: bool = False):
+    """
+    Write back held sessions with due changes and release the leases idle
+    for SESSION_LEASE_HOLD seconds (or all of them, on shutdown)
+    """
+    for key, lease in list(held_leases.items()):
+        store = SessionJournal(Path(key))
+        async with session_locks.lock(store.session_dir.name):
+            if held_leases.get(key) is not lease:
+                continue
+            idle = release_all or time.monotonic() - lease.last_used >= SESSION_LEASE_HOLD
+            if idle or session_cache.is_due(store):
+                await write_back_session(store, lease, release=idle)
+
+
+async def run_session_flusher():
+    """Periodically persist cached sessions with pending changes"""
+    interval = SESSION_FLUSH_INTERVAL
+    if SESSION_LEASES_ENABLED:
+        # Idle session leases are released from here too
+        interval = min(i for i in (SESSION_FLUSH_INTERVAL, SESSION_LEASE_HOLD, 1.0) if i > 0)
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if SESSION_LEASES_ENABLED:
+                await maintain_session_leases()
+            else:
+                await storage_io.run(session_cache.flush_due)
+        except Exception as e:
+            log.exception("session_flush_failed", "Error flushing session state", error=str(e))
+
+
+def body_too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Chunk body exceeds maximum size of {limit} bytes")
+
+
+async def write_stream(stream: AsyncIterator[bytes], f, limit: int) -> int:
+    """
+    Write an async byte stream to an open file in UPLOAD_BLOCK_SIZE blocks.
+    Writes run on the storage I/O executor.
+    Raises 413 once more than `limit` bytes arrive. Returns bytes written.
+    """
+    received = 0
+    block = bytearray()
+    async for data in stream:
+        if not data:
+            continue
+        received += len(data)
+        if received > limit:
+            raise body_too_large(limit)
+        block += data
+        if len(block) >= UPLOAD_BLOCK_SIZE:
+            await storage_io.run(f.write, block)
+            block = bytearray()
+    if block:
+        await storage_io.run(f.write, block)
+    return received
+
+
+async def iter_upload_file(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read a spooled UploadFile back in UPLOAD_BLOCK_SIZE blocks"""
+    while True:
+        data = await file.read(UPLOAD_BLOCK_SIZE)
+        if not data:
+            break
+        yield data
 
 
 def parse_tus_metadata(metadata_header: Optional[str]) -> dict:
@@ -73,7 +367,7 @@ def parse_tus_metadata(metadata_header: Optional[str]) -> dict:
             decoded_value = base64.b64decode(value).decode('utf-8')
             metadata[key] = decoded_value
         except Exception as e:
-            print(f"[TUS] Error decoding metadata {key}: {e}")
+            log.warning("metadata_decode_failed", "Error decoding metadata", key=key, error=str(e))
             metadata[key] = value
     
     return metadata
@@ -86,6 +380,74 @@ def get_session_dir(session_id: str) -> Path:
     return session_dir
 
 
+def existing_size(path: Path) -> Optional[int]:
+    """Size of a file, None if it does not exist"""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def file_size(path: Path) -> int:
+    """Size of a file, 0 if it does not exist"""
+    return existing_size(path) or 0
+
+
+def locate_chunk(session_id: str, chunk_id: str):
+    """Resolve a chunk's path and current size (blocking, run via storage_io)"""
+    chunk_path = get_chunk_path(session_id, chunk_id)
+    return chunk_path, file_size(chunk_path)
+
+
+def get_direct_file(session_id: str) -> DirectDataFile:
+    """Get the direct-mode data file for a session"""
+    return DirectDataFile(UPLOAD_DIR / session_id, DIRECT_PREALLOCATE_BYTES)
+
+
+def direct_chunk_size(session: Optional[dict], chunk_id: str) -> Optional[int]:
+    """Size of a chunk already stored in the direct data file, None otherwise"""
+    if STORAGE_MODE != "direct" or not session or not chunk_id.isdigit():
+        return None
+    if int(chunk_id) not in session['uploaded_chunks']:
+        return None
+    return session['chunk_sizes'].get(chunk_id)
+
+
+async def current_chunk_size(session_id: str, chunk_id: str, session: Optional[dict] = None) -> Optional[int]:
+    """Bytes stored so far for a chunk, None if nothing is stored"""
+    if STORAGE_MODE == "direct":
+        size = direct_chunk_size(session or await fetch_session_info(session_id), chunk_id)
+        if size is not None:
+            return size
+    chunk_path = await storage_io.run(get_chunk_path, session_id, chunk_id)
+    return await storage_io.run(existing_size, chunk_path)
+
+
+async def write_direct(session_id: str, chunk_index: int, stream: AsyncIterator[bytes], size: int) -> int:
+    """
+    Reserve `size` bytes in the session data file and stream the chunk there.
+    Returns the offset; the caller commits it together with the session state.
+    """
+    direct_file = get_direct_file(session_id)
+    async with locked_session(session_id):
+        offset = await storage_io.run(direct_file.reserve, chunk_index, size)
+    
+    writer = await storage_io.run(direct_file.open_writer, offset)
+    try:
+        written = await write_stream(stream, writer, size)
+    finally:
+        await storage_io.run(writer.close)
+    if written != size:
+        # The reserved range stays unused; the chunk can simply be retried
+        raise HTTPException(status_code=400, detail=f"Chunk body ended after {written} of {size} bytes")
+    return offset
+
+
+def chunk_lock_key(session_id: str, chunk_id: str) -> str:
+    """Lock key for writes to a single chunk file"""
+    return f"{session_id}/chunks/{chunk_id}"
+
+
 def get_chunk_path(session_id: str, chunk_id: str) -> Path:
     """
     Get path for specific chunk file.
@@ -115,50 +477,398 @@ def get_chunk_path(session_id: str, chunk_id: str) -> Path:
     return tus_chunk
 
 
-def assemble_chunks(session_id: str, recording_name: str, format: str, client_metadata: Optional[dict] = None):
+def assemble_chunks(session_id: str, recording_name: str, format: str, client_metadata: Optional[dict] = None) -> bool:
+    """
+    Assemble all uploaded chunks into final file
+    Skipped if another assembly of the same session is already in flight
+    Returns True once the session is assembled
+    """
+    if not assembly_flights.try_acquire(session_id):
+        log.info("assembly_in_progress", "Assembly already in progress, skipping", session_id=session_id)
+        return False
+    try:
+        return _assemble_chunks(session_id, recording_name, format, client_metadata)
+    finally:
+        assembly_flights.release(session_id)
+
+
+def schedule_assembly(
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    recording_name: str,
+    format: str,
+    client_metadata: Optional[dict] = None
+) -> bool:
+    """
+    Schedule assembly as a background task.
+    Returns False if an assembly for the session is already pending or running.
+    """
+    if not assembly_flights.try_acquire(session_id):
+        log.info("assembly_already_scheduled", "Assembly already scheduled", session_id=session_id)
+        return False
+    background_tasks.add_task(_run_scheduled_assembly, session_id, recording_name, format, client_metadata)
+    return True
+
+
+def _run_scheduled_assembly(session_id: str, recording_name: str, format: str, client_metadata: Optional[dict]):
+    try:
+        _assemble_chunks(session_id, recording_name, format, client_metadata)
+    finally:
+        assembly_flights.release(session_id)
+
+
+async def request_assembly(
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    recording_name: str,
+    format: str,
+    client_metadata: Optional[dict] = None
+) -> bool:
+    """
+    Queue assembly on the durable queue when enabled, else schedule it as a
+    background task. Returns False if one is already pending or running.
+    """
+    bind_event_loop()  # The assembly thread updates the session on this loop
+    if not ASSEMBLY_QUEUE_ENABLED:
+        return schedule_assembly(background_tasks, session_id, recording_name, format, client_metadata)
+    payload = {'recording_name': recording_name, 'format': format, 'client_metadata': client_metadata}
+    queued = await storage_io.run(assembly_queue.enqueue, session_id, payload)
+    if not queued:
+        log.info("assembly_already_queued", "Assembly already queued", session_id=session_id)
+    return queued
+
+
+def run_assembly_job(session_id: str, payload: dict):
+    """Assembly queue handler; raising makes the queue retry the job"""
+    if not assemble_chunks(session_id, payload['recording_name'], payload['format'], payload.get('client_metadata')):
+        raise RuntimeError(f"Assembly of session {session_id} did not complete")
+
+
+assembly_queue = AssemblyQueue(
+    run_assembly_job,
+    workers=ASSEMBLY_WORKERS,
+    max_attempts=ASSEMBLY_MAX_ATTEMPTS,
+    retry_backoff=ASSEMBLY_RETRY_BACKOFF
+)
+
+
+def start_assembly_queue():
+    """Open the assembly queue on the upload volume and start its workers"""
+    if ASSEMBLY_QUEUE_ENABLED:
+        assembly_queue.start(UPLOAD_DIR / ASSEMBLY_QUEUE_DB)
+
+
+def _assemble_chunks(session_id: str, recording_name: str, format: str, client_metadata: Optional[dict] = None) -> bool:
+    """
+    Take the assembly lease (when enabled) and build the recording.
+    Only one replica assembles a session at a time.
+    """
+    assembly_lease = None
+    if SESSION_LEASES_ENABLED:
+        assembly_lease = session_leases.try_acquire(UPLOAD_DIR / session_id, "assembly", ttl=ASSEMBLY_LEASE_TTL)
+        if assembly_lease is None:
+            log.info("assembly_elsewhere", "Session is being assembled by another replica, skipping", session_id=session_id)
+            return False
+        try:
+            run_on_event_loop(settle_session(session_id), SESSION_LEASE_TIMEOUT + 30)
+        except LeaseUnavailable:
+            session_leases.release(assembly_lease)
+            log.info("assembly_session_busy", "Session is busy on another replica, assembly deferred", session_id=session_id)
+            return False
+    try:
+        return _build_recording(session_id, recording_name, format, client_metadata, assembly_lease)
+    finally:
+        if assembly_lease is not None:
+            session_leases.release(assembly_lease)
+
+
+def get_partial_recording(session_id: str) -> PartialRecording:
+    """Get the incrementally assembled partial recording of a session"""
+    return PartialRecording(UPLOAD_DIR / session_id, assembly_engine)
+
+
+def locate_chunk_source(session_id: str, chunk_index: int):
+    """(path, offset, size) of a per-chunk file, None if it does not exist"""
+    chunk_path = get_chunk_path(session_id, str(chunk_index))
+    size = existing_size(chunk_path)
+    if size is None:
+        return None
+    return chunk_path, 0, size
+
+
+def extend_partial_recording(session_id: str):
+    """
+    Append newly contiguous chunks to the partial recording (background task).
+    Skipped while another extension or the final assembly holds the session.
+    """
+    if not partial_flights.try_acquire(session_id):
+        return
+    lease = None
+    try:
+        session = load_session_info(session_id)
+        if not session or session.get('assembled'):
+            return
+        if SESSION_LEASES_ENABLED:
+            lease = session_leases.try_acquire(UPLOAD_DIR / session_id, "assembly", ttl=ASSEMBLY_LEASE_TTL)
+            if lease is None:
+                return
+        get_partial_recording(session_id).extend(
+            lambda i: locate_chunk_source(session_id, i),
+            session.get('total_chunks') or None
+        )
+    except Exception as e:
+        log.exception("partial_extend_failed", "Error extending partial recording", session_id=session_id, error=str(e))
+    finally:
+        if lease is not None:
+            session_leases.release(lease)
+        partial_flights.release(session_id)
+
+
+def chunk_sources(session_id: str, total_chunks: int):
+    """
+    Locate every chunk's bytes as (path, offset, size), preferring the direct
+    data file over per-chunk files. Returns (sources, missing_chunk_indices).
+    """
+    committed = get_direct_file(session_id).committed()
+    data_path = get_direct_file(session_id).data_path
+    sources = []
+    missing_chunks = []
+    for i in range(total_chunks):
+        if i in committed:
+            offset, size = committed[i]
+            sources.append((data_path, offset, size))
+            continue
+        source = locate_chunk_source(session_id, i)
+        if source is None:
+            missing_chunks.append(i)
+        else:
+            sources.append(source)
+    return sources, missing_chunks
+
+
+def contiguous_chunk_sizes(session: dict) -> list:
+    """Recorded sizes of chunks 0..N-1, the longest received run from the start"""
+    sizes = []
+    uploaded = session['uploaded_chunks']
+    chunk_sizes = session['chunk_sizes']
+    while len(sizes) in uploaded:
+        sizes.append(chunk_sizes.get(str(len(sizes))))
+    return sizes
+
+
+def live_source(session_id: str, sizes: list) -> ByteSource:
+    """
+    The received prefix of a recording as one byte source (blocking).
+    `sizes` comes from contiguous_chunk_sizes(); unknown sizes are stat'ed.
+    """
+    committed = get_direct_file(session_id).committed() if STORAGE_MODE == "direct" else {}
+    data_path = get_direct_file(session_id).data_path
+    segments = []
+    for i, size in enumerate(sizes):
+        if i in committed:
+            offset, length = committed[i]
+            segments.append((data_path, offset, length))
+            continue
+        chunk_path = get_chunk_path(session_id, str(i))
+        if size is None or size < 0:
+            size = existing_size(chunk_path) or 0
+        segments.append((chunk_path, 0, size))
+    
+    last_modified = time.time()
+    if segments:
+        last_modified = existing_mtime(segments[-1][0]) or last_modified
+    total = sum(length for _, _, length in segments)
+    return ByteSource(segments, f'"{session_id}-live-{len(segments)}-{total:x}"', last_modified)
+
+
+def existing_mtime(path: Path) -> Optional[float]:
+    """Modification time of a file, None if it does not exist"""
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def remove_chunk_data(session_id: str):
+    """Delete chunk files, shards and the direct data file of a session"""
+    try:
+        session_dir = UPLOAD_DIR / session_id
+        for name in ("chunks", "temp", "direct"):
+            if (session_dir / name).exists():
+                shutil.rmtree(session_dir / name)
+    except Exception as cleanup_err:
+        log.warning("cleanup_failed", "Cleanup error", session_id=session_id, error=str(cleanup_err))
+
+
+def get_recording_manifest(session_id: str, recording_path: Path) -> RecordingManifest:
+    """Get the manifest standing in for a virtual recording"""
+    return RecordingManifest(recording_path, UPLOAD_DIR / session_id)
+
+
+def materialize_recording(session_id: str, recording_path: Path):
+    """
+    Replace a manifest-backed recording with a real file and drop its chunks
+    (background task). No-op if it is already being or has been materialized.
+    """
+    if not materialize_flights.try_acquire(str(recording_path)):
+        return
+    lease = None
+    try:
+        if SESSION_LEASES_ENABLED:
+            lease = session_leases.try_acquire(UPLOAD_DIR / session_id, "assembly", ttl=ASSEMBLY_LEASE_TTL)
+            if lease is None:
+                return
+        report = get_recording_manifest(session_id, recording_path).materialize(assembly_engine)
+        if report is None:
+            return
+        remove_chunk_data(session_id)
+        log.info(
+            "recording_materialized", "Materialized recording", session_id=session_id, path=str(recording_path),
+            method=report['method'], bytes=report['bytes'], duration_s=report['duration_s']
+        )
+    except Exception as e:
+        log.exception("materialize_failed", "Error materializing recording", path=str(recording_path), error=str(e))
+    finally:
+        if lease is not None:
+            session_leases.release(lease)
+        materialize_flights.release(str(recording_path))
+
+
+async def settle_session(session_id: str):
+    """
+    Write back this replica's pending session state and drop the cached copy,
+    so assembly starts from the shared on-disk state. Runs under the session
+    lock and lease like any other mutation (raises LeaseUnavailable).
+    """
+    async with session_locks.lock(session_id):
+        store = get_session_store(session_id)
+        lease = await hold_session_lease(store)
+        if await write_back_session(store, lease, release=False):
+            session_cache.discard(store)
+
+
+async def mark_session_assembled(session_id: str, output_file: Path):
+    """
+    Record a finished assembly in the session snapshot. Runs under the session
+    lock (and lease), so no chunk record lands in the journal being compacted.
+    """
+    async with locked_session(session_id):
+        session = await fetch_session_info(session_id)
+        if not session:
+            raise RuntimeError(f"Session {session_id} disappeared during assembly")
+        session['assembled'] = True
+        session['output_file'] = str(output_file)
+        session['assembled_at'] = datetime.now().isoformat()
+        await storage_io.run(save_session_info, session_id, session)
+
+
+def rename_recording(session_id: str, current_name: str, output_file: Path,
+                     client_metadata: Optional[dict] = None) -> bool:
+    """
+    Move an assembled recording (file or manifest) and its metadata to a new
+    name in completed/. Runs within assembly; returns False to retry later
+    while the recording is being materialized.
+    """
+    current = output_file.with_name(current_name)
+    if not materialize_flights.try_acquire(str(current)):
+        log.info("rename_deferred", "Recording is being materialized, rename deferred", session_id=session_id)
+        return False
+    try:
+        for source, target in (
+            (current, output_file),
+            (get_recording_manifest(session_id, current).path, get_recording_manifest(session_id, output_file).path)
+        ):
+            if source.is_file():
+                os.replace(source, target)
+        
+        metadata_path = current.with_name(current.name + ".meta.json")
+        if metadata_path.is_file():
+            with open(metadata_path) as meta_file:
+                metadata = json.load(meta_file)
+            metadata['file_name'] = output_file.name
+            if client_metadata:
+                metadata['client_metadata'] = client_metadata
+            with open(output_file.with_name(output_file.name + ".meta.json"), "w") as meta_file:
+                json.dump(metadata, meta_file, indent=2)
+            metadata_path.unlink()
+        
+        run_on_event_loop(mark_session_assembled(session_id, output_file), SESSION_LEASE_TIMEOUT + 30)
+        log.info("recording_renamed", "Renamed assembled recording", session_id=session_id,
+                 from_name=current.name, path=str(output_file))
+        return True
+    finally:
+        materialize_flights.release(str(current))
+
+
+def _build_recording(session_id: str, recording_name: str, format: str,
+                     client_metadata: Optional[dict] = None, lease=None) -> bool:
     """
     Assemble all uploaded chunks into final file
     Background task to avoid blocking response
+    Returns True if the session is assembled, False if it could not be (yet)
     """
+    # Keep partial recording extensions out while the final file is built
+    partial_flights.acquire(session_id)
     try:
         session = load_session_info(session_id)
         if not session:
-            print(f"[TUS] Session {session_id} info not found for assembly")
-            return
+            log.warning("assembly_session_missing", "Session info not found for assembly", session_id=session_id)
+            return False
         
         total_chunks = session.get('total_chunks', 0)
-        session_dir = get_session_dir(session_id)
         
         if session.get('assembled'):
-            print(f"[TUS] Session {session_id} already assembled, skipping.")
-            return
+            # A later completion signal may name the recording differently (e.g.
+            # the stream assembled it before the user saved it under a name)
+            requested = UPLOAD_DIR / session_id / "completed" / f"{recording_name}.{format}"
+            if Path(session['output_file']).name != requested.name:
+                return rename_recording(session_id, Path(session['output_file']).name, requested, client_metadata)
+            log.info("assembly_skipped", "Session already assembled, skipping", session_id=session_id)
+            return True
         
         # Check all chunks exist
-        missing_chunks = []
-        for i in range(total_chunks):
-            chunk_path = get_chunk_path(session_id, str(i))
-            if not chunk_path.exists():
-                missing_chunks.append(i)
+        sources, missing_chunks = chunk_sources(session_id, total_chunks)
         
         if missing_chunks:
-            print(f"[TUS] Cannot assemble - missing chunks: {missing_chunks}")
-            return
+            log.warning(
+                "assembly_missing_chunks", "Cannot assemble, missing chunks",
+                session_id=session_id, missing_chunks=missing_chunks[:100], missing_count=len(missing_chunks)
+            )
+            return False
         
         # Assemble file in completed/ directory
         completed_dir = UPLOAD_DIR / session_id / "completed"
         completed_dir.mkdir(parents=True, exist_ok=True)
         output_file = completed_dir / f"{recording_name}.{format}"
         
-        print(f"[TUS] Assembling {total_chunks} chunks into {output_file}")
+        log.info("assembly_started", "Assembling chunks", session_id=session_id, chunks=total_chunks, path=str(output_file))
         
-        with open(output_file, 'wb') as outfile:
-            for i in range(total_chunks):
-                chunk_path = get_chunk_path(session_id, str(i))
-                with open(chunk_path, 'rb') as infile:
-                    shutil.copyfileobj(infile, outfile)
+        direct_file = get_direct_file(session_id)
+        if lease is not None and not session_leases.is_current(lease):
+            raise RuntimeError("Assembly lease lost to another replica")
+        
+        def renew_lease(i: int):
+            if lease is not None and i % 256 == 255 and not session_leases.renew(lease, ASSEMBLY_LEASE_TTL):
+                raise RuntimeError("Assembly lease lost to another replica")
+        
+        # Chunks written in order to the direct data file already form the recording
+        started = time.perf_counter()
+        in_place = bool(sources) and all(path == direct_file.data_path for path, _, _ in sources)
+        partial = get_partial_recording(session_id)
+        report = None
+        if in_place and direct_file.finalize_in_place([(offset, size) for _, offset, size in sources], output_file):
+            report = assembly_engine.record("rename", sum(size for _, _, size in sources), time.perf_counter() - started)
+        elif partial.exists():
+            # Only the chunks after the watermark are copied
+            report = partial.finish(sources, output_file, progress=renew_lease)
+        elif RECORDING_MODE == "manifest":
+            manifest = get_recording_manifest(session_id, output_file)
+            report = assembly_engine.record("manifest", manifest.write(sources), time.perf_counter() - started)
+        if report is None:
+            report = assembly_engine.copy(sources, output_file, progress=renew_lease)
         
         # Create metadata file
-        file_size = output_file.stat().st_size
+        file_size = sum(size for _, _, size in sources)
         metadata_path = completed_dir / f"{recording_name}.{format}.meta.json"
         
         metadata = {
@@ -168,45 +878,66 @@ def assemble_chunks(session_id: str, recording_name: str, format: str, client_me
             "total_chunks": total_chunks,
             "missing_chunks": [],
             "client_metadata": client_metadata or session.get('client_metadata', {}),
-            "assembled_at": datetime.now().isoformat()
+            "assembled_at": datetime.now().isoformat(),
+            "assembly": report
         }
         
         with open(metadata_path, "w") as meta_file:
             json.dump(metadata, meta_file, indent=2)
         
-        print(f"✓ Metadata saved: {metadata_path}")
+        log.debug("metadata_saved", "Metadata saved", session_id=session_id, path=str(metadata_path))
         
-        # Cleanup chunks and temp files
-        try:
-            shutil.rmtree(session_dir)
-            temp_dir = UPLOAD_DIR / session_id / "temp"
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
-        except Exception as cleanup_err:
-            print(f"[TUS] Cleanup error: {cleanup_err}")
-        
-        # Update session info
-        session['assembled'] = True
-        session['output_file'] = str(output_file)
-        session['assembled_at'] = datetime.now().isoformat()
-        save_session_info(session_id, session)
+        if lease is not None and not session_leases.is_current(lease):
+            raise RuntimeError("Assembly lease lost to another replica")
         
-        print(f"[TUS] Assembly complete: {output_file}")
+        # Update session info before the chunks go, so a failed update leaves them for a retry
+        run_on_event_loop(mark_session_assembled(session_id, output_file), SESSION_LEASE_TIMEOUT + 30)
+        
+        # Cleanup chunks and temp files (a manifest still reads from them)
+        partial.discard()
+        if report['method'] != "manifest":
+            remove_chunk_data(session_id)
+        
+        metrics.assembly_seconds.observe(report['duration_s'], (report['method'],))
+        metrics.assembly_bytes.inc(report['bytes'], (report['method'],))
+        log.info(
+            "assembly_complete", "Assembly complete", session_id=session_id, path=str(output_file),
+            method=report['method'], bytes=report['bytes'], duration_s=report['duration_s'], mb_per_s=report['mb_per_s']
+        )
+        return True
         
     except Exception as e:
-        print(f"[TUS] Error assembling chunks: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("assembly_failed", "Error assembling chunks", session_id=session_id, error=str(e))
+        return False
+    finally:
+        partial_flights.release(session_id)
+
+
+def tus_discovery_headers() -> dict:
+    """TUS protocol headers advertising the supported version, extensions and size limit"""
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": ",".join(TUS_EXTENSIONS),
+        "Tus-Max-Size": str(MAX_CHUNK_BODY_SIZE)
+    }
+
+
+@router.options("/files/")
+async def tus_options():
+    """TUS discovery: protocol version, extensions and maximum chunk size"""
+    return Response(status_code=204, headers=tus_discovery_headers())
 
 
 @router.options("/files/{session_id}/chunks/")
 async def chunks_options(session_id: str):
-    """CORS preflight for chunk creation"""
+    """CORS preflight and TUS discovery for chunk creation"""
     return Response(
         status_code=204,
         headers={
+            **tus_discovery_headers(),
             "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Upload-Metadata, Content-Type",
+            "Access-Control-Allow-Headers": "Upload-Metadata, Upload-Length, Tus-Resumable, Content-Type",
             "Access-Control-Max-Age": "86400"
         }
     )
@@ -225,15 +956,120 @@ async def chunk_options(session_id: str, chunk_id: str):
     )
 
 
+async def store_tus_chunk(
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    chunk_id: str,
+    stream: AsyncIterator[bytes],
+    upload_offset: int,
+    content_length: Optional[int],
+    endpoint: str,
+    upload_length: Optional[int] = None
+) -> int:
+    """
+    Append a TUS request body to a chunk at `upload_offset` and update the session.
+    The chunk counts as uploaded once `upload_length` bytes are stored (or, when the
+    length is unknown, after any body). Returns the new offset.
+    """
+    # Writes to the same chunk are serialized; other chunks proceed in parallel
+    direct_offset = None
+    async with session_locks.lock(chunk_lock_key(session_id, chunk_id)):
+        session = await fetch_session_info(session_id)
+        if direct_chunk_size(session, chunk_id) is not None:
+            raise HTTPException(status_code=409, detail="Chunk already stored")
+        
+        # Verify offset matches current file size
+        chunk_path, current_size = await storage_io.run(locate_chunk, session_id, chunk_id)
+        if upload_offset != current_size:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload offset mismatch. Expected {current_size}, got {upload_offset}"
+            )
+        
+        limit = MAX_CHUNK_BODY_SIZE - upload_offset
+        if content_length is not None and content_length > limit:
+            raise body_too_large(MAX_CHUNK_BODY_SIZE)
+        
+        if (STORAGE_MODE == "direct" and upload_offset == 0 and content_length
+                and upload_length in (None, content_length)):
+            # Whole chunk in one request: write it straight into the session data file
+            direct_offset = await write_direct(session_id, int(chunk_id), stream, content_length)
+            new_offset = content_length
+        else:
+            # Stream chunk data to disk block by block
+            f = await storage_io.run(open, chunk_path, 'ab')
+            try:
+                await write_stream(stream, f, limit)
+            except HTTPException:
+                await storage_io.run(f.truncate, upload_offset)  # Drop the oversized body
+                raise
+            finally:
+                await storage_io.run(f.close)
+            
+            new_offset = await storage_io.run(file_size, chunk_path)
+    
+    metrics.ingested_bytes.inc(new_offset - upload_offset, (endpoint,))
+    if upload_length is not None and new_offset < upload_length:
+        log.info(
+            "chunk_uploaded", "Uploaded partial chunk data", session_id=session_id, chunk=int(chunk_id),
+            offset=upload_offset, new_offset=new_offset, upload_length=upload_length, endpoint=endpoint
+        )
+        return new_offset
+    
+    async with locked_session(session_id):
+        session = await fetch_session_info(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        if direct_offset is not None:
+            await storage_io.run(get_direct_file(session_id).commit, int(chunk_id), direct_offset, new_offset)
+        
+        # Mark chunk as uploaded (complete)
+        session['uploaded_chunks'].add(int(chunk_id))
+        session['chunk_sizes'][chunk_id] = new_offset
+        record_chunk(session_id, session, int(chunk_id), new_offset)
+        metrics.chunks_received.inc(1, (endpoint,))
+        
+        log.info(
+            "chunk_uploaded", "Uploaded chunk data", session_id=session_id, chunk=int(chunk_id),
+            offset=upload_offset, new_offset=new_offset, endpoint=endpoint
+        )
+        
+        # Check if all chunks are uploaded
+        if len(session['uploaded_chunks']) == session['total_chunks']:
+            log.info("upload_complete", "All chunks uploaded, triggering assembly", session_id=session_id, endpoint=endpoint)
+            await storage_io.run(save_session_info, session_id, session)
+            await request_assembly(
+                background_tasks,
+                session_id,
+                session['recording_name'],
+                session['format']
+            )
+        elif INCREMENTAL_ASSEMBLY and STORAGE_MODE == "chunks":
+            background_tasks.add_task(extend_partial_recording, session_id)
+    
+    return new_offset
+
+
 @router.post("/files/{session_id}/chunks/")
 async def create_chunk_upload(
     session_id: str,
-    upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata")
+    request: Request,
+    background_tasks: BackgroundTasks,
+    upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    upload_length: Optional[int] = Header(None, alias="Upload-Length"),
+    content_type: Optional[str] = Header(None, alias="Content-Type"),
+    content_length: Optional[int] = Header(None, alias="Content-Length")
 ):
     """
     Create a new chunk upload
-    Returns Location header with chunk URL and Upload-Offset
+    Returns Location header with chunk URL and Upload-Offset.
+    With creation-with-upload the body (application/offset+octet-stream)
+    is stored as the start of the chunk, saving the first PATCH.
     """
+    if upload_length is not None and upload_length > MAX_CHUNK_BODY_SIZE:
+        raise body_too_large(MAX_CHUNK_BODY_SIZE)
+    
     metadata = parse_tus_metadata(upload_metadata)
     
     chunk_index = int(metadata.get('chunkIndex', 0))
@@ -242,40 +1078,52 @@ async def create_chunk_upload(
     format = metadata.get('format', 'webm')
     
     # Initialize session if needed
-    session = load_session_info(session_id)
-    if not session:
-        session = {
-            'total_chunks': total_chunks,
-            'uploaded_chunks': set(),
-            'recording_name': recording_name,
-            'format': format,
-            'started_at': datetime.now().isoformat(),
-            'chunk_sizes': {},
-            'client_metadata': metadata
-        }
-    else:
-        # Update session info with latest metadata
-        session['total_chunks'] = total_chunks
-        session['recording_name'] = recording_name
-        session['format'] = format
-        if metadata:
-            session['client_metadata'] = metadata
-    
-    save_session_info(session_id, session)
+    async with locked_session(session_id):
+        session = await fetch_session_info(session_id)
+        if not session:
+            session = {
+                'total_chunks': total_chunks,
+                'uploaded_chunks': set(),
+                'recording_name': recording_name,
+                'format': format,
+                'started_at': datetime.now().isoformat(),
+                'chunk_sizes': {},
+                'client_metadata': metadata
+            }
+        else:
+            # Update session info with latest metadata
+            session['total_chunks'] = total_chunks
+            session['recording_name'] = recording_name
+            session['format'] = format
+            if metadata:
+                session['client_metadata'] = metadata
+        
+        save_session_header(session_id, session)
+
     chunk_id = str(chunk_index)
-    chunk_path = get_chunk_path(session_id, chunk_id)
     
-    # Get current upload offset (0 if new, file size if resuming)
-    upload_offset = chunk_path.stat().st_size if chunk_path.exists() else 0
+    # Get current upload offset (0 if new, stored size if resuming)
+    upload_offset = await current_chunk_size(session_id, chunk_id, session) or 0
     
-    print(f"[TUS] Created chunk upload: session={session_id}, chunk={chunk_index}/{total_chunks}, offset={upload_offset}")
+    log.info(
+        "chunk_created", "Created chunk upload",
+        session_id=session_id, chunk=chunk_index, total_chunks=total_chunks, offset=upload_offset
+    )
+    
+    # A body on a chunk that already has data is ignored; the client resumes from the offset
+    media_type = (content_type or "").split(";")[0].strip()
+    if media_type == TUS_CONTENT_TYPE and content_length and upload_offset == 0:
+        upload_offset = await store_tus_chunk(
+            background_tasks, session_id, chunk_id, request.stream(), 0,
+            content_length, "tus_create", upload_length
+        )
     
     return Response(
         status_code=201,
         headers={
             "Location": f"/files/{session_id}/chunks/{chunk_id}",
             "Upload-Offset": str(upload_offset),
-            "Tus-Resumable": "1.0.0"
+            "Tus-Resumable": TUS_VERSION
         }
     )
 
@@ -293,50 +1141,19 @@ async def upload_chunk_data(
     Upload chunk data at specified offset
     Supports resumable uploads
     """
-    session = load_session_info(session_id)
+    session = await fetch_session_info(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    chunk_path = get_chunk_path(session_id, chunk_id)
-    
-    # Verify offset matches current file size
-    current_size = chunk_path.stat().st_size if chunk_path.exists() else 0
-    if upload_offset != current_size:
-        raise HTTPException(
-            status_code=409,
-            detail=f"Upload offset mismatch. Expected {current_size}, got {upload_offset}"
-        )
-    
-    # Read and append chunk data
-    chunk_data = await request.body()
-    
-    with open(chunk_path, 'ab') as f:
-        f.write(chunk_data)
-    
-    new_offset = chunk_path.stat().st_size
-    
-    # Mark chunk as uploaded (complete)
-    session['uploaded_chunks'].add(int(chunk_id))
-    session['chunk_sizes'][chunk_id] = new_offset
-    save_session_info(session_id, session)
-    
-    print(f"[TUS] Uploaded chunk data: session={session_id}, chunk={chunk_id}, offset={upload_offset}->{new_offset}")
-    
-    # Check if all chunks are uploaded
-    if len(session['uploaded_chunks']) == session['total_chunks']:
-        print(f"[TUS] All chunks uploaded for session {session_id}, triggering assembly")
-        background_tasks.add_task(
-            assemble_chunks,
-            session_id,
-            session['recording_name'],
-            session['format']
-        )
+    new_offset = await store_tus_chunk(
+        background_tasks, session_id, chunk_id, request.stream(), upload_offset, content_length, "tus_patch"
+    )
     
     return Response(
         status_code=204,
         headers={
             "Upload-Offset": str(new_offset),
-            "Tus-Resumable": "1.0.0"
+            "Tus-Resumable": TUS_VERSION
         }
     )
 
@@ -346,18 +1163,17 @@ async def check_chunk_offset(session_id: str, chunk_id: str):
     """
     Check current upload offset for resuming
     """
-    session = load_session_info(session_id)
+    session = await fetch_session_info(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    chunk_path = get_chunk_path(session_id, chunk_id)
-    upload_offset = chunk_path.stat().st_size if chunk_path.exists() else 0
+    upload_offset = await current_chunk_size(session_id, chunk_id, session) or 0
     
     return Response(
         status_code=200,
         headers={
             "Upload-Offset": str(upload_offset),
-            "Tus-Resumable": "1.0.0"
+            "Tus-Resumable": TUS_VERSION
         }
     )
 
@@ -367,7 +1183,7 @@ async def get_session_status(session_id: str):
     """
     Get upload status for session
     """
-    session = load_session_info(session_id)
+    session = await fetch_session_info(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     uploaded_chunks = list(session['uploaded_chunks'])
@@ -396,7 +1212,7 @@ async def trigger_assembly(
     """
     Manually trigger assembly of uploaded chunks
     """
-    session = load_session_info(session_id)
+    session = await fetch_session_info(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -407,12 +1223,16 @@ async def trigger_assembly(
             detail=f"Cannot assemble - {missing} chunks missing"
         )
     
-    background_tasks.add_task(
-        assemble_chunks,
+    if not await request_assembly(
+        background_tasks,
         session_id,
         session['recording_name'],
         session['format']
-    )
+    ):
+        return JSONResponse({
+            "message": "Assembly already in progress",
+            "session_id": session_id
+        })
     
     return JSONResponse({
         "message": "Assembly started",
@@ -425,25 +1245,52 @@ async def cancel_upload(session_id: str):
     """
     Cancel upload and cleanup chunks
     """
-    if not load_session_info(session_id):
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Cleanup chunks directory
-    session_dir = UPLOAD_DIR / session_id
-    if session_dir.exists():
-        shutil.rmtree(session_dir)
-    
-    # Remove session info file
-    info_path = get_session_info_path(session_id)
-    if info_path.exists():
-        info_path.unlink()
+    async with locked_session(session_id):
+        if not await fetch_session_info(session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_cache.discard(get_session_store(session_id))
+        
+        # Cleanup chunks directory (and the session info file inside it)
+        await storage_io.run(shutil.rmtree, UPLOAD_DIR / session_id, ignore_errors=True)
     
-    print(f"[TUS] Cancelled session {session_id}")
+    log.info("session_cancelled", "Cancelled session", session_id=session_id)
     
     return JSONResponse({
         "message": "Upload cancelled",
         "session_id": session_id
     })
+def merge_custom_session(session: Optional[dict], total_chunks: Optional[int],
+                         recording_name: Optional[str], format: Optional[str]):
+    """
+    Create the session for a custom upload, or apply newly provided metadata
+    to it. Returns (session, header_changed).
+    """
+    if not session:
+        session = {
+            'total_chunks': total_chunks or 0,
+            'uploaded_chunks': set(),
+            'recording_name': recording_name or 'recording',
+            'format': format or 'webm',
+            'started_at': datetime.now().isoformat(),
+            'chunk_sizes': {},
+            'client_metadata': {
+                'recordingName': recording_name or 'recording',
+                'format': format or 'webm',
+                'totalChunks': total_chunks or 0
+            }
+        }
+        return session, False
+    
+    # Update existing session with new info if provided
+    header_changed = False
+    updates = {'total_chunks': total_chunks, 'recording_name': recording_name, 'format': format}
+    for key, value in updates.items():
+        if value and session.get(key) != value:
+            session[key] = value
+            header_changed = True
+    return session, header_changed
+
+
 @router.post("/upload/chunk")
 async def upload_chunk_custom(
     background_tasks: BackgroundTasks,
@@ -458,73 +1305,374 @@ async def upload_chunk_custom(
     Custom upload endpoint for Service Worker.
     Uses FormData POST instead of TUS protocol.
     """
+    return await ingest_custom_chunk(
+        background_tasks, session_id, chunk_index, iter_upload_file(file), file.size,
+        total_chunks, recording_name, format, endpoint="upload_chunk"
+    )
+
+
+@router.post("/upload/chunk/{session_id}/{chunk_index}")
+async def upload_chunk_raw(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    chunk_index: int,
+    content_length: Optional[int] = Header(None),
+    x_total_chunks: Optional[int] = Header(None),
+    x_recording_name: Optional[str] = Header(None),
+    x_format: Optional[str] = Header(None)
+):
+    """
+    Raw upload endpoint: the body is the chunk itself (application/octet-stream)
+    and streams straight to storage, without multipart parsing or a spooled
+    temp file. Metadata travels in X-Total-Chunks, X-Recording-Name
+    (percent-encoded) and X-Format. Responses match /upload/chunk.
+    """
+    recording_name = unquote(x_recording_name) if x_recording_name else None
+    return await ingest_custom_chunk(
+        background_tasks, session_id, chunk_index, request.stream(), content_length,
+        x_total_chunks, recording_name, x_format, endpoint="upload_chunk_raw"
+    )
+
+
+async def write_chunk_file(chunk_path: Path, stream: AsyncIterator[bytes], limit: int) -> int:
+    """Save chunk data via a temp file so a failed upload never looks complete"""
+    tmp_path = chunk_path.with_name(chunk_path.name + ".tmp")
+    try:
+        f = await storage_io.run(open, tmp_path, "wb")
+        try:
+            size = await write_stream(stream, f, limit)
+        finally:
+            await storage_io.run(f.close)
+        await storage_io.run(os.replace, tmp_path, chunk_path)
+    except BaseException:
+        await storage_io.run(tmp_path.unlink, missing_ok=True)
+        raise
+    return size
+
+
+async def ingest_custom_chunk(
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    chunk_index: int,
+    stream: AsyncIterator[bytes],
+    body_size: Optional[int],
+    total_chunks: Optional[int],
+    recording_name: Optional[str],
+    format: Optional[str],
+    endpoint: str
+) -> JSONResponse:
+    """
+    Store one chunk for the custom upload endpoints and record it in the
+    session. `body_size` is the chunk size when known up front.
+    """
     # Use str for chunk_id in Path helpers
     chunk_id = str(chunk_index)
-    chunk_path = get_chunk_path(session_id, chunk_id)
-    
-    # Ensure directory exists
-    chunk_path.parent.mkdir(parents=True, exist_ok=True)
     
-    if chunk_path.exists():
-        print(f"[Custom] Chunk {chunk_index} already exists for session {session_id}")
-        return JSONResponse({
-            "status": "chunk_already_exists",
-            "chunk_index": chunk_index,
-            "session_id": session_id
-        })
-    
-    # Save chunk data
-    content = await file.read()
-    with open(chunk_path, "wb") as f:
-        f.write(content)
-    
-    size = len(content)
-    print(f"[Custom] Saved chunk {chunk_index} for session {session_id} ({size} bytes)")
+    direct_offset = None
+    async with session_locks.lock(chunk_lock_key(session_id, chunk_id)):
+        # Resolving the path also creates the chunks/ directory
+        chunk_path = await storage_io.run(get_chunk_path, session_id, chunk_id)
+        
+        stored_size = await current_chunk_size(session_id, chunk_id)
+        if stored_size is not None:
+            session = await fetch_session_info(session_id)
+            if session and chunk_index in session['uploaded_chunks']:
+                log.info("chunk_exists", "Chunk already exists", session_id=session_id, chunk=chunk_index)
+                return JSONResponse({
+                    "status": "chunk_already_exists",
+                    "chunk_index": chunk_index,
+                    "session_id": session_id
+                })
+            # The file was stored but its session record was lost (e.g. unflushed
+            # write-behind state at a crash): record it again below
+            log.info("chunk_recovered", "Re-recording stored chunk", session_id=session_id, chunk=chunk_index)
+            size = stored_size
+        else:
+            if body_size is not None and body_size > MAX_CHUNK_BODY_SIZE:
+                raise body_too_large(MAX_CHUNK_BODY_SIZE)
+            
+            if STORAGE_MODE == "direct" and body_size:
+                # Size is known up front: write straight into the session data file
+                direct_offset = await write_direct(session_id, chunk_index, stream, body_size)
+                size = body_size
+            else:
+                size = await write_chunk_file(chunk_path, stream, MAX_CHUNK_BODY_SIZE)
+            
+            log.info("chunk_saved", "Saved chunk", session_id=session_id, chunk=chunk_index, size=size)
     
     # Update session info
-    session = load_session_info(session_id)
-    if not session:
-        session = {
-            'total_chunks': total_chunks or 0,
-            'uploaded_chunks': set(),
-            'recording_name': recording_name or 'recording',
-            'format': format or 'webm',
-            'started_at': datetime.now().isoformat(),
-            'chunk_sizes': {},
-            'client_metadata': {
-                'recordingName': recording_name or 'recording',
-                'format': format or 'webm',
-                'totalChunks': total_chunks or 0
-            }
-        }
-    else:
-        # Update existing session with new info if provided
-        if total_chunks: session['total_chunks'] = total_chunks
-        if recording_name: session['recording_name'] = recording_name
-        if format: session['format'] = format
-
-    session['uploaded_chunks'].add(chunk_index)
-    session['chunk_sizes'][chunk_id] = size
-    save_session_info(session_id, session)
-    
-    # Check if all chunks are uploaded
-    if session['total_chunks'] > 0 and len(session['uploaded_chunks']) == session['total_chunks']:
-        print(f"[Custom] All chunks uploaded via custom for session {session_id}, triggering assembly")
-        background_tasks.add_task(
-            assemble_chunks,
-            session_id,
-            session['recording_name'],
-            session['format']
+    async with locked_session(session_id):
+        if direct_offset is not None:
+            await storage_io.run(get_direct_file(session_id).commit, chunk_index, direct_offset, size)
+        session, header_changed = merge_custom_session(
+            await fetch_session_info(session_id), total_chunks, recording_name, format
         )
+        
+        session['uploaded_chunks'].add(chunk_index)
+        session['chunk_sizes'][chunk_id] = size
+        if header_changed:
+            save_session_header(session_id, session)
+        record_chunk(session_id, session, chunk_index, size)
+        if stored_size is None:
+            metrics.ingested_bytes.inc(size, (endpoint,))
+            metrics.chunks_received.inc(1, (endpoint,))
+        
+        # Check if all chunks are uploaded
+        if session['total_chunks'] > 0 and len(session['uploaded_chunks']) == session['total_chunks']:
+            log.info("upload_complete", "All chunks uploaded, triggering assembly", session_id=session_id, endpoint=endpoint)
+            await storage_io.run(save_session_info, session_id, session)
+            await request_assembly(
+                background_tasks,
+                session_id,
+                session['recording_name'],
+                session['format']
+            )
+        elif INCREMENTAL_ASSEMBLY and STORAGE_MODE == "chunks":
+            background_tasks.add_task(extend_partial_recording, session_id)
 
     return JSONResponse({
-        "status": "chunk_received",
+        "status": "chunk_received" if stored_size is None else "chunk_already_exists",
         "chunk_index": chunk_index,
         "session_id": session_id,
         "size": size
     })
 
 
+async def store_batch_chunk(session_id: str, chunk_index: int, stream: AsyncIterator[bytes],
+                            size: int, chunk_dir: Path) -> Optional[int]:
+    """
+    Store one chunk of a batch upload into `chunk_dir` (or the direct data
+    file). Returns the direct-mode offset to commit, None in chunks mode.
+    """
+    chunk_id = str(chunk_index)
+    async with session_locks.lock(chunk_lock_key(session_id, chunk_id)):
+        if STORAGE_MODE == "direct" and size:
+            return await write_direct(session_id, chunk_index, stream, size)
+        await write_chunk_file(chunk_dir / f"chunk_{chunk_id}.bin", stream, size)
+    return None
+
+
+async def store_chunk_records(session_id: str, reader: FrameReader, results: list, written: list):
+    """
+    Store every record from `reader`, skipping chunks the session already
+    has, and append one result per record plus (chunk_index, size, direct
+    offset) per stored chunk. Raises FramingError or a 413 HTTPException
+    at the first bad record; earlier records stay in `written`.
+    """
+    session = await fetch_session_info(session_id)
+    stored = set(session['uploaded_chunks']) if session else set()
+    chunk_dir = None
+    while (frame := await reader.next_frame()) is not None:
+        chunk_index, size = frame
+        if chunk_index in stored:
+            await reader.skip(size)
+            results.append({"chunk_index": chunk_index, "status": "chunk_already_exists"})
+            continue
+        if size > MAX_CHUNK_BODY_SIZE:
+            raise body_too_large(MAX_CHUNK_BODY_SIZE)
+        if chunk_dir is None:
+            # One directory probe per batch instead of one per chunk
+            chunk_dir = await storage_io.run(get_session_dir, session_id)
+        offset = await store_batch_chunk(session_id, chunk_index, reader.body(size), size, chunk_dir)
+        stored.add(chunk_index)
+        written.append((chunk_index, size, offset))
+        results.append({"chunk_index": chunk_index, "status": "chunk_received", "size": size})
+
+
+def commit_direct_chunks(session_id: str, chunks: list):
+    """Commit (chunk_index, size, offset) records to the direct data file"""
+    direct_file = get_direct_file(session_id)
+    for chunk_index, size, offset in chunks:
+        direct_file.commit(chunk_index, offset, size)
+
+
+@router.post("/upload/batch/{session_id}")
+async def upload_chunk_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session_id: str,
+    total_chunks: Optional[int] = None,
+    recording_name: Optional[str] = None,
+    format: Optional[str] = None
+):
+    """
+    Batch upload endpoint for Service Worker queue drains.
+    The streamed body holds many chunk records (see routes/chunk_batch.py).
+    Each chunk is stored as /upload/chunk would store it, chunks the session
+    already has are skipped, and everything written is committed in one
+    session update. Returns one result per record, in body order.
+    """
+    results = []
+    written = []  # (chunk_index, size, direct offset or None)
+    error = None
+    
+    try:
+        await store_chunk_records(session_id, FrameReader(request.stream()), results, written)
+    except FramingError as e:
+        error = (400, str(e))
+    except HTTPException as e:
+        error = (e.status_code, e.detail)
+    except ClientDisconnect:
+        # The record being received is dropped, like a truncated single-chunk body
+        error = (400, f"Client disconnected after {len(results)} records")
+    finally:
+        # Chunks stored before a bad record or a disconnect are kept
+        if written:
+            await commit_chunk_batch(background_tasks, session_id, written, total_chunks, recording_name, format)
+    
+    if error is not None:
+        log.warning("batch_incomplete", "Chunk batch stopped early", session_id=session_id,
+                    chunks=len(written), error=error[1])
+        return JSONResponse({
+            "status": "batch_incomplete",
+            "detail": error[1],
+            "session_id": session_id,
+            "results": results
+        }, status_code=error[0])
+    
+    return JSONResponse({
+        "status": "batch_received",
+        "session_id": session_id,
+        "results": results
+    })
+
+
+async def commit_chunk_batch(background_tasks: BackgroundTasks, session_id: str, written: list,
+                             total_chunks: Optional[int], recording_name: Optional[str], format: Optional[str],
+                             endpoint: str = "upload_batch", persist: bool = False) -> dict:
+    """
+    Record all chunks of a batch in one session update (or only the
+    metadata, if `written` is empty) and start assembly once complete.
+    With `persist` the session is saved before returning. Returns the session.
+    """
+    total = sum(size for _, size, _ in written)
+    async with locked_session(session_id, persist=persist):
+        direct = [chunk for chunk in written if chunk[2] is not None]
+        if direct:
+            await storage_io.run(commit_direct_chunks, session_id, direct)
+        session, header_changed = merge_custom_session(
+            await fetch_session_info(session_id), total_chunks, recording_name, format
+        )
+        for chunk_index, size, _ in written:
+            session['uploaded_chunks'].add(chunk_index)
+            session['chunk_sizes'][str(chunk_index)] = size
+            record_chunk(session_id, session, chunk_index, size)
+        if header_changed:
+            save_session_header(session_id, session)
+        if written:
+            metrics.ingested_bytes.inc(total, (endpoint,))
+            metrics.chunks_received.inc(len(written), (endpoint,))
+            log.info("chunk_saved" if len(written) == 1 else "batch_saved", "Saved chunk batch",
+                     session_id=session_id, chunks=len(written), size=total, endpoint=endpoint)
+        
+        if session['total_chunks'] > 0 and len(session['uploaded_chunks']) == session['total_chunks']:
+            log.info("upload_complete", "All chunks uploaded, triggering assembly", session_id=session_id, endpoint=endpoint)
+            await storage_io.run(save_session_info, session_id, session)
+            await request_assembly(background_tasks, session_id, session['recording_name'], session['format'])
+        elif written and INCREMENTAL_ASSEMBLY and STORAGE_MODE == "chunks":
+            background_tasks.add_task(extend_partial_recording, session_id)
+    return session
+
+
+# Background work started by upload streams, referenced until it finishes
+stream_tasks = set()
+
+
+@router.websocket("/ws/upload/{session_id}")
+async def upload_stream(
+    websocket: WebSocket,
+    session_id: str,
+    total_chunks: Optional[int] = None,
+    recording_name: Optional[str] = None,
+    format: Optional[str] = None
+):
+    """
+    Streaming ingestion for live recordings over one WebSocket per session.
+    
+    Binary messages hold one or more chunk records in the batch framing
+    (routes/chunk_batch.py) and are stored and committed like a batch
+    upload, into the same session and chunk layout. Each is answered with
+    
+        {"type": "ack", "results": [...], "contiguous_chunks": N, "durable_offset": bytes}
+    
+    once the chunk data and the session are written to disk, so every
+    "chunk_received"/"chunk_already_exists" result survives a restart, and
+    chunks 0..N-1 (durable_offset bytes) are the in-order prefix the client
+    may trim from its local queue. Text messages are JSON metadata updates,
+    e.g. {"type": "metadata", "totalChunks": 120} when recording stops,
+    which start assembly once every chunk is stored. Bad records are
+    answered with {"type": "error", ...} after the records before them are
+    acked. If the session cannot be updated (e.g. 503 while another replica
+    holds its lease) the error carries the status and no results, so the
+    client keeps the chunks for a retry. The connection stays open either way.
+    """
+    await websocket.accept()
+    metadata = {"total_chunks": total_chunks, "recording_name": recording_name, "format": format}
+    contiguous = 0
+    durable_offset = 0
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            background_tasks = BackgroundTasks()
+            results = []
+            written = []
+            reply = None
+            
+            if message.get("bytes") is not None:
+                try:
+                    await store_chunk_records(session_id, FrameReader.from_bytes(message["bytes"]), results, written)
+                except FramingError as e:
+                    reply = {"type": "error", "detail": str(e)}
+                except HTTPException as e:
+                    reply = {"type": "error", "detail": e.detail}
+            else:
+                try:
+                    update = json.loads(message.get("text") or "")
+                    if update.get("totalChunks") is not None:
+                        metadata["total_chunks"] = int(update["totalChunks"])
+                    metadata["recording_name"] = update.get("recordingName", metadata["recording_name"])
+                    metadata["format"] = update.get("format", metadata["format"])
+                except (ValueError, TypeError, AttributeError):
+                    await websocket.send_json({"type": "error", "detail": "Expected a JSON metadata object"})
+                    continue
+            
+            try:
+                session = await commit_chunk_batch(
+                    background_tasks, session_id, written, endpoint="upload_ws", persist=True, **metadata
+                )
+            except HTTPException as e:
+                # Stored chunk files are not recorded: nothing is acked, a resend records them
+                log.warning("stream_commit_failed", "Upload stream commit failed", session_id=session_id,
+                            chunks=len(written), status=e.status_code, error=e.detail)
+                reply = {"type": "error", "status": e.status_code, "detail": e.detail}
+                results = []
+                session = None
+            if session is not None:
+                while contiguous in session['uploaded_chunks']:
+                    durable_offset += session['chunk_sizes'].get(str(contiguous)) or 0
+                    contiguous += 1
+            
+            await websocket.send_json({
+                **(reply or {"type": "ack"}),
+                "results": results,
+                "contiguous_chunks": contiguous,
+                "durable_offset": durable_offset
+            })
+            if background_tasks.tasks:
+                # Assembly runs detached so the stream keeps flowing
+                task = asyncio.create_task(background_tasks())
+                stream_tasks.add(task)
+                task.add_done_callback(stream_tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    
+    log.info("stream_closed", "Upload stream closed", session_id=session_id, chunks=contiguous, size=durable_offset)
+
+
 @router.get("/api/verify/{session_id}/{chunk_index}")
 async def verify_chunk(session_id: str, chunk_index: int):
     """
@@ -532,10 +1680,15 @@ async def verify_chunk(session_id: str, chunk_index: int):
     Used by Service Worker before removing from local queue.
     """
     chunk_id = str(chunk_index)
-    chunk_path = get_chunk_path(session_id, chunk_id)
+    size = None
+    if STORAGE_MODE == "direct":
+        chunk_path = get_direct_file(session_id).data_path
+        size = direct_chunk_size(await fetch_session_info(session_id), chunk_id)
+    if size is None:
+        chunk_path = await storage_io.run(get_chunk_path, session_id, chunk_id)
+        size = await storage_io.run(existing_size, chunk_path)
     
-    if chunk_path.exists():
-        size = chunk_path.stat().st_size
+    if size is not None:
         return {
             "exists": True,
             "session_id": session_id,
@@ -549,3 +1702,59 @@ async def verify_chunk(session_id: str, chunk_index: int):
         "session_id": session_id,
         "chunk_index": chunk_index
     }
+
+
+def parse_chunk_indices(spec: str, limit: int) -> list:
+    """
+    Parse a chunk index list such as "0-99,120,130-140" (ranges inclusive).
+    Raises ValueError if it is malformed or names more than `limit` indices.
+    """
+    indices = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        start = int(first)
+        end = int(last) if sep else start
+        if start < 0 or end < start:
+            raise ValueError(f"Invalid chunk range {part!r}")
+        if len(indices) + (end - start + 1) > limit:
+            raise ValueError(f"More than {limit} chunk indices")
+        indices.extend(range(start, end + 1))
+    return indices
+
+
+@router.get("/api/verify/{session_id}")
+async def verify_chunks(session_id: str, chunks: str = Query(..., description='Indices, e.g. "0-99,120"')):
+    """
+    Batch verify: which of the given chunks the server has, and their sizes.
+    Answered from the session state without touching chunk files, so the
+    Service Worker can confirm a whole queue in a few requests. The Service
+    Worker drops its copies of reported chunks, so pending write-behind state
+    is persisted first (503 if another replica holds the session).
+    """
+    try:
+        indices = parse_chunk_indices(chunks, VERIFY_BATCH_MAX)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    session = await fetch_session_info(session_id)
+    if session and session_cache.is_dirty(get_session_store(session_id)):
+        async with locked_session(session_id, persist=True):
+            session = await fetch_session_info(session_id)
+    uploaded = session['uploaded_chunks'] if session else set()
+    sizes = session['chunk_sizes'] if session else {}
+    present = {}
+    missing = []
+    for index in indices:
+        if index in uploaded:
+            present[str(index)] = sizes.get(str(index))
+        else:
+            missing.append(index)
+    
+    return {
+        "session_id": session_id,
+        "chunks": present,
+        "missing": missing
+    }
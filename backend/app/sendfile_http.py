@@ -0,0 +1,172 @@
+"""
+Zero-Copy HTTP Protocols
+uvicorn HTTP protocols offering the ASGI zerocopysend and pathsend extensions
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+import h11
+import uvicorn
+from uvicorn.protocols.http.h11_impl import H11Protocol
+
+try:
+    from uvicorn.protocols.http.httptools_impl import HttpToolsProtocol
+except ImportError:  # pragma: no cover - httptools is optional
+    HttpToolsProtocol = None
+
+from observability import get_logger
+
+ZEROCOPY_EXTENSIONS = ("http.response.zerocopysend", "http.response.pathsend")
+# uvicorn releases (min inclusive, max exclusive) these protocols were tested
+# with; they use private attributes of uvicorn's request cycle
+TESTED_UVICORN = ((0, 38), (0, 39))
+
+log = get_logger("sendfile")
+
+
+def uvicorn_supported(version: str = uvicorn.__version__) -> bool:
+    """True if the installed uvicorn is a release these protocols were tested with"""
+    try:
+        release = tuple(int(part) for part in version.split(".")[:2])
+    except ValueError:
+        return False
+    return TESTED_UVICORN[0] <= release < TESTED_UVICORN[1]
+
+
+def sendfile_supported(loop: asyncio.AbstractEventLoop) -> bool:
+    """
+    loop.sendfile() only works on the asyncio loop (sendfile(2) for plain
+    TCP, a read/write fallback for TLS); uvloop raises NotImplementedError.
+    """
+    return isinstance(loop, asyncio.BaseEventLoop)
+
+
+class _FileSpan:
+    """Stands in for a file range in h11's data passthrough (only its length is used)"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SendfileMixin:
+    """
+    Adds the extensions to every request cycle of a uvicorn protocol.
+
+    A zerocopysend message ({"file", "offset", "count", "more_body"}) or a
+    pathsend message ({"path"}) is framed like a body message of `count`
+    bytes, then the file range goes to the socket with loop.sendfile(), so
+    the bytes never enter Python. Completion, keep-alive and pipelining are
+    left to uvicorn by finishing with an empty body message.
+
+    If a request cycle lacks the private attributes this relies on (a
+    uvicorn change), the extensions are not offered and responses take the
+    stock path.
+    """
+
+    cycle_attributes = ("scope", "send", "flow", "response_started", "response_complete", "disconnected")
+    cycle_compatible: Optional[bool] = None  # Decided on the first request of each protocol class
+
+    def _enable_sendfile(self):
+        cycle = self.cycle
+        if cycle is None or getattr(cycle, "sendfile_enabled", False) or not sendfile_supported(self.loop):
+            return
+        cls = type(self)
+        compatible = cls.__dict__.get("cycle_compatible")  # Not inherited: subclasses check their own cycles
+        if compatible is None:
+            compatible = cls.cycle_compatible = all(hasattr(cycle, name) for name in cls.cycle_attributes)
+            if not compatible:
+                log.warning("sendfile_unsupported", "uvicorn request cycle changed, serving files without zero-copy",
+                            protocol=cls.__name__, uvicorn=uvicorn.__version__)
+        if not compatible:
+            return
+        cycle.sendfile_enabled = True
+        extensions = cycle.scope.setdefault("extensions", {})
+        for name in ZEROCOPY_EXTENSIONS:
+            extensions[name] = {}
+        send_message = cycle.send
+
+        async def send(message):
+            if message["type"] == "http.response.pathsend":
+                f = await self.loop.run_in_executor(None, open, message["path"], "rb")
+                try:
+                    await self._send_file(cycle, send_message, f, 0, os.fstat(f.fileno()).st_size, False)
+                finally:
+                    f.close()
+            elif message["type"] == "http.response.zerocopysend":
+                f = message["file"]
+                offset = message.get("offset")
+                if offset is None:
+                    offset = os.lseek(f.fileno(), 0, os.SEEK_CUR)
+                count = message.get("count")
+                if count is None:
+                    count = os.fstat(f.fileno()).st_size - offset
+                await self._send_file(cycle, send_message, f, offset, count, message.get("more_body", False))
+            else:
+                await send_message(message)
+
+        cycle.send = send
+
+    async def _send_file(self, cycle, send_message, f, offset: int, count: int, more_body: bool):
+        if not cycle.response_started or cycle.response_complete:
+            raise RuntimeError("File body sent outside of a response body")
+        if cycle.flow.write_paused and not cycle.disconnected:
+            await cycle.flow.drain()
+        if cycle.disconnected or self.transport.is_closing():
+            return
+        if count > 0 and cycle.scope["method"] != "HEAD":
+            prefix, suffix = self._frame_file(cycle, count)
+            if prefix:
+                self.transport.write(prefix)
+            try:
+                await self.loop.sendfile(self.transport, f, offset, count)
+            except ConnectionError:
+                return  # Client went away; connection_lost() cleans up
+            if suffix:
+                self.transport.write(suffix)
+        await send_message({"type": "http.response.body", "body": b"", "more_body": more_body})
+
+    def _frame_file(self, cycle, count: int):
+        """Transfer framing (before, after) for `count` body bytes"""
+        raise NotImplementedError
+
+
+class SendfileH11Protocol(SendfileMixin, H11Protocol):
+    """h11 protocol with zero-copy file bodies"""
+
+    cycle_attributes = SendfileMixin.cycle_attributes + ("conn",)
+
+    def handle_events(self):
+        super().handle_events()
+        self._enable_sendfile()
+
+    def _frame_file(self, cycle, count: int):
+        span = _FileSpan(count)
+        pieces = cycle.conn.send_with_data_passthrough(h11.Data(data=span))
+        at = next(i for i, piece in enumerate(pieces) if piece is span)
+        return b"".join(pieces[:at]), b"".join(pieces[at + 1:])
+
+
+if HttpToolsProtocol is not None:
+    class SendfileHttpToolsProtocol(SendfileMixin, HttpToolsProtocol):
+        """httptools protocol with zero-copy file bodies"""
+
+        cycle_attributes = SendfileMixin.cycle_attributes + ("chunked_encoding", "expected_content_length")
+
+        def on_headers_complete(self):
+            super().on_headers_complete()
+            self._enable_sendfile()
+
+        def _frame_file(self, cycle, count: int):
+            if cycle.chunked_encoding:
+                return b"%x\r\n" % count, b"\r\n"
+            if count > cycle.expected_content_length:
+                raise RuntimeError("Response content longer than Content-Length")
+            cycle.expected_content_length -= count
+            return b"", b""
+else:  # pragma: no cover
+    SendfileHttpToolsProtocol = None
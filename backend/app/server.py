@@ -1,19 +1,22 @@
+import asyncio
 import os
 import shutil
 import json
 import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pathlib import Path
-from starlette.middleware.base import BaseHTTPMiddleware
 
 # Import routers
 from routes import tus_upload, recording_complete
+from routes.frontend_assets import AssetBundle
+from observability import MetricsMiddleware, monitor_event_loop, registry, stats_collector
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -26,31 +29,71 @@ SECRET_KEY = os.getenv("SECRET_KEY", "default_insecure_key_for_dev") # WARN: Cha
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1048576"))  # Default 1MB
 TUS_CHUNK_SIZE = int(os.getenv("TUS_CHUNK_SIZE", "524288"))  # Default 512KB for TUS sub-chunks
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tus_upload.bind_event_loop()
+    session_flusher = asyncio.create_task(tus_upload.run_session_flusher())
+    loop_monitor = asyncio.create_task(monitor_event_loop())
+    tus_upload.start_assembly_queue()
+    await tus_upload.storage_io.run(frontend_assets.build)
+    yield
+    session_flusher.cancel()
+    loop_monitor.cancel()
+    # Unfinished assembly jobs stay in the queue and are recovered on restart
+    # (stopped off the loop: running jobs finish their session update on it)
+    await tus_upload.storage_io.run(tus_upload.assembly_queue.stop)
+    # Persist write-behind session state before the worker exits
+    await tus_upload.maintain_session_leases(release_all=True)
+    await tus_upload.storage_io.run(tus_upload.session_cache.flush_all)
+    tus_upload.storage_io.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Security headers added to every response
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; font-src 'self' data:; img-src 'self' data:; media-src 'self' blob: data:; connect-src 'self';",
+}
 
 # Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; font-src 'self' data:; img-src 'self' data:; media-src 'self' blob: data:; connect-src 'self';"
-        return response
+class SecurityHeadersMiddleware:
+    """
+    Pure ASGI middleware: the header pairs are encoded once and appended
+    to http.response.start, replacing same-named headers. Bodies (streamed
+    uploads and downloads, pathsend) pass through untouched.
+    """
 
-app.add_middleware(SecurityHeadersMiddleware)
+    def __init__(self, app, headers: dict = SECURITY_HEADERS):
+        self.app = app
+        self.raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        self.names = {name for name, _ in self.raw_headers}
 
-# 1. Trusted Host Middleware
-app.add_middleware(
-    TrustedHostMiddleware, 
-    allowed_hosts=ALLOWED_HOSTS
-)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in self.names]
+                headers.extend(self.raw_headers)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 # Include routers
 app.include_router(tus_upload.router, tags=["TUS Upload"])
 app.include_router(recording_complete.router, tags=["Recording"])
 
+# Middleware, added innermost first. Requests pass through:
+#   metrics -> trusted host -> security headers -> CORS -> routes
+# so a bad Host is rejected before any other work, and CORS preflights
+# answered by CORSMiddleware still get the security headers.
+
 # 2. CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -58,9 +101,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS", "HEAD", "PATCH", "DELETE"], # Restrict methods but allow TUS methods
     allow_headers=["*"],
-    expose_headers=["Upload-Offset", "Upload-Length", "Tus-Resumable", "Location"],
+    expose_headers=["Upload-Offset", "Upload-Length", "Tus-Resumable", "Tus-Version", "Tus-Extension", "Tus-Max-Size", "Location", "Content-Range", "Accept-Ranges", "ETag"],
 )
 
+# Security headers (see SecurityHeadersMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
+
+# 1. Trusted Host Middleware
+app.add_middleware(
+    TrustedHostMiddleware, 
+    allowed_hosts=ALLOWED_HOSTS
+)
+
+# 4. Request metrics (outermost, so latency includes all middleware)
+app.add_middleware(MetricsMiddleware)
+
 # 3. Storage Configuration
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 UPLOAD_DIR = BASE_DIR / "backend" / "uploaded_data"
@@ -94,6 +149,34 @@ async def health_check():
     """
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
+# Prometheus scrape endpoint (see prometheus.io/* annotations in the production overlay)
+registry.register(stats_collector(
+    "waveforge_storage_io", tus_upload.storage_io.stats,
+    counters=("completed", "wait_seconds_total", "run_seconds_total")
+))
+registry.register(stats_collector(
+    "waveforge_sessions", tus_upload.session_cache.stats,
+    counters=("hits", "misses", "evictions", "flushes")
+))
+registry.register(stats_collector(
+    "waveforge_session_leases", tus_upload.session_leases.stats,
+    counters=("acquired", "contended", "failed", "wait_seconds_total")
+))
+registry.register(stats_collector(
+    "waveforge_assembly_engine", tus_upload.assembly_engine.stats,
+    counters=("assemblies", "bytes", "duration_seconds_total")
+))
+registry.register(stats_collector(
+    "waveforge_assembly_queue", lambda: tus_upload.assembly_queue.stats(),
+    counters=("completed", "failed", "retried", "wait_seconds_total", "run_seconds_total")
+))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of all registered metrics"""
+    content = await tus_upload.storage_io.run(registry.render)
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
 # NOTE: /recording/complete endpoint is now handled by routes/recording_complete.py
 # This avoids duplication and uses the router-based implementation which supports
 # both sharded storage (Service Worker uploads) and TUS uploads
@@ -102,55 +185,59 @@ async def health_check():
 # Mount static assets (favicon, etc.)
 app.mount("/assets", StaticFiles(directory=str(STATIC_DIR)), name="assets")
 
-# Serve index.html and sw.js from frontend/src
+frontend_assets = AssetBundle(
+    {
+        "/": (FRONTEND_SRC / "index.html", "text/html"),
+        "/sw.js": (FRONTEND_SRC / "sw.js", "application/javascript"),
+        "/tus-upload-manager.js": (FRONTEND_SRC / "tus-upload-manager.js", "application/javascript"),
+        "/manifest.json": (FRONTEND_SRC / "manifest.json", "application/json"),
+        "/favicon.svg": (STATIC_DIR / "favicon.svg", "image/svg+xml"),
+        "/tus.min.js": (FRONTEND_SRC / "tus.min.js", "application/javascript"),
+        "/tailwind.min.js": (FRONTEND_SRC / "tailwind.min.js", "application/javascript"),
+        "/fonts.css": (FRONTEND_SRC / "fonts.css", "text/css"),
+    },
+    entrypoints=["/"],
+    hashed=["/tus-upload-manager.js", "/tus.min.js", "/tailwind.min.js", "/fonts.css"]
+)
+
+# Serve index.html and sw.js from frontend/src (held in memory, precompressed)
 @app.get("/")
-async def serve_index():
-    return FileResponse(FRONTEND_SRC / "index.html")
+async def serve_index(request: Request):
+    return frontend_assets.response(request, "/")
 
 @app.get("/sw.js")
-async def serve_service_worker():
-    return FileResponse(FRONTEND_SRC / "sw.js", media_type="application/javascript")
+async def serve_service_worker(request: Request):
+    return frontend_assets.response(request, "/sw.js")
 
 @app.get("/tus-upload-manager.js")
-async def serve_tus_upload_manager():
-    return FileResponse(FRONTEND_SRC / "tus-upload-manager.js", media_type="application/javascript")
+async def serve_tus_upload_manager(request: Request):
+    return frontend_assets.response(request, "/tus-upload-manager.js")
 
 @app.get("/manifest.json")
-async def serve_manifest():
-    return FileResponse(FRONTEND_SRC / "manifest.json", media_type="application/json")
+async def serve_manifest(request: Request):
+    return frontend_assets.response(request, "/manifest.json")
 
 @app.get("/favicon.svg")
-async def serve_favicon():
-    return FileResponse(STATIC_DIR / "favicon.svg", media_type="image/svg+xml")
+async def serve_favicon(request: Request):
+    return frontend_assets.response(request, "/favicon.svg")
 
 @app.get("/tus.min.js")
-async def serve_tus_client():
-    return FileResponse(FRONTEND_SRC / "tus.min.js", media_type="application/javascript")
+async def serve_tus_client(request: Request):
+    return frontend_assets.response(request, "/tus.min.js")
 
 @app.get("/tailwind.min.js")
-async def serve_tailwind():
-    return FileResponse(FRONTEND_SRC / "tailwind.min.js", media_type="application/javascript")
+async def serve_tailwind(request: Request):
+    return frontend_assets.response(request, "/tailwind.min.js")
 
 @app.get("/fonts.css")
-async def serve_fonts_css():
-    return FileResponse(FRONTEND_SRC / "fonts.css", media_type="text/css")
+async def serve_fonts_css(request: Request):
+    return frontend_assets.response(request, "/fonts.css")
 
 # Serve font files
 app.mount("/fonts", StaticFiles(directory=str(FRONTEND_SRC / "fonts")), name="fonts")
 
 if __name__ == "__main__":
-    import uvicorn
-    print("--- WAVEFORGE PRO SERVER ---")
-    print(f"Frontend Source: {FRONTEND_SRC.absolute()}")
-    print(f"Static Assets:   {STATIC_DIR.absolute()}")
-    print(f"Storage Path:    {UPLOAD_DIR.absolute()}")
-    print("")
-    print("🌐 Server URLs:")
-    print("   Local:   http://localhost:8000")
-    print("   Network: http://0.0.0.0:8000")
-    print("")
-    print("📝 Note: In production, use HTTPS with TLS/SSL certificates")
-    print("         (automatically handled by Kubernetes Ingress)")
-    
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
-    
\ No newline at end of file
+    # `python server.py` (start.sh, docs) runs the production launcher; use
+    # `uvicorn server:app --reload` for auto-reload during development
+    import launcher
+    launcher.main()
@@ -0,0 +1,22 @@
+"""
+Storage package initialization
+Session state persistence used by the upload routes
+"""
+
+from .session_journal import SessionJournal
+from .session_cache import SessionCache
+from .session_locks import SessionLockRegistry, SingleFlight
+from .session_leases import Lease, LeaseManager, LeaseUnavailable
+from .io_executor import IOExecutor
+from .direct_store import DirectDataFile, PositionalWriter
+from .assembly import AssemblyEngine
+from .assembly_queue import AssemblyQueue
+from .partial_recording import PartialRecording
+from .recording_manifest import RecordingManifest
+
+__all__ = [
+    'SessionJournal', 'SessionCache', 'SessionLockRegistry', 'SingleFlight',
+    'Lease', 'LeaseManager', 'LeaseUnavailable', 'IOExecutor',
+    'DirectDataFile', 'PositionalWriter', 'AssemblyEngine', 'AssemblyQueue',
+    'PartialRecording', 'RecordingManifest',
+]
@@ -0,0 +1,189 @@
+"""
+Recording Assembly Engine
+Copies chunk byte ranges into the final recording with kernel-side copies
+"""
+
+import errno
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from observability import get_logger
+
+log = get_logger("assembly")
+
+# Errors meaning "this copy method is not supported here", as opposed to real I/O failures
+FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF}
+
+
+class AssemblyEngine:
+    """
+    Concatenates (path, offset, size) sources into one output file.
+
+    Copies are tried with os.copy_file_range first (in-kernel, and a reflink
+    or server-side copy on filesystems that support it), then os.sendfile,
+    then a buffered pread/pwrite loop. Once a method is unsupported it is not
+    retried for the rest of the assembly. Each copy() returns the method(s)
+    used, worker threads, bytes, duration and throughput; totals are kept
+    for stats().
+    """
+
+    METHODS = ("copy_file_range", "sendfile", "buffered")
+
+    def __init__(self, methods: Tuple[str, ...] = METHODS, buffer_size: int = 1024 * 1024,
+                 workers: int = 1, parallel_min_bytes: int = 64 * 1024 * 1024):
+        self.methods = [m for m in methods if m == "buffered" or hasattr(os, m)]
+        if "buffered" not in self.methods:
+            self.methods.append("buffered")
+        self.buffer_size = buffer_size
+        self.workers = max(1, workers)
+        self.parallel_min_bytes = parallel_min_bytes
+        self._lock = threading.Lock()
+        self._assemblies = 0
+        self._bytes = 0
+        self._duration = 0.0
+        self._by_method: Dict[str, int] = {}
+
+    def copy(self, sources: List[Tuple[Path, int, int]], output_path: Path,
+             progress: Optional[Callable[[int], None]] = None, offset: int = 0) -> dict:
+        """
+        Write all sources, in order, to output_path starting at `offset`
+        (anything after it is discarded; 0 rewrites the file).
+        progress(i) is called before source i (e.g. to renew a lease).
+
+        With workers > 1 and at least parallel_min_bytes to copy, output
+        offsets are computed from the source sizes (prefix sum), the file is
+        preallocated, and disjoint ranges are filled concurrently.
+        """
+        started = time.perf_counter()
+        total = sum(size for _, _, size in sources)
+        out_fd = os.open(output_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(out_fd, offset)
+        finally:
+            os.close(out_fd)
+        
+        # (index, path, source offset, size, output offset) for every source
+        jobs = []
+        position = offset
+        for i, (path, src_offset, size) in enumerate(sources):
+            jobs.append((i, path, src_offset, size, position))
+            position += size
+        
+        workers = min(self.workers, len(jobs))
+        if workers > 1 and total >= self.parallel_min_bytes:
+            self._preallocate(output_path, offset, total)
+            used = self._copy_parallel(jobs, output_path, workers, total, progress)
+        else:
+            workers = 1
+            used = self._copy_jobs(jobs, output_path, progress)
+        
+        return self.record("+".join(used) or self.methods[0], total, time.perf_counter() - started, workers)
+
+    def record(self, method: str, size: int, duration: float, workers: int = 1) -> dict:
+        """Account for one assembly and return its report"""
+        with self._lock:
+            self._assemblies += 1
+            self._bytes += size
+            self._duration += duration
+            self._by_method[method] = self._by_method.get(method, 0) + 1
+        return {
+            "method": method,
+            "bytes": size,
+            "workers": workers,
+            "duration_s": round(duration, 3),
+            "mb_per_s": round(size / (1024 * 1024) / duration, 1) if duration > 0 else 0.0
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "assemblies": self._assemblies,
+                "bytes": self._bytes,
+                "duration_seconds_total": self._duration,
+                "by_method": dict(self._by_method)
+            }
+
+    def _copy_parallel(self, jobs, output_path: Path, workers: int, total: int, progress) -> List[str]:
+        # Contiguous groups of roughly total/workers bytes keep each thread sequential on disk
+        groups = [[]]
+        target = total / workers
+        filled = 0
+        for job in jobs:
+            if filled >= target * len(groups) and len(groups) < workers:
+                groups.append([])
+            groups[-1].append(job)
+            filled += job[3]
+        
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="assembly-copy") as pool:
+            results = [pool.submit(self._copy_jobs, group, output_path, progress) for group in groups]
+            used = []
+            for result in results:
+                for method in result.result():
+                    if method not in used:
+                        used.append(method)
+        return used
+
+    def _copy_jobs(self, jobs, output_path: Path, progress) -> List[str]:
+        """Copy jobs with positional writes through a private output descriptor"""
+        methods = list(self.methods)
+        used = []
+        out_fd = os.open(output_path, os.O_WRONLY)
+        try:
+            for i, path, src_offset, size, dst_offset in jobs:
+                if progress is not None:
+                    progress(i)
+                in_fd = os.open(path, os.O_RDONLY)
+                try:
+                    copied = 0
+                    while copied < size:
+                        method = methods[0]
+                        try:
+                            count = self._copy(method, in_fd, out_fd, src_offset + copied, dst_offset + copied, size - copied)
+                        except OSError as e:
+                            if method == "buffered" or e.errno not in FALLBACK_ERRNOS:
+                                raise
+                            log.warning(
+                                "assembly_fallback", "Copy method unavailable, falling back",
+                                method=method, fallback=methods[1], error=e.strerror
+                            )
+                            methods.pop(0)
+                            continue
+                        if count == 0:
+                            raise IOError(f"Unexpected end of {path}, {size - copied} bytes short")
+                        copied += count
+                        if method not in used:
+                            used.append(method)
+                finally:
+                    os.close(in_fd)
+        finally:
+            os.close(out_fd)
+        return used
+
+    def _preallocate(self, output_path: Path, offset: int, length: int):
+        fd = os.open(output_path, os.O_WRONLY)
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, offset, length)
+                    return
+                except OSError:
+                    pass  # Filesystem without fallocate support
+            os.ftruncate(fd, offset + length)
+        finally:
+            os.close(fd)
+
+    def _copy(self, method: str, in_fd: int, out_fd: int, src_offset: int, dst_offset: int, count: int) -> int:
+        if method == "copy_file_range":
+            return os.copy_file_range(in_fd, out_fd, count, src_offset, dst_offset)
+        if method == "sendfile":
+            os.lseek(out_fd, dst_offset, os.SEEK_SET)
+            return os.sendfile(out_fd, in_fd, src_offset, count)
+        data = os.pread(in_fd, min(count, self.buffer_size), src_offset)
+        done = 0
+        while done < len(data):
+            done += os.pwrite(out_fd, data[done:], dst_offset + done)
+        return len(data)
@@ -0,0 +1,309 @@
+"""
+Durable Assembly Queue
+SQLite-backed job queue with a bounded worker pool, retries and recovery
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from observability import get_logger
+
+log = get_logger("assembly_queue")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rerun INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    owner TEXT,
+    heartbeat REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (state, run_after);
+"""
+
+
+class AssemblyQueue:
+    """
+    Persistent job queue, one job per key (session), stored in SQLite.
+
+    enqueue() is idempotent per key: a queued job is only made runnable now,
+    and a running job is flagged to run once more when it finishes. Worker
+    threads claim jobs in a write transaction, so several processes can share
+    one database. Failed jobs are retried with exponential backoff up to
+    max_attempts and then kept with state 'failed'.
+
+    Running jobs carry a heartbeat. Jobs whose heartbeat went stale (owner
+    died) or that belonged to this owner before a restart are re-queued.
+    """
+
+    def __init__(self, handler: Callable[[str, dict], None], workers: int = 2, max_attempts: int = 5,
+                 retry_backoff: float = 5.0, retry_backoff_max: float = 300.0,
+                 poll_interval: float = 1.0, stale_after: float = 60.0, owner_id: Optional[str] = None):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        # Stable across an in-place container restart, distinct per worker process
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.db_path: Optional[Path] = None
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    def open(self, db_path: Path):
+        """Create the database if needed (no workers are started)"""
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def start(self, db_path: Path):
+        """Open the database, recover orphaned jobs and start the worker threads"""
+        self.open(db_path)
+        recovered = self.recover(include_own=True)
+        if recovered:
+            log.info("queue_recovered", "Recovered interrupted assembly jobs", jobs=recovered)
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"assembly-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._supervise, name="assembly-supervisor", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the workers. Jobs still running after `timeout` stay marked as
+        running and are recovered on the next start.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def enqueue(self, key: str, payload: dict) -> bool:
+        """Queue a job for key. Returns False if one was already queued or running."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT state FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] == 'failed':
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs (key, payload, state, attempts, rerun, enqueued_at, run_after) "
+                    "VALUES (?, ?, 'queued', 0, 0, ?, ?)",
+                    (key, json.dumps(payload), now, now)
+                )
+                created = True
+            elif row[0] == 'queued':
+                # Waiting on a retry backoff: new information, so run it now
+                conn.execute(
+                    "UPDATE jobs SET payload = ?, run_after = MIN(run_after, ?) WHERE key = ?",
+                    (json.dumps(payload), now, key)
+                )
+                created = False
+            else:
+                conn.execute("UPDATE jobs SET payload = ?, rerun = 1 WHERE key = ?", (json.dumps(payload), key))
+                created = False
+        self._wakeup.set()
+        return created
+
+    def recover(self, include_own: bool = False) -> int:
+        """Re-queue running jobs with a stale heartbeat (and our own, after a restart)"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL, run_after = ? "
+                "WHERE state = 'running' AND (heartbeat < ? OR (? AND owner = ?))",
+                (now, now - self.stale_after, include_own, self.owner_id)
+            )
+            return cursor.rowcount
+
+    def job(self, key: str) -> Optional[dict]:
+        """Current row for key, None if there is no job"""
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def run_pending(self) -> int:
+        """Run runnable jobs on the calling thread until none are left; returns jobs run"""
+        count = 0
+        while self._run_one():
+            count += 1
+        return count
+
+    def stats(self) -> dict:
+        depth = 0
+        if self.db_path is not None:
+            conn = self._connect()
+            try:
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+            finally:
+                conn.close()
+        with self._lock:
+            return {
+                "queue_depth": depth,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_max": self._wait_max,
+                "run_seconds_total": self._run_total,
+                "run_seconds_max": self._run_max
+            }
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                if self._run_one():
+                    continue
+            except sqlite3.Error as e:
+                log.error("queue_db_error", "Database error", error=str(e))
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _supervise(self):
+        interval = max(self.poll_interval, self.stale_after / 3)
+        while not self._stop.wait(interval):
+            try:
+                with self._transaction() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat = ? WHERE state = 'running' AND owner = ?",
+                        (time.time(), self.owner_id)
+                    )
+                if self.recover():
+                    self._wakeup.set()
+            except sqlite3.Error as e:
+                log.error("queue_db_error", "Database error", error=str(e))
+
+    def _run_one(self) -> bool:
+        job = self._claim()
+        if job is None:
+            return False
+        key, payload, attempts, waited = job
+        with self._lock:
+            self._running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        started = time.perf_counter()
+        error = None
+        try:
+            self.handler(key, payload)
+        except Exception as e:
+            error = e
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._running -= 1
+            self._run_total += elapsed
+            self._run_max = max(self._run_max, elapsed)
+        if error is None:
+            self._finish(key)
+        else:
+            self._fail(key, attempts, error)
+        return True
+
+    def _claim(self):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT key, payload, attempts, run_after FROM jobs "
+                "WHERE state = 'queued' AND run_after <= ? ORDER BY run_after LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            key, payload, attempts, run_after = row
+            conn.execute(
+                "UPDATE jobs SET state = 'running', owner = ?, heartbeat = ?, attempts = ?, rerun = 0 "
+                "WHERE key = ?",
+                (self.owner_id, now, attempts + 1, key)
+            )
+        return key, json.loads(payload), attempts + 1, now - run_after
+
+    def _finish(self, key: str):
+        with self._transaction() as conn:
+            # A job enqueued again while running goes back to the queue
+            conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, run_after = ? "
+                "WHERE key = ? AND owner = ? AND state = 'running' AND rerun = 1",
+                (time.time(), key, self.owner_id)
+            )
+            conn.execute("DELETE FROM jobs WHERE key = ? AND owner = ? AND state = 'running'", (key, self.owner_id))
+        with self._lock:
+            self._completed += 1
+
+    def _fail(self, key: str, attempts: int, error: Exception):
+        if attempts >= self.max_attempts:
+            log.error(
+                "queue_job_failed", "Assembly job failed, giving up", key=key, attempts=attempts, error=str(error)
+            )
+            state, run_after = 'failed', time.time()
+            with self._lock:
+                self._failed += 1
+        else:
+            delay = min(self.retry_backoff_max, self.retry_backoff * 2 ** (attempts - 1))
+            log.warning(
+                "queue_job_retry", "Assembly job failed, retrying",
+                key=key, attempts=attempts, delay_s=delay, error=str(error)
+            )
+            state, run_after = 'queued', time.time() + delay
+            with self._lock:
+                self._retried += 1
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, run_after = ?, last_error = ?, owner = NULL "
+                "WHERE key = ? AND owner = ? AND state = 'running'",
+                (state, run_after, str(error), key, self.owner_id)
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db_path is None:
+            raise RuntimeError("Assembly queue is not open")
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
@@ -0,0 +1,144 @@
+"""
+Direct Session Data File
+Finished chunks written once, with positional writes, into one per-session file
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DIRECT_DIR = "direct"
+DATA_FILE = "data.bin"
+INDEX_FILE = "index.bin"
+
+RESERVED = 1
+COMMITTED = 2
+
+
+class PositionalWriter:
+    """File-like writer that writes with os.pwrite starting at a fixed offset"""
+
+    def __init__(self, path: Path, offset: int):
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        self.offset = offset
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self.fd, view, self.offset)
+            self.offset += written
+            view = view[written:]
+        return len(data)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectDataFile:
+    """
+    Per-session data file plus a compact binary offset index.
+
+    Space for a chunk is reserved once its size is known, the chunk bytes are
+    written straight to the reserved range, and a commit record marks the
+    range valid. Index records are fixed-size
+    (chunk_index, offset, size, state, end); `end` is the allocation pointer
+    after the record, so reserving only reads the last record.
+
+    When chunks arrive in order the data file already is the final recording
+    and finishing the session is a truncate plus rename. Callers serialize
+    reserve() and commit() per session.
+    """
+
+    RECORD = struct.Struct("<IQIIQ")
+
+    def __init__(self, session_dir: Path, preallocate_bytes: int = 8 * 1024 * 1024):
+        self.dir = session_dir / DIRECT_DIR
+        self.data_path = self.dir / DATA_FILE
+        self.index_path = self.dir / INDEX_FILE
+        self.preallocate_bytes = preallocate_bytes
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def reserve(self, chunk_index: int, size: int) -> int:
+        """Reserve `size` bytes for a chunk and return the offset to write at"""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, 'ab+') as index:
+            offset = self._end(index)
+            end = offset + size
+            self._preallocate(end)
+            index.write(self.RECORD.pack(chunk_index, offset, size, RESERVED, end))
+        return offset
+
+    def open_writer(self, offset: int) -> PositionalWriter:
+        return PositionalWriter(self.data_path, offset)
+
+    def commit(self, chunk_index: int, offset: int, size: int):
+        """Mark a reserved range as holding the complete chunk"""
+        with open(self.index_path, 'ab+') as index:
+            end = self._end(index)
+            index.write(self.RECORD.pack(chunk_index, offset, size, COMMITTED, end))
+
+    def committed(self) -> Dict[int, Tuple[int, int]]:
+        """Map of chunk_index -> (offset, size); the latest commit wins"""
+        chunks = {}
+        try:
+            with open(self.index_path, 'rb') as index:
+                data = index.read()
+        except FileNotFoundError:
+            return chunks
+        usable = len(data) - len(data) % self.RECORD.size
+        for chunk_index, offset, size, state, _ in self.RECORD.iter_unpack(data[:usable]):
+            if state == COMMITTED:
+                chunks[chunk_index] = (offset, size)
+        return chunks
+
+    def finalize_in_place(self, layout: List[Tuple[int, int]], target: Path) -> bool:
+        """
+        Move the data file to `target` if `layout` ((offset, size) per chunk
+        in recording order) is contiguous from offset 0. Returns False when
+        the chunks are out of order and need a copy instead.
+        """
+        expected = 0
+        for offset, size in layout:
+            if offset != expected:
+                return False
+            expected += size
+        os.truncate(self.data_path, expected)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.data_path, target)
+        return True
+
+    def _end(self, index) -> int:
+        index.seek(0, os.SEEK_END)
+        length = index.tell()
+        usable = length - length % self.RECORD.size
+        if usable != length:
+            index.truncate(usable)  # Drop a torn record from a crash
+        if usable == 0:
+            return 0
+        index.seek(usable - self.RECORD.size)
+        return self.RECORD.unpack(index.read(self.RECORD.size))[4]
+
+    def _preallocate(self, end: int):
+        # Grow the data file in large steps to keep it contiguous on disk;
+        # the final truncate trims the unused tail.
+        try:
+            allocated = self.data_path.stat().st_size
+        except FileNotFoundError:
+            allocated = 0
+        if end <= allocated:
+            return
+        length = max(end - allocated, self.preallocate_bytes)
+        fd = os.open(self.data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, allocated, length)
+                    return
+                except OSError:
+                    pass  # Filesystem without fallocate support
+            os.ftruncate(fd, allocated + length)
+        finally:
+            os.close(fd)
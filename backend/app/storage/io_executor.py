@@ -0,0 +1,93 @@
+"""
+Storage I/O Executor
+Bounded thread pool for blocking filesystem calls made from async handlers
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class IOExecutor:
+    """
+    Runs blocking storage calls off the event loop on a dedicated pool.
+
+    The pool is sized separately from the default executor used by Starlette
+    and FastAPI, so slow disk I/O cannot starve sync endpoints or /health,
+    and a burst of storage calls queues here instead of stalling the loop.
+    Queue depth, wait time (submit -> start) and run time are tracked;
+    `observer(call_name, wait, run)` is also called in the worker thread
+    after every call, e.g. to feed latency histograms.
+    """
+
+    def __init__(self, max_workers: int = 8, name: str = "storage-io",
+                 observer: Optional[Callable[[str, float, float], None]] = None):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self.observer = observer
+        self._pool = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                waited = started - submitted
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += elapsed
+                    self._run_max = max(self._run_max, elapsed)
+                if self.observer is not None:
+                    self.observer(getattr(fn, '__name__', 'call'), waited, elapsed)
+
+        return await loop.run_in_executor(self._get_pool(), call)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'queue_depth': self._queued,
+                'running': self._running,
+                'completed': self._completed,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'run_seconds_total': self._run_total,
+                'run_seconds_max': self._run_max,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads; a later run() starts a fresh pool"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._pool
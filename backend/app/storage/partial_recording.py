@@ -0,0 +1,111 @@
+"""
+Incremental Recording Assembly
+Extends a partial recording with the contiguous prefix of received chunks
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from observability import get_logger
+
+from .assembly import AssemblyEngine
+
+log = get_logger("assembly")
+
+PARTIAL_DIR = "assembling"
+PARTIAL_FILE = "recording.part"
+WATERMARK_FILE = "watermark.json"
+
+Source = Tuple[Path, int, int]
+
+
+class PartialRecording:
+    """
+    Partial recording built while a session is still uploading.
+
+    extend() appends chunks watermark, watermark+1, ... for as long as they
+    exist, then persists the watermark ({"chunks": N, "bytes": B}: chunks
+    0..N-1 make up the first B bytes). finish() only has to copy the chunks
+    after the watermark before renaming the file into place.
+
+    The data file is written before the watermark, so a crash leaves at most
+    unaccounted bytes past B, which are truncated on the next write.
+    Callers serialize extend() and finish() per session.
+    """
+
+    def __init__(self, session_dir: Path, engine: AssemblyEngine):
+        self.dir = session_dir / PARTIAL_DIR
+        self.data_path = self.dir / PARTIAL_FILE
+        self.watermark_path = self.dir / WATERMARK_FILE
+        self.engine = engine
+
+    def exists(self) -> bool:
+        return self.watermark_path.exists()
+
+    def watermark(self) -> Tuple[int, int]:
+        """(chunks, bytes) already in the partial recording"""
+        try:
+            with open(self.watermark_path) as f:
+                mark = json.load(f)
+            return mark['chunks'], mark['bytes']
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0, 0
+
+    def extend(self, locate: Callable[[int], Optional[Source]], limit: Optional[int] = None) -> int:
+        """
+        Append the contiguous run of available chunks after the watermark.
+        locate(i) returns chunk i's (path, offset, size) or None if it has not
+        arrived. Returns the number of chunks appended.
+        """
+        chunks, size = self.watermark()
+        sources: List[Source] = []
+        while limit is None or chunks + len(sources) < limit:
+            source = locate(chunks + len(sources))
+            if source is None:
+                break
+            sources.append(source)
+        if not sources:
+            return 0
+        
+        self.dir.mkdir(parents=True, exist_ok=True)
+        report = self.engine.copy(sources, self.data_path, offset=size)
+        self._write_watermark(chunks + len(sources), size + report['bytes'])
+        return len(sources)
+
+    def finish(self, sources: List[Source], target: Path,
+               progress: Optional[Callable[[int], None]] = None) -> Optional[dict]:
+        """
+        Append the chunks after the watermark and move the recording to
+        `target`. Returns the copy report, or None if the partial recording
+        does not match `sources` (e.g. a chunk changed) and was discarded.
+        """
+        chunks, size = self.watermark()
+        prefix_size = sum(length for _, _, length in sources[:chunks])
+        if chunks > len(sources) or prefix_size != size or not self._has_bytes(size):
+            log.warning("partial_stale", "Partial recording is stale, discarding", path=str(self.dir))
+            self.discard()
+            return None
+        
+        report = self.engine.copy(sources[chunks:], self.data_path, progress=progress, offset=size)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.data_path, target)
+        self.discard()
+        return report
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _has_bytes(self, size: int) -> bool:
+        try:
+            return self.data_path.stat().st_size >= size
+        except FileNotFoundError:
+            return size == 0
+
+    def _write_watermark(self, chunks: int, size: int):
+        tmp_path = self.watermark_path.with_name(WATERMARK_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'chunks': chunks, 'bytes': size}, f)
+        os.replace(tmp_path, self.watermark_path)
@@ -0,0 +1,90 @@
+"""
+Recording Manifests
+Virtual recordings described by their chunk segments instead of a copied file
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .assembly import AssemblyEngine
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+Segment = Tuple[Path, int, int]
+
+
+class RecordingManifest:
+    """
+    Manifest standing in for a recording at `recording_path`.
+
+    Lists every segment (path relative to `base_dir`, offset, size) with its
+    cumulative start offset in the recording. The ETag is generated once and
+    stored, so all replicas serve the same validator. materialize() turns the
+    manifest into a real file.
+    """
+
+    def __init__(self, recording_path: Path, base_dir: Path):
+        self.recording_path = recording_path
+        self.base_dir = base_dir
+        self.path = recording_path.with_name(recording_path.name + MANIFEST_SUFFIX)
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def write(self, segments: List[Segment]) -> int:
+        """Write the manifest atomically; returns the recording size"""
+        entries = []
+        start = 0
+        for path, offset, size in segments:
+            entries.append({
+                'path': str(Path(path).relative_to(self.base_dir)),
+                'offset': offset,
+                'size': size,
+                'start': start
+            })
+            start += size
+        manifest = {
+            'size': start,
+            'etag': f'"m-{uuid.uuid4().hex}"',
+            'created_at': datetime.now().isoformat(),
+            'segments': entries
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.path)
+        return start
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def segments(self, manifest: dict) -> List[Segment]:
+        """Absolute (path, offset, size) segments of a loaded manifest"""
+        return [(self.base_dir / e['path'], e['offset'], e['size']) for e in manifest['segments']]
+
+    def materialize(self, engine: AssemblyEngine) -> Optional[dict]:
+        """
+        Copy the segments into the real recording file and drop the manifest.
+        Returns the copy report, None if there is no manifest (anymore).
+        """
+        manifest = self.load()
+        if manifest is None:
+            return None
+        tmp_path = self.recording_path.with_name(self.recording_path.name + ".tmp")
+        try:
+            report = engine.copy(self.segments(manifest), tmp_path)
+            os.replace(tmp_path, self.recording_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self.path.unlink(missing_ok=True)
+        return report
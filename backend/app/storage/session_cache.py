@@ -0,0 +1,267 @@
+"""
+Session State Cache
+Bounded LRU of live session dicts with write-behind persistence
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .session_journal import SessionJournal
+
+
+class _CachedSession:
+    __slots__ = ('store', 'info', 'header_dirty', 'pending_chunks', 'dirty_since', 'flush_lock')
+
+    def __init__(self, store: SessionJournal, info: dict):
+        self.store = store
+        self.info = info
+        self.header_dirty = False
+        self.pending_chunks: List[Tuple[int, int]] = []
+        self.dirty_since: Optional[float] = None
+        self.flush_lock = threading.Lock()
+
+    def mark_dirty(self):
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+
+
+class SessionCache:
+    """
+    Keeps recently used sessions in memory so request handlers can read and
+    mutate them without touching disk.
+
+    Header changes and chunk records are buffered per session and written
+    out together once they are older than `flush_interval` seconds, when the
+    entry is evicted, or when flush() is called explicitly for a state
+    transition. A `flush_interval` of 0 makes every change write-through.
+
+    Entries are keyed by session directory, so the cache follows UPLOAD_DIR.
+    With `inline_flush=False`, recording a change never writes to disk; the
+    caller persists due sessions itself (see is_due()/flush_due()), e.g. from
+    an I/O thread pool instead of the event loop. Evicted sessions with
+    pending changes are then kept aside until that flush, and a lookup in the
+    meantime brings them back instead of reading stale state from disk.
+    """
+
+    def __init__(self, max_entries: int = 1024, flush_interval: float = 2.0, inline_flush: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.flush_interval = flush_interval
+        self.inline_flush = inline_flush
+        self._entries: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._evicted: Dict[str, List[_CachedSession]] = {}  # Dirty, awaiting flush (oldest first)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def get_cached(self, store: SessionJournal) -> Optional[dict]:
+        """Return the live session dict only if it is already cached"""
+        key = str(store.session_dir)
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key) or self._reinstate(key, evicted)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        self._flush_evicted(evicted)
+        return entry.info
+
+    def get(self, store: SessionJournal) -> Optional[dict]:
+        """Return the live session dict, loading it from disk on a miss"""
+        key = str(store.session_dir)
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key) or self._reinstate(key, evicted)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            self._flush_evicted(evicted)
+            return entry.info
+
+        info = store.load()
+        if info is None:
+            return None
+
+        evicted = []
+        with self._lock:
+            # Another thread may have loaded the same session meanwhile
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._insert(key, _CachedSession(store, info), evicted)
+        self._flush_evicted(evicted)
+        return entry.info
+
+    def put(self, store: SessionJournal, info: dict) -> dict:
+        """Cache a session dict, replacing any cached copy"""
+        self._entry_for(store, info)
+        return info
+
+    def mark_header_dirty(self, store: SessionJournal, info: dict):
+        """Schedule a header write for the session"""
+        entry = self._entry_for(store, info)
+        entry.header_dirty = True
+        entry.mark_dirty()
+        self._maybe_flush(entry)
+
+    def record_chunk(self, store: SessionJournal, info: dict, chunk_index: int, size: int):
+        """Schedule a chunk journal record for the session"""
+        entry = self._entry_for(store, info)
+        entry.pending_chunks.append((chunk_index, size))
+        entry.mark_dirty()
+        self._maybe_flush(entry)
+
+    def compact(self, store: SessionJournal, info: dict):
+        """Write a full snapshot now; used on state transitions"""
+        entry = self._entry_for(store, info)
+        with entry.flush_lock:
+            entry.header_dirty = False
+            entry.pending_chunks = []
+            entry.dirty_since = None
+            store.compact(info)
+            self.flushes += 1
+
+    def flush(self, store: SessionJournal):
+        """Persist pending changes for one session"""
+        key = str(store.session_dir)
+        with self._lock:
+            entries = list(self._evicted.get(key, ()))
+            if key in self._entries:
+                entries.append(self._entries[key])
+        self._flush_entries(entries)
+
+    def is_dirty(self, store: SessionJournal) -> bool:
+        """True if the session has changes not yet persisted"""
+        key = str(store.session_dir)
+        with self._lock:
+            entry = self._entries.get(key)
+            return key in self._evicted or (entry is not None and entry.dirty_since is not None)
+
+    def is_due(self, store: SessionJournal) -> bool:
+        """True if the session has changes older than flush_interval, or was evicted with changes"""
+        key = str(store.session_dir)
+        with self._lock:
+            entry = self._entries.get(key)
+            return key in self._evicted or (entry is not None and entry.dirty_since is not None and
+                                            time.monotonic() - entry.dirty_since >= self.flush_interval)
+
+    def flush_due(self):
+        """Persist every evicted session and every session whose changes are older than flush_interval"""
+        deadline = time.monotonic() - self.flush_interval
+        with self._lock:
+            due = [e for entries in self._evicted.values() for e in entries]
+            due += [e for e in self._entries.values()
+                    if e.dirty_since is not None and e.dirty_since <= deadline]
+        self._flush_entries(due)
+
+    def flush_all(self):
+        """Persist every dirty session"""
+        with self._lock:
+            dirty = [e for entries in self._evicted.values() for e in entries]
+            dirty += [e for e in self._entries.values() if e.dirty_since is not None]
+        self._flush_entries(dirty)
+
+    def discard(self, store: SessionJournal):
+        """Drop a session from the cache without persisting it"""
+        with self._lock:
+            self._entries.pop(str(store.session_dir), None)
+            self._evicted.pop(str(store.session_dir), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            dirty = sum(1 for e in self._entries.values() if e.dirty_since is not None) + len(self._evicted)
+            active = sum(1 for e in self._entries.values() if not e.info.get('assembled'))
+            return {
+                'size': len(self._entries),
+                'active': active,
+                'max_entries': self.max_entries,
+                'dirty': dirty,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'flushes': self.flushes,
+            }
+
+    def _entry_for(self, store: SessionJournal, info: dict) -> _CachedSession:
+        key = str(store.session_dir)
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(key) or self._reinstate(key, evicted)
+            if entry is None or entry.info is not info:
+                if entry is not None:
+                    evicted.append(entry)
+                entry = self._insert(key, _CachedSession(store, info), evicted)
+            else:
+                self._entries.move_to_end(key)
+        self._flush_evicted(evicted)
+        return entry
+
+    def _insert(self, key: str, entry: _CachedSession, evicted: list) -> _CachedSession:
+        # Caller holds self._lock; evicted entries are flushed after release
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            self.evictions += 1
+            evicted.append(old)
+        return entry
+
+    def _reinstate(self, key: str, evicted: list) -> Optional[_CachedSession]:
+        # Caller holds self._lock; the newest evicted copy becomes current again
+        entries = self._evicted.get(key)
+        if not entries:
+            return None
+        entry = entries.pop()
+        if not entries:
+            del self._evicted[key]
+        return self._insert(key, entry, evicted)
+
+    def _flush_evicted(self, evicted: list):
+        if self.inline_flush:
+            self._flush_entries(evicted)
+            return
+        with self._lock:
+            for old in evicted:
+                if old.dirty_since is not None:
+                    self._evicted.setdefault(str(old.store.session_dir), []).append(old)
+
+    def _flush_entries(self, entries: List[_CachedSession]):
+        try:
+            for entry in entries:
+                self._flush_entry(entry)
+        finally:
+            if self._evicted:
+                with self._lock:
+                    for key in [k for k, v in self._evicted.items() if all(e.dirty_since is None for e in v)]:
+                        del self._evicted[key]
+
+    def _maybe_flush(self, entry: _CachedSession):
+        if self.inline_flush and entry.dirty_since is not None and \
+                time.monotonic() - entry.dirty_since >= self.flush_interval:
+            self._flush_entry(entry)
+
+    def _flush_entry(self, entry: _CachedSession):
+        with entry.flush_lock:
+            if entry.dirty_since is None:
+                return
+            header_dirty, entry.header_dirty = entry.header_dirty, False
+            pending, entry.pending_chunks = entry.pending_chunks, []
+            entry.dirty_since = None
+            try:
+                if header_dirty:
+                    entry.store.write_header(entry.info)
+                if pending:
+                    entry.store.append_chunks(entry.info, pending)
+            except Exception:
+                # Keep the changes queued so the next flush retries them
+                entry.header_dirty = entry.header_dirty or header_dirty
+                entry.pending_chunks = pending + entry.pending_chunks
+                entry.mark_dirty()
+                raise
+            self.flushes += 1
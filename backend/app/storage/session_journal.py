@@ -0,0 +1,152 @@
+"""
+Journaled Session Store
+Small session header plus an append-only per-chunk record log
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+HEADER_FILE = "session_info.json"
+JOURNAL_FILE = "chunks.journal"
+
+# Chunk state lives in the journal while a session is active and is folded
+# back into the header when the session is compacted.
+CHUNK_FIELDS = ('uploaded_chunks', 'chunk_sizes')
+
+
+def _atomic_write_json(path: Path, data: dict):
+    """Write JSON to a temp file and rename it over the target"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class SessionJournal:
+    """
+    On-disk session state for one upload session.
+
+    Two layouts are possible:
+    - compact: session_info.json holds the full state (including
+      uploaded_chunks and chunk_sizes), no journal file exists.
+    - journaled: session_info.json holds only the small header and
+      chunks.journal holds one "index size" line per chunk record.
+
+    A session switches to the journaled layout on its first chunk record, so
+    acknowledging a chunk is a single small append regardless of how many
+    chunks were uploaded before. compact() folds the journal back into a
+    snapshot once the session finishes or is assembled.
+    """
+
+    def __init__(self, session_dir: Path):
+        self.session_dir = session_dir
+        self.header_path = session_dir / HEADER_FILE
+        self.journal_path = session_dir / JOURNAL_FILE
+
+    def exists(self) -> bool:
+        return self.header_path.exists()
+
+    def is_journaled(self) -> bool:
+        return self.journal_path.exists()
+
+    def load(self) -> Optional[dict]:
+        """Load header and replay the chunk journal on top of it"""
+        try:
+            with open(self.header_path, 'r') as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        info['uploaded_chunks'] = set(info.get('uploaded_chunks', []))
+        info['chunk_sizes'] = dict(info.get('chunk_sizes', {}))
+
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    record = self._parse_record(line)
+                    if record is None:
+                        continue
+                    chunk_index, size = record
+                    info['uploaded_chunks'].add(chunk_index)
+                    if size >= 0:
+                        info['chunk_sizes'][str(chunk_index)] = size
+        except FileNotFoundError:
+            pass
+
+        return info
+
+    def write_header(self, info: dict):
+        """
+        Persist session metadata.
+        In the journaled layout this rewrites only the small header.
+        """
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        if self.is_journaled():
+            _atomic_write_json(self.header_path, self._header_fields(info))
+        else:
+            _atomic_write_json(self.header_path, self._snapshot_fields(info))
+
+    def append_chunks(self, info: dict, records: Iterable[Tuple[int, int]]):
+        """
+        Append (chunk_index, size) records to the journal.
+        `info` must already include the records; it is only used to seed
+        the journal when the session is still in the compact layout.
+        """
+        if not self.is_journaled():
+            self._start_journal(info)
+            return
+
+        lines = "".join(f"{int(index)} {int(size)}\n" for index, size in records)
+        if lines:
+            with open(self.journal_path, 'a') as f:
+                f.write(lines)
+
+    def append_chunk(self, info: dict, chunk_index: int, size: int):
+        self.append_chunks(info, [(chunk_index, size)])
+
+    def compact(self, info: dict):
+        """Fold the journal into a full snapshot and drop the journal"""
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write_json(self.header_path, self._snapshot_fields(info))
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _start_journal(self, info: dict):
+        # Write the complete journal before shrinking the header: a crash in
+        # between leaves both copies, and load() takes their union.
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        sizes = info.get('chunk_sizes', {})
+        with open(tmp_path, 'w') as f:
+            for chunk_index in sorted(info.get('uploaded_chunks', ())):
+                f.write(f"{chunk_index} {int(sizes.get(str(chunk_index), -1))}\n")
+        os.replace(tmp_path, self.journal_path)
+        _atomic_write_json(self.header_path, self._header_fields(info))
+
+    @staticmethod
+    def _header_fields(info: dict) -> dict:
+        return {k: v for k, v in info.items() if k not in CHUNK_FIELDS}
+
+    @staticmethod
+    def _snapshot_fields(info: dict) -> dict:
+        snapshot = dict(info)
+        snapshot['uploaded_chunks'] = sorted(info.get('uploaded_chunks', ()))
+        snapshot['chunk_sizes'] = dict(info.get('chunk_sizes', {}))
+        return snapshot
+
+    @staticmethod
+    def _parse_record(line: str) -> Optional[Tuple[int, int]]:
+        # A torn trailing line from a crash mid-append is ignored
+        if not line.endswith("\n"):
+            return None
+        parts = line.split()
+        if len(parts) != 2:
+            return None
+        try:
+            return int(parts[0]), int(parts[1])
+        except ValueError:
+            return None
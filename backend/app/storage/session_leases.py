@@ -0,0 +1,296 @@
+"""
+Cross-Replica Session Leases
+Lease files with fencing tokens and expiry on the shared upload volume
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+# Upper bounds (seconds) of the acquisition latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class LeaseUnavailable(Exception):
+    """Raised when a lease could not be acquired before the timeout"""
+
+
+class Lease:
+    """A held lease; `token` is the fencing token for writes made under it"""
+
+    __slots__ = ('path', 'owner', 'token', 'expires_at', 'handed_over', 'last_used')
+
+    def __init__(self, path: Path, owner: str, token: int, expires_at: float, handed_over: bool):
+        self.path = path
+        self.owner = owner
+        self.token = token
+        self.expires_at = expires_at
+        # True when another owner held the lease since we last did, so any
+        # state this process cached for the session may be stale.
+        self.handed_over = handed_over
+        # Monotonic time the holder last used the lease (for idle release)
+        self.last_used = time.monotonic()
+
+    def remaining(self) -> float:
+        """Seconds until the lease expires; no other owner can take it before"""
+        return self.expires_at - time.time()
+
+
+class LeaseManager:
+    """
+    Leases stored as small JSON files next to the session data.
+
+    Each lease file holds {owner, token, expires_at}. Acquiring a lease takes
+    a POSIX record lock on the file for the read-modify-write, so replicas
+    sharing a ReadWriteMany volume see a consistent owner. Tokens increase on
+    every acquisition; holders check is_current() before committing writes,
+    so a replica whose lease expired cannot clobber its successor.
+
+    Leases are per process (owner_id); exclusion between tasks of the same
+    process is left to SessionLockRegistry and SingleFlight. Threads of this
+    process only wait on each other for the same lease file.
+
+    acquire() waits in the calling thread; async callers use acquire_async(),
+    which runs each attempt on an executor and waits on the event loop, so
+    a contended lease does not hold an I/O thread for the whole timeout.
+    """
+
+    def __init__(self, owner_id: Optional[str] = None, ttl: float = 30.0,
+                 acquire_timeout: float = 10.0, retry_interval: float = 0.02):
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self.acquire_timeout = acquire_timeout
+        self.retry_interval = retry_interval
+        self._last_tokens: "OrderedDict[str, int]" = OrderedDict()
+        self._max_tracked = 4096
+        self._path_locks: Dict[str, list] = {}  # lease path -> [lock, users]
+        self._registry_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._contended = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    @staticmethod
+    def lease_path(session_dir: Path, name: str) -> Path:
+        return session_dir / f".{name}.lease"
+
+    def acquire(self, session_dir: Path, name: str, ttl: Optional[float] = None,
+                timeout: Optional[float] = None) -> Lease:
+        """Acquire a lease, waiting up to `timeout` seconds for the holder"""
+        ttl = self.ttl if ttl is None else ttl
+        timeout = self.acquire_timeout if timeout is None else timeout
+        path = self.lease_path(session_dir, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        started = time.monotonic()
+        contended = False
+        while True:
+            lease = self._try_take(path, ttl)
+            if lease is not None:
+                self._observe(time.monotonic() - started, contended, failed=False)
+                return lease
+            contended = True
+            if time.monotonic() - started >= timeout:
+                self._observe(time.monotonic() - started, contended, failed=True)
+                raise LeaseUnavailable(f"Lease {path} is held by another owner")
+            time.sleep(self.retry_interval)
+
+    async def acquire_async(self, run: Callable[..., Awaitable[Any]], session_dir: Path, name: str,
+                            ttl: Optional[float] = None, timeout: Optional[float] = None) -> Lease:
+        """
+        acquire() for async callers: each attempt is one `run(fn, *args)`
+        executor call (e.g. IOExecutor.run) and the wait between attempts
+        is an asyncio.sleep.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        timeout = self.acquire_timeout if timeout is None else timeout
+        path = self.lease_path(session_dir, name)
+
+        started = time.monotonic()
+        contended = False
+        while True:
+            lease = await run(self._attempt, path, ttl)
+            if lease is not None:
+                self._observe(time.monotonic() - started, contended, failed=False)
+                return lease
+            contended = True
+            if time.monotonic() - started >= timeout:
+                self._observe(time.monotonic() - started, contended, failed=True)
+                raise LeaseUnavailable(f"Lease {path} is held by another owner")
+            await asyncio.sleep(self.retry_interval)
+
+    def try_acquire(self, session_dir: Path, name: str, ttl: Optional[float] = None) -> Optional[Lease]:
+        """Acquire a lease without waiting; None if someone else holds it"""
+        try:
+            return self.acquire(session_dir, name, ttl=ttl, timeout=0)
+        except LeaseUnavailable:
+            return None
+
+    def renew(self, lease: Lease, ttl: Optional[float] = None) -> bool:
+        """Extend a held lease; False if it was lost in the meantime"""
+        ttl = self.ttl if ttl is None else ttl
+        with self._locked(lease.path) as f:
+            state = self._read(f)
+            if state.get('owner') != lease.owner or state.get('token') != lease.token:
+                return False
+            lease.expires_at = time.time() + ttl
+            state['expires_at'] = lease.expires_at
+            self._write(f, state)
+            return True
+
+    def release(self, lease: Lease):
+        """Give up a lease so the next owner does not have to wait for expiry"""
+        try:
+            with self._locked(lease.path) as f:
+                state = self._read(f)
+                if state.get('owner') == lease.owner and state.get('token') == lease.token:
+                    state['expires_at'] = 0
+                    self._write(f, state)
+        except FileNotFoundError:
+            pass
+
+    def is_current(self, lease: Lease) -> bool:
+        """Fencing check: True while `lease` is still the latest unexpired grant"""
+        state = self._peek(lease.path)
+        return (state.get('token') == lease.token
+                and state.get('owner') == lease.owner
+                and state.get('expires_at', 0) > time.time())
+
+    def changed_elsewhere(self, session_dir: Path, name: str) -> bool:
+        """True if another owner took the lease since this process last held it"""
+        path = self.lease_path(session_dir, name)
+        token = self._peek(path).get('token')
+        if token is None:
+            return False
+        return self._last_tokens.get(str(path)) != token
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                'owner': self.owner_id,
+                'acquired': self._acquired,
+                'contended': self._contended,
+                'failed': self._failed,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'wait_seconds_buckets': dict(zip(
+                    [str(b) for b in LATENCY_BUCKETS] + ['+Inf'], self._buckets)),
+            }
+
+    def _attempt(self, path: Path, ttl: float) -> Optional[Lease]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return self._try_take(path, ttl)
+
+    def _try_take(self, path: Path, ttl: float) -> Optional[Lease]:
+        with self._locked(path) as f:
+            state = self._read(f)
+            now = time.time()
+            holder = state.get('owner')
+            if holder and holder != self.owner_id and state.get('expires_at', 0) > now:
+                return None
+
+            previous = state.get('token', 0)
+            key = str(path)
+            handed_over = previous != 0 and self._last_tokens.get(key) != previous
+            token = previous + 1
+            expires_at = now + ttl
+            self._write(f, {'owner': self.owner_id, 'token': token,
+                            'expires_at': expires_at, 'acquired_at': now})
+
+            self._last_tokens[key] = token
+            self._last_tokens.move_to_end(key)
+            while len(self._last_tokens) > self._max_tracked:
+                self._last_tokens.popitem(last=False)
+            return Lease(path, self.owner_id, token, expires_at, handed_over)
+
+    def _observe(self, waited: float, contended: bool, failed: bool):
+        with self._stats_lock:
+            if failed:
+                self._failed += 1
+            else:
+                self._acquired += 1
+            if contended:
+                self._contended += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if waited <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+
+    @contextmanager
+    def _thread_lock(self, path: Path):
+        """Exclude other threads of this process from one lease file"""
+        key = str(path)
+        with self._registry_lock:
+            entry = self._path_locks.get(key)
+            if entry is None:
+                entry = self._path_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._registry_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._path_locks[key]
+
+    @contextmanager
+    def _locked(self, path: Path):
+        """Open a lease file and hold an exclusive record lock on it"""
+        # POSIX record locks do not exclude threads of the same process
+        with self._thread_lock(path):
+            with open(path, 'a+') as f:
+                if fcntl is not None:
+                    fcntl.lockf(f, fcntl.LOCK_EX)
+                try:
+                    yield f
+                finally:
+                    if fcntl is not None:
+                        fcntl.lockf(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(f) -> dict:
+        f.seek(0)
+        data = f.read()
+        if not data:
+            return {}
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return {}
+
+    @staticmethod
+    def _write(f, state: dict):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(state))
+        f.flush()
+        os.fsync(f.fileno())
+
+    @staticmethod
+    def _peek(path: Path) -> dict:
+        try:
+            with open(path, 'r') as f:
+                return json.loads(f.read() or '{}')
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
@@ -0,0 +1,105 @@
+"""
+Session Concurrency Control
+Per-session asyncio locks and single-flight tracking for assembly
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set
+
+
+class _LockEntry:
+    __slots__ = ('lock', 'users', 'last_used')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class SessionLockRegistry:
+    """
+    asyncio locks keyed by session (or any string key).
+
+    Requests for the same key are serialized, requests for different keys
+    never wait on each other. Locks nobody holds or waits for are evicted
+    after `idle_ttl` seconds so the registry does not grow with every
+    session ever seen. Must only be used from the event loop thread.
+    """
+
+    def __init__(self, idle_ttl: float = 300.0, sweep_interval: float = 60.0):
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._entries: Dict[str, _LockEntry] = {}
+        self._last_sweep = time.monotonic()
+
+    @asynccontextmanager
+    async def lock(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _LockEntry()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            self._maybe_sweep(entry.last_used)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _maybe_sweep(self, now: float):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        idle = [key for key, entry in self._entries.items()
+                if entry.users == 0 and now - entry.last_used >= self.idle_ttl]
+        for key in idle:
+            del self._entries[key]
+
+
+class SingleFlight:
+    """
+    Thread-safe set of keys with work in flight.
+
+    try_acquire() succeeds for exactly one caller until release() is called,
+    which keeps a second assembly of the same session from being scheduled
+    or started while the first is pending or running. acquire() waits for
+    the key to become free instead.
+    """
+
+    def __init__(self):
+        self._active: Set[str] = set()
+        self._lock = threading.Condition()
+
+    def try_acquire(self, key: str) -> bool:
+        with self._lock:
+            if key in self._active:
+                return False
+            self._active.add(key)
+            return True
+
+    def acquire(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Wait until the key is free and take it; False on timeout"""
+        with self._lock:
+            if not self._lock.wait_for(lambda: key not in self._active, timeout):
+                return False
+            self._active.add(key)
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._active.discard(key)
+            self._lock.notify_all()
+
+    def is_active(self, key: str) -> bool:
+        with self._lock:
+            return key in self._active
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._active)
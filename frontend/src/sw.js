@@ -1,5 +1,5 @@
 // Service Worker Version - increment to force update
-const SW_VERSION = '2.3.4'; // Force update after DB version bump
+const SW_VERSION = '2.4.0'; // Force update after batch verify
 console.log(`[SW] Service Worker version ${SW_VERSION} initializing...`);
 
 const DB_NAME = 'WaveForgeDB_V4';
@@ -19,6 +19,13 @@ let isProcessingUploads = false; // Prevent concurrent upload processing
 let uploadStartTime = null; // Track upload start time for timeout
 const UPLOAD_TIMEOUT = 60000; // 60 seconds maximum upload duration
 
+// Batch Verify Configuration
+const VERIFY_BATCH_SIZE = 1000; // Chunk indices per /api/verify/{sessionId} request
+
+// Batch Upload Configuration (queue drains send many chunks per request)
+const UPLOAD_BATCH_MAX_CHUNKS = 64;
+const UPLOAD_BATCH_MAX_BYTES = 8 * 1024 * 1024; // 8MB per /upload/batch request
+
 // NOTE: TUS Upload runs in main thread via tus-upload-manager.js
 // Service Worker uses custom upload method (FormData POST to /upload/chunk)
 // This avoids "window is not defined" error in Service Worker context
@@ -134,6 +141,49 @@ function getRetryDelay(retryCount) {
     return Math.min(delay, MAX_RETRY_DELAY);
 }
 
+// Compress chunk indices into range notation for batch verify ("0-99,120")
+function formatChunkRanges(indices) {
+    const sorted = [...new Set(indices)].sort((a, b) => a - b);
+    const ranges = [];
+    for (let i = 0; i < sorted.length; i++) {
+        const start = sorted[i];
+        while (i + 1 < sorted.length && sorted[i + 1] === sorted[i] + 1) i++;
+        ranges.push(start === sorted[i] ? `${start}` : `${start}-${sorted[i]}`);
+    }
+    return ranges.join(',');
+}
+
+// Batch verify: Map of chunkIndex -> size for the given chunks the server has
+async function verifyChunks(sessionId, indices) {
+    const found = new Map();
+    const sorted = [...new Set(indices)].sort((a, b) => a - b);
+    for (let i = 0; i < sorted.length; i += VERIFY_BATCH_SIZE) {
+        const page = formatChunkRanges(sorted.slice(i, i + VERIFY_BATCH_SIZE));
+        const controller = new AbortController();
+        const timeoutId = setTimeout(() => controller.abort(), 10000); // 10 second timeout for verify
+        try {
+            const response = await fetch(`/api/verify/${sessionId}?chunks=${page}`, {
+                signal: controller.signal
+            });
+            if (!response.ok) {
+                throw new Error(`Failed to verify chunks on server (HTTP ${response.status})`);
+            }
+            const result = await response.json();
+            for (const [index, size] of Object.entries(result.chunks)) {
+                found.set(Number(index), size);
+            }
+        } catch (error) {
+            if (error.name === 'AbortError') {
+                throw new Error(`Verify timeout after 10 seconds`);
+            }
+            throw error;
+        } finally {
+            clearTimeout(timeoutId);
+        }
+    }
+    return found;
+}
+
 // Broadcast Status to Window
 async function broadcastStatus(msg) {
     const clients = await self.clients.matchAll();
@@ -280,24 +330,23 @@ async function handleCheckPendingUploads() {
 
 // Upload Chunk with Custom Method
 async function uploadChunkCustom(item) {
-    const formData = new FormData();
-    formData.append('session_id', String(item.sessionId));
-    formData.append('chunk_index', String(item.chunkIndex));
-    formData.append('file', item.blob);
+    // Raw body upload: the chunk bytes are the request body (no multipart parsing on the server)
+    const headers = { 'Content-Type': 'application/octet-stream' };
 
     // Send extra info for session persistence
-    if (item.totalChunks) formData.append('total_chunks', String(item.totalChunks));
-    if (item.recordingName) formData.append('recording_name', String(item.recordingName));
-    if (item.format) formData.append('format', String(item.format));
+    if (item.totalChunks) headers['X-Total-Chunks'] = String(item.totalChunks);
+    if (item.recordingName) headers['X-Recording-Name'] = encodeURIComponent(String(item.recordingName));
+    if (item.format) headers['X-Format'] = String(item.format);
 
     // CRITICAL: Use AbortController for timeout to prevent hanging requests
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 30000); // 30 second timeout
 
     try {
-        const response = await fetch('/upload/chunk', {
+        const response = await fetch(`/upload/chunk/${item.sessionId}/${item.chunkIndex}`, {
             method: 'POST',
-            body: formData,
+            headers: headers,
+            body: item.blob,
             signal: controller.signal
         });
 
@@ -345,6 +394,174 @@ async function uploadChunkCustom(item) {
     }
 }
 
+// Remove a chunk the server has from the queue and notify the page
+async function completeChunk(db, item) {
+    // IMPORTANT: Save fileName and metadata BEFORE removing chunk from queue
+    const fileName = item.fileName;
+    const metadata = item.metadata;
+    const totalChunks = item.totalChunks;
+
+    console.log(`[SW] 🗑 Removing chunk from queue - ID: "${item.id}"`);
+
+    try {
+        await removeFromQueue(db, item.id);
+        console.log(`[SW] ✅ Successfully removed chunk ${item.chunkIndex} from queue`);
+    } catch (err) {
+        console.error(`[SW] ❌ FAILED to remove chunk from queue:`, err);
+        console.error(`[SW] ❌ Chunk ID was: "${item.id}"`);
+        throw err; // Re-throw to trigger retry logic
+    }
+
+    // Count total chunks for this session (including this one + remaining in queue)
+    const allRemainingChunks = await getUploadQueue(db);
+    const sessionChunksRemaining = allRemainingChunks.filter(c => c.sessionId === item.sessionId && c.type !== 'assembly_signal');
+    const totalChunksForSession = item.chunkIndex + 1 + sessionChunksRemaining.length;
+
+    // Notify UploadCoordinator about chunk upload
+    broadcastStatus({
+        type: 'CHUNK_UPLOADED',
+        sessionId: item.sessionId,
+        chunkIndex: item.chunkIndex,
+        totalChunks: totalChunksForSession
+    });
+
+    // Clear blob reference to free memory
+    item.blob = null;
+
+    // Check if all chunks for this session are uploaded (reuse the already fetched data)
+    const sessionChunks = sessionChunksRemaining;
+
+    if (sessionChunks.length === 0) {
+        console.log(`[SW] ✅ All chunks uploaded for session ${item.sessionId}`);
+        broadcastStatus({
+            type: 'SESSION_UPLOAD_COMPLETE',
+            sessionId: item.sessionId,
+            fileName: fileName,
+            metadata: metadata,
+            totalChunks: totalChunks
+        });
+        // Keep legacy UPLOAD_COMPLETE for compatibility
+        broadcastStatus({
+            type: 'UPLOAD_COMPLETE',
+            sessionId: item.sessionId
+        });
+    } else {
+        console.log(`[SW] 📊 Session ${item.sessionId}: ${sessionChunks.length} chunks remaining`);
+    }
+}
+
+// Batch-verify uploaded chunks, then remove the confirmed ones from the queue
+async function confirmUploadedChunks(db, items) {
+    const bySession = new Map();
+    for (const item of items) {
+        if (!bySession.has(item.sessionId)) bySession.set(item.sessionId, []);
+        bySession.get(item.sessionId).push(item);
+    }
+
+    let nextRetryDelay = null;
+    for (const [sessionId, sessionItems] of bySession) {
+        console.log(`[SW] 🔍 Verifying ${sessionItems.length} uploaded chunks for session ${sessionId}...`);
+        let found;
+        try {
+            found = await verifyChunks(sessionId, sessionItems.map(i => i.chunkIndex));
+        } catch (error) {
+            console.warn(`[SW] ⚠️ Batch verify failed for session ${sessionId}: ${error.message} - chunks stay queued`);
+            found = new Map();
+        }
+
+        for (const item of sessionItems) {
+            if (found.has(item.chunkIndex)) {
+                console.log(`[SW] ✅ Chunk ${item.chunkIndex} verified on server (${found.get(item.chunkIndex)} bytes)`);
+                try {
+                    await completeChunk(db, item);
+                    continue;
+                } catch (err) {
+                    console.error(`[SW] ❌ Could not complete chunk ${item.chunkIndex}:`, err);
+                }
+            } else {
+                console.error(`[SW] ❌ Chunk ${item.chunkIndex} not confirmed by server after upload - will retry`);
+            }
+            // Still queued: the next pass re-checks it with a batch verify before re-uploading
+            const retryCount = (item.retryCount || 0) + 1;
+            const retryDelay = getRetryDelay(retryCount);
+            await updateRetryCount(db, item.id, retryCount, Date.now() + retryDelay);
+            nextRetryDelay = Math.min(nextRetryDelay ?? retryDelay, retryDelay);
+        }
+    }
+
+    if (nextRetryDelay !== null) {
+        // Schedule automatic retry ONCE
+        setTimeout(() => processUploads(), nextRetryDelay);
+    }
+}
+
+// Group queued chunks into batches of one session, skipping chunks the server has
+function planUploadBatches(items, onServer) {
+    const batches = [];
+    let batch = [];
+    let batchBytes = 0;
+    for (const item of items) {
+        if (item.type === 'assembly_signal' || !item.blob) continue;
+        if (onServer.get(item.sessionId)?.has(item.chunkIndex)) continue;
+        const full = batch.length >= UPLOAD_BATCH_MAX_CHUNKS || batchBytes + item.blob.size > UPLOAD_BATCH_MAX_BYTES;
+        if (batch.length > 0 && (full || batch[0].sessionId !== item.sessionId)) {
+            batches.push(batch);
+            batch = [];
+            batchBytes = 0;
+        }
+        batch.push(item);
+        batchBytes += item.blob.size;
+    }
+    if (batch.length > 0) batches.push(batch);
+    // Single chunks go through the regular per-chunk upload
+    return batches.filter(b => b.length > 1);
+}
+
+// Upload several chunks of one session in a single request; returns the per-chunk results
+async function uploadChunkBatch(items) {
+    // Each record: chunk index and size as big-endian uint32, then the chunk bytes
+    const parts = [];
+    for (const item of items) {
+        const header = new DataView(new ArrayBuffer(8));
+        header.setUint32(0, item.chunkIndex);
+        header.setUint32(4, item.blob.size);
+        parts.push(header.buffer, item.blob);
+    }
+
+    const first = items[0];
+    const params = new URLSearchParams();
+    if (first.totalChunks) params.set('total_chunks', String(first.totalChunks));
+    if (first.recordingName) params.set('recording_name', String(first.recordingName));
+    if (first.format) params.set('format', String(first.format));
+
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), 120000); // 2 minute timeout for a batch
+    try {
+        const response = await fetch(`/upload/batch/${first.sessionId}?${params}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/vnd.waveforge.chunk-batch' },
+            body: new Blob(parts),
+            signal: controller.signal
+        });
+        const result = await response.json().catch(() => null);
+        // A batch that stopped early still reports the chunks it stored
+        if (!result || !Array.isArray(result.results)) {
+            throw new Error(`Server error: ${response.status}`);
+        }
+        if (!response.ok) {
+            console.warn(`[SW Batch] Batch stopped early (${response.status}): ${result.detail}`);
+        }
+        return result.results;
+    } catch (error) {
+        if (error.name === 'AbortError') {
+            throw new Error(`Batch upload timeout after 120 seconds`);
+        }
+        throw error;
+    } finally {
+        clearTimeout(timeoutId);
+    }
+}
+
 // Main Upload Logic
 async function processUploads() {
     console.log('processUploads() called');
@@ -422,10 +639,68 @@ async function processUploads() {
 
     console.log('[SW] Upload order:', readyQueue.map(i => `${i.sessionId}:${i.chunkIndex}`).join(', '));
 
+    // Chunks the server already has (e.g. the response was lost before a
+    // connectivity drop) are found with one batch verify per session
+    const queuedBySession = new Map();
+    for (const item of readyQueue) {
+        if (item.type === 'assembly_signal') continue;
+        if (!queuedBySession.has(item.sessionId)) queuedBySession.set(item.sessionId, []);
+        queuedBySession.get(item.sessionId).push(item.chunkIndex);
+    }
+    const onServer = new Map();
+    for (const [sessionId, indices] of queuedBySession) {
+        try {
+            onServer.set(sessionId, await verifyChunks(sessionId, indices));
+        } catch (error) {
+            console.warn(`[SW] ⚠️ Batch verify failed for session ${sessionId}: ${error.message} - uploading all queued chunks`);
+        }
+    }
+
+    // Uploaded chunks wait here until a batch verify confirms them
+    const awaitingVerify = [];
+
+    // Drain backlogs with multi-chunk batch requests; chunks a batch did not
+    // store fall through to the per-chunk loop below and its retry handling
+    const batchedIds = new Set();
+    for (const batch of planUploadBatches(readyQueue, onServer)) {
+        console.log(`[SW] 📦 Uploading ${batch.length} chunks of session ${batch[0].sessionId} in one batch...`);
+        let results;
+        try {
+            results = await uploadChunkBatch(batch);
+        } catch (error) {
+            console.warn(`[SW] ⚠️ Batch upload failed: ${error.message} - falling back to single uploads`);
+            break;
+        }
+        const byIndex = new Map(batch.map(item => [item.chunkIndex, item]));
+        for (const result of results) {
+            const item = byIndex.get(result.chunk_index);
+            if (!item) continue;
+            batchedIds.add(item.id);
+            if (result.status === 'chunk_received') {
+                awaitingVerify.push(item);
+                continue;
+            }
+            try {
+                await completeChunk(db, item);
+            } catch (err) {
+                console.error(`[SW] ❌ Could not complete chunk ${item.chunkIndex}:`, err);
+                batchedIds.delete(item.id); // Retried by the per-chunk loop
+            }
+        }
+        if (awaitingVerify.length >= VERIFY_BATCH_SIZE) {
+            await confirmUploadedChunks(db, awaitingVerify.splice(0));
+        }
+    }
+
     for (const item of readyQueue) {
         try {
             // Check if this is an assembly signal instead of a chunk
             if (item.type === 'assembly_signal') {
+                // Confirm pending chunks first so they are out of the queue
+                if (awaitingVerify.length > 0) {
+                    await confirmUploadedChunks(db, awaitingVerify.splice(0));
+                }
+
                 const retryCount = item.retryCount || 0;
                 const retryInfo = retryCount > 0 ? ` (attempt ${retryCount + 1})` : '';
                 console.log(`[SW] 📢 Processing assembly signal for session ${item.sessionId}${retryInfo}`);
@@ -496,6 +771,15 @@ async function processUploads() {
             }
 
             // Regular chunk upload processing
+            if (batchedIds.has(item.id)) {
+                continue; // Uploaded in a batch above
+            }
+            if (onServer.get(item.sessionId)?.has(item.chunkIndex)) {
+                console.log(`[SW] ✅ Server already has chunk ${item.chunkIndex} (session: ${item.sessionId}) - skipping upload`);
+                await completeChunk(db, item);
+                continue;
+            }
+
             const retryCount = item.retryCount || 0;
             const retryInfo = retryCount > 0 ? ` (attempt ${retryCount + 1})` : '';
             const uploadMethod = item.uploadMethod || 'custom';
@@ -514,102 +798,19 @@ async function processUploads() {
             console.log(`[SW] 📤 Sending chunk ${item.chunkIndex} to server (custom upload)...`);
             const uploadStatus = await uploadChunkCustom(item);
 
-            // Success: Chunk uploaded, now verify only if the server actually wrote it
-            // If server says "already exists", skip extra verify and just remove from queue
+            // Success: Chunk uploaded. Chunks the server wrote are confirmed with a
+            // batch verify before removal; "already exists" needs no verify
             if (uploadStatus !== 'chunk_already_exists') {
                 console.log(`[SW] ✓ Chunk ${item.chunkIndex} uploaded successfully (session: ${item.sessionId})`);
-                console.log(`[SW] 🔍 Verifying chunk exists on server before removing from queue...`);
-
-                // CRITICAL: Double-check that chunk actually exists on server with timeout
-                const verifyController = new AbortController();
-                const verifyTimeoutId = setTimeout(() => verifyController.abort(), 10000); // 10 second timeout for verify
-
-                let verifyResponse;
-                try {
-                    verifyResponse = await fetch(`/api/verify/${item.sessionId}/${item.chunkIndex}`, {
-                        signal: verifyController.signal
-                    });
-                    clearTimeout(verifyTimeoutId);
-                } catch (verifyError) {
-                    clearTimeout(verifyTimeoutId);
-                    if (verifyError.name === 'AbortError') {
-                        console.error(`[SW] ⏱️ Verify timeout for chunk ${item.chunkIndex}`);
-                        throw new Error(`Verify timeout after 10 seconds`);
-                    }
-                    throw verifyError;
-                }
-
-                if (!verifyResponse.ok) {
-                    console.error(`[SW] ⚠️ Verify request failed with status ${verifyResponse.status}`);
-                    throw new Error(`Failed to verify chunk ${item.chunkIndex} on server (HTTP ${verifyResponse.status})`);
-                }
-
-                const verifyResult = await verifyResponse.json();
-                if (!verifyResult.exists) {
-                    console.error(`[SW] ❌ CRITICAL: Chunk ${item.chunkIndex} NOT found on server after upload!`);
-                    if (verifyResult.path) {
-                        console.error(`[SW] Expected path: ${verifyResult.path}`);
-                    }
-                    throw new Error(`Chunk ${item.chunkIndex} not found on server after upload - will retry`);
+                awaitingVerify.push(item);
+                if (awaitingVerify.length >= VERIFY_BATCH_SIZE) {
+                    await confirmUploadedChunks(db, awaitingVerify.splice(0));
                 }
-
-                console.log(`[SW] ✅ Chunk ${item.chunkIndex} verified on server (${verifyResult.size} bytes)`);
-            } else {
-                console.log(`[SW] ✅ Skipping verify; server already has chunk ${item.chunkIndex}`);
+                continue;
             }
 
-            // IMPORTANT: Save fileName and metadata BEFORE removing chunk from queue
-            const fileName = item.fileName;
-            const metadata = item.metadata;
-            const totalChunks = item.totalChunks;
-
-            console.log(`[SW] 🗑 Removing chunk from queue - ID: "${item.id}"`);
-
-            try {
-                await removeFromQueue(db, item.id);
-                console.log(`[SW] ✅ Successfully removed chunk ${item.chunkIndex} from queue`);
-            } catch (err) {
-                console.error(`[SW] ❌ FAILED to remove chunk from queue:`, err);
-                console.error(`[SW] ❌ Chunk ID was: "${item.id}"`);
-                throw err; // Re-throw to trigger retry logic
-            }
-
-            // Count total chunks for this session (including this one + remaining in queue)
-            const allRemainingChunks = await getUploadQueue(db);
-            const sessionChunksRemaining = allRemainingChunks.filter(c => c.sessionId === item.sessionId && c.type !== 'assembly_signal');
-            const totalChunksForSession = item.chunkIndex + 1 + sessionChunksRemaining.length;
-
-            // Notify UploadCoordinator about chunk upload
-            broadcastStatus({
-                type: 'CHUNK_UPLOADED',
-                sessionId: item.sessionId,
-                chunkIndex: item.chunkIndex,
-                totalChunks: totalChunksForSession
-            });
-
-            // Clear blob reference to free memory
-            item.blob = null;
-
-            // Check if all chunks for this session are uploaded (reuse the already fetched data)
-            const sessionChunks = sessionChunksRemaining;
-
-            if (sessionChunks.length === 0) {
-                console.log(`[SW] ✅ All chunks uploaded for session ${item.sessionId}`);
-                broadcastStatus({
-                    type: 'SESSION_UPLOAD_COMPLETE',
-                    sessionId: item.sessionId,
-                    fileName: fileName,
-                    metadata: metadata,
-                    totalChunks: totalChunks
-                });
-                // Keep legacy UPLOAD_COMPLETE for compatibility
-                broadcastStatus({
-                    type: 'UPLOAD_COMPLETE',
-                    sessionId: item.sessionId
-                });
-            } else {
-                console.log(`[SW] 📊 Session ${item.sessionId}: ${sessionChunks.length} chunks remaining`);
-            }
+            console.log(`[SW] ✅ Skipping verify; server already has chunk ${item.chunkIndex}`);
+            await completeChunk(db, item);
 
         } catch (error) {
             const retryCount = (item.retryCount || 0) + 1;
@@ -725,6 +926,15 @@ async function processUploads() {
         }
     }
 
+    // Confirm the chunks uploaded since the last batch verify
+    if (awaitingVerify.length > 0) {
+        try {
+            await confirmUploadedChunks(db, awaitingVerify.splice(0));
+        } catch (err) {
+            console.error('[SW] Error confirming uploaded chunks:', err);
+        }
+    }
+
     // Close DB connection and release lock
     try {
         db.close();
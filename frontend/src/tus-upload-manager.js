@@ -142,6 +142,7 @@ class TusUploadManager {
                 format: format
             },
             chunkSize: 512 * 1024, // 512KB sub-chunks
+            uploadDataDuringCreation: true, // First sub-chunk rides on the POST (creation-with-upload)
             retryDelays: [0, 1000, 3000, 5000, 10000],
             onProgress: (bytesUploaded, bytesTotal) => {
                 const progress = bytesUploaded / bytesTotal;
@@ -172,17 +173,16 @@ class TusUploadManager {
      * Upload chunk using custom method (fallback)
      */
     async uploadChunkCustom(sessionId, chunkIndex, totalChunks, blob, recordingName, format) {
-        const formData = new FormData();
-        formData.append('session_id', sessionId);
-        formData.append('chunk_index', chunkIndex);
-        formData.append('file', blob);
-        formData.append('total_chunks', totalChunks);
-        formData.append('recording_name', recordingName);
-        formData.append('format', format);
-
-        const response = await fetch('/upload/chunk', {
+        // Raw body upload, metadata in headers
+        const response = await fetch(`/upload/chunk/${sessionId}/${chunkIndex}`, {
             method: 'POST',
-            body: formData
+            headers: {
+                'Content-Type': 'application/octet-stream',
+                'X-Total-Chunks': String(totalChunks),
+                'X-Recording-Name': encodeURIComponent(recordingName),
+                'X-Format': format
+            },
+            body: blob
         });
 
         if (!response.ok) {
@@ -379,5 +379,97 @@ class TusUploadManager {
     }
 }
 
+/**
+ * Stream Uploader
+ * Sends live recording chunks over one WebSocket (/ws/upload/{sessionId})
+ * instead of one HTTP request per chunk. Chunks stay in `pending` until the
+ * server acks them (an ack is only sent once the chunk is recorded in the
+ * persisted session); on disconnect they are handed back for the HTTP queue.
+ */
+class StreamUploader {
+    constructor(sessionId, { recordingName, format } = {}) {
+        this.sessionId = sessionId;
+        this.recordingName = recordingName;
+        this.format = format;
+        this.socket = null;
+        this.pending = new Map(); // chunkIndex -> blob, until acked
+        this.contiguousChunks = 0;
+        this.durableOffset = 0;
+        this.onAck = null; // ({ chunkIndex, status, size }) per stored chunk
+        this.onError = null; // (reply) when the server rejects a message
+        this.onClose = null; // (unackedChunks: Map) when the stream ends
+    }
+
+    /**
+     * Open the stream; resolves once connected
+     */
+    open() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const params = new URLSearchParams();
+        if (this.recordingName) params.set('recording_name', this.recordingName);
+        if (this.format) params.set('format', this.format);
+        const url = `${protocol}//${window.location.host}/ws/upload/${this.sessionId}?${params}`;
+
+        return new Promise((resolve, reject) => {
+            this.socket = new WebSocket(url);
+            this.socket.binaryType = 'arraybuffer';
+            this.socket.onopen = () => resolve();
+            this.socket.onerror = (event) => reject(new Error('Stream connection failed'));
+            this.socket.onmessage = (event) => this.handleReply(JSON.parse(event.data));
+            this.socket.onclose = () => {
+                console.log(`[Stream] Closed with ${this.pending.size} unacknowledged chunks`);
+                if (this.onClose) this.onClose(new Map(this.pending));
+            };
+        });
+    }
+
+    get connected() {
+        return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+    }
+
+    /**
+     * Send one chunk as a framed record (index and size as big-endian uint32)
+     */
+    async send(chunkIndex, blob) {
+        this.pending.set(chunkIndex, blob);
+        const header = new DataView(new ArrayBuffer(8));
+        header.setUint32(0, chunkIndex);
+        header.setUint32(4, blob.size);
+        this.socket.send(await new Blob([header.buffer, blob]).arrayBuffer());
+    }
+
+    /**
+     * Send the final chunk count; the server assembles once every chunk is stored
+     */
+    finish(totalChunks) {
+        this.socket.send(JSON.stringify({
+            type: 'metadata',
+            totalChunks,
+            recordingName: this.recordingName,
+            format: this.format
+        }));
+    }
+
+    close() {
+        if (this.socket) this.socket.close();
+    }
+
+    handleReply(reply) {
+        this.contiguousChunks = reply.contiguous_chunks;
+        this.durableOffset = reply.durable_offset;
+        for (const result of reply.results || []) {
+            this.pending.delete(result.chunk_index);
+            if (this.onAck) {
+                this.onAck({ chunkIndex: result.chunk_index, status: result.status, size: result.size });
+            }
+        }
+        if (reply.type === 'error') {
+            console.warn(`[Stream] Server error: ${reply.detail}`);
+            if (this.onError) this.onError(reply);
+        }
+    }
+}
+
 // Export for use in index.html
 window.TusUploadManager = TusUploadManager;
+window.StreamUploader = StreamUploader;
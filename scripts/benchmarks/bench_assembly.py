@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Assembly Benchmark
+Compares sequential and parallel recording assembly on a given volume.
+
+Usage:
+    python scripts/benchmarks/bench_assembly.py --dir /tmp/bench            # local disk
+    python scripts/benchmarks/bench_assembly.py --dir /mnt/uploaded_data    # network volume
+
+Chunk files are generated once under --dir; each configuration then
+assembles them into one output file. Results vary with the page cache:
+run as root with --drop-caches for cold-cache numbers.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend" / "app"))
+
+from storage import AssemblyEngine  # noqa: E402
+
+
+def make_chunks(work_dir: Path, count: int, chunk_size: int):
+    """Write `count` chunk files of `chunk_size` random bytes"""
+    chunks_dir = work_dir / "chunks"
+    chunks_dir.mkdir(parents=True, exist_ok=True)
+    block = os.urandom(chunk_size)
+    sources = []
+    for i in range(count):
+        path = chunks_dir / f"chunk_{i}.bin"
+        if not path.exists() or path.stat().st_size != chunk_size:
+            path.write_bytes(block)
+        sources.append((path, 0, chunk_size))
+    return sources
+
+
+def drop_caches():
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def run(sources, output: Path, method: str, workers: int, repeat: int, cold: bool) -> dict:
+    # Start at `method`, keeping the slower fallbacks behind it
+    methods = AssemblyEngine.METHODS[AssemblyEngine.METHODS.index(method):]
+    engine = AssemblyEngine(methods=methods, workers=workers, parallel_min_bytes=0)
+    durations = []
+    for _ in range(repeat):
+        if cold:
+            drop_caches()
+        started = time.perf_counter()
+        report = engine.copy(sources, output)
+        with open(output, "rb+") as f:
+            os.fsync(f.fileno())
+        durations.append(time.perf_counter() - started)
+        output.unlink()
+    median = statistics.median(durations)
+    size_mb = report["bytes"] / (1024 * 1024)
+    return {
+        "method": report["method"],
+        "workers": report["workers"],
+        "median_s": median,
+        "mb_per_s": size_mb / median if median > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, required=True, help="Directory on the volume to benchmark")
+    parser.add_argument("--chunks", type=int, default=3600, help="Number of chunks (default: one hour of 1s slices)")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Bytes per chunk")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare")
+    parser.add_argument("--methods", nargs="+", default=list(AssemblyEngine.METHODS), choices=AssemblyEngine.METHODS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--drop-caches", action="store_true", help="Drop the page cache before each run (root)")
+    parser.add_argument("--keep", action="store_true", help="Keep generated chunk files")
+    args = parser.parse_args()
+
+    work_dir = args.dir / "assembly-bench"
+    sources = make_chunks(work_dir, args.chunks, args.chunk_size)
+    total_mb = args.chunks * args.chunk_size / (1024 * 1024)
+    print(f"{args.chunks} chunks x {args.chunk_size} bytes = {total_mb:.1f} MB in {work_dir}")
+    print(f"{'method':<28} {'threads':>7} {'median s':>10} {'MB/s':>10}")
+
+    try:
+        for method in args.methods:
+            for workers in args.threads:
+                result = run(sources, work_dir / "out.bin", method, workers, args.repeat, args.drop_caches)
+                print(f"{result['method']:<28} {result['workers']:>7} {result['median_s']:>10.3f} {result['mb_per_s']:>10.1f}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
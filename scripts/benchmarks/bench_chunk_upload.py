@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Chunk Upload Benchmark
+CPU per chunk and requests/sec of the multipart and raw-body chunk endpoints.
+
+Usage:
+    python scripts/benchmarks/bench_chunk_upload.py
+    python scripts/benchmarks/bench_chunk_upload.py --chunks 5000 --chunk-size 32768
+
+"multipart" is POST /upload/chunk (FormData, as the Service Worker used to
+send it), "raw" is POST /upload/chunk/{session}/{index} with the chunk as
+the body and metadata in headers. Request bodies are built before timing
+and delivered through the ASGI interface in 64KB pieces, so the numbers
+are server-side cost only (parsing, storage writes, session updates).
+CPU is process time (all threads) divided by chunks.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("LOG_LEVEL", "warning")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend" / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import routes.tus_upload  # noqa: E402
+from app import server  # noqa: E402
+
+BOUNDARY = "----WaveForgeBenchBoundary"
+PIECE = 64 * 1024
+
+
+async def call(method: str, path: str, headers: list, body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("localhost", 80), "client": ("127.0.0.1", 1234),
+        "headers": [(b"host", b"localhost"), (b"content-length", str(len(body)).encode()), *headers],
+    }
+    pieces = [body[i:i + PIECE] for i in range(0, len(body), PIECE)] or [b""]
+    status = [0]
+
+    async def receive():
+        if pieces:
+            piece = pieces.pop(0)
+            return {"type": "http.request", "body": piece, "more_body": bool(pieces)}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+
+    await server.app(scope, receive, send)
+    return status[0]
+
+
+def multipart_request(session_id: str, index: int, total: int, data: bytes):
+    fields = {"session_id": session_id, "chunk_index": str(index), "total_chunks": str(total),
+              "recording_name": "bench", "format": "webm"}
+    body = b"".join(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    body += (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="chunk"\r\n'
+             f'Content-Type: audio/webm\r\n\r\n').encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    return "/upload/chunk", headers, body
+
+
+def raw_request(session_id: str, index: int, total: int, data: bytes):
+    headers = [(b"content-type", b"application/octet-stream"), (b"x-total-chunks", str(total).encode()),
+               (b"x-recording-name", b"bench"), (b"x-format", b"webm")]
+    return f"/upload/chunk/{session_id}/{index}", headers, data
+
+
+async def run(build, chunks: int, data: bytes) -> tuple:
+    session_id = str(uuid.uuid4())
+    # One chunk more than sent, so the run measures ingestion and not assembly
+    requests = [build(session_id, i, chunks + 1, data) for i in range(chunks)]
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for path, headers, body in requests:
+        assert await call("POST", path, headers, body) == 200
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    return chunks / wall, cpu / chunks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks per endpoint")
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024, help="Chunk size (1s of Opus audio is ~16KB)")
+    parser.add_argument("--dir", type=Path, default=None, help="Upload directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    upload_dir = Path(tempfile.mkdtemp(dir=args.dir))
+    routes.tus_upload.UPLOAD_DIR = upload_dir
+    data = os.urandom(args.chunk_size)
+
+    print(f"{args.chunks} chunks of {args.chunk_size} bytes per endpoint")
+    print(f"{'endpoint':<10} {'req/s':>8} {'CPU us/chunk':>13}")
+    try:
+        for name, build in (("multipart", multipart_request), ("raw", raw_request)):
+            asyncio.run(run(build, min(200, args.chunks), data))  # Warm-up
+            rate, cpu = asyncio.run(run(build, args.chunks, data))
+            print(f"{name:<10} {rate:>8.0f} {cpu:>13.0f}")
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Middleware Benchmark
+Requests/sec for /health and chunk PATCH with the old and new middleware stacks.
+
+Usage:
+    python scripts/benchmarks/bench_middleware.py
+    python scripts/benchmarks/bench_middleware.py --requests 5000 --chunk-size 524288
+
+"before" rebuilds the previous stack (BaseHTTPMiddleware security headers,
+innermost, with CORS outside the host check); "after" is the app as
+shipped. Requests are driven in-process through the ASGI interface, so
+the numbers isolate framework and middleware cost from the network.
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("LOG_LEVEL", "warning")
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend" / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.middleware.cors import CORSMiddleware  # noqa: E402
+from starlette.middleware.trustedhost import TrustedHostMiddleware  # noqa: E402
+
+import routes.tus_upload  # noqa: E402
+from app import server  # noqa: E402
+
+STACKS = ("before", "after")
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this change replaced"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for name, value in server.SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+
+def use_stack(name: str, after_stack: list):
+    app = server.app
+    if name == "after":
+        app.user_middleware = list(after_stack)
+    else:
+        by_class = {m.cls: m for m in after_stack}
+        app.user_middleware = [
+            by_class[server.MetricsMiddleware],
+            by_class[CORSMiddleware],
+            by_class[TrustedHostMiddleware],
+            Middleware(LegacySecurityHeadersMiddleware),
+        ]
+    app.middleware_stack = None
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def call(method: str, path: str, headers: list, body: bytes = b"") -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("localhost", 80), "client": ("127.0.0.1", 1234),
+        "headers": [(b"host", b"localhost"), *headers],
+    }
+    sent = [False]
+    status = [0]
+
+    async def receive():
+        if sent[0]:
+            return {"type": "http.disconnect"}
+        sent[0] = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+
+    await server.app(scope, receive, send)
+    return status[0]
+
+
+def metadata(**values) -> bytes:
+    return ",".join(f"{k} {base64.b64encode(str(v).encode()).decode()}" for k, v in values.items()).encode()
+
+
+async def bench_health(requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        assert await call("GET", "/health", []) == 200
+    return requests / (time.perf_counter() - started)
+
+
+async def bench_patch(requests: int, chunk_size: int) -> float:
+    session_id = str(uuid.uuid4())
+    body = b"\0" * chunk_size
+    for i in range(requests):
+        await call("POST", f"/files/{session_id}/chunks/", [
+            (b"tus-resumable", b"1.0.0"),
+            (b"upload-metadata", metadata(chunkIndex=i, totalChunks=requests + 1, recordingName="bench", format="webm")),
+        ])
+    headers = [
+        (b"tus-resumable", b"1.0.0"), (b"upload-offset", b"0"),
+        (b"content-type", b"application/offset+octet-stream"), (b"content-length", str(chunk_size).encode()),
+    ]
+    started = time.perf_counter()
+    for i in range(requests):
+        assert await call("PATCH", f"/files/{session_id}/chunks/{i}", headers, body) == 204
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and stack")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="PATCH body size")
+    parser.add_argument("--dir", type=Path, default=None, help="Upload directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    upload_dir = Path(tempfile.mkdtemp(dir=args.dir))
+    routes.tus_upload.UPLOAD_DIR = upload_dir
+    after_stack = list(server.app.user_middleware)
+
+    print(f"{args.requests} requests per run, PATCH body {args.chunk_size} bytes")
+    print(f"{'stack':<8} {'/health req/s':>14} {'PATCH req/s':>12}")
+    try:
+        for stack in STACKS:
+            use_stack(stack, after_stack)
+            asyncio.run(bench_health(min(200, args.requests)))  # Warm-up
+            health = asyncio.run(bench_health(args.requests))
+            patch = asyncio.run(bench_patch(args.requests, args.chunk_size))
+            print(f"{stack:<8} {health:>14.0f} {patch:>12.0f}")
+    finally:
+        use_stack("after", after_stack)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Serving Benchmark
+Compares recording downloads with and without zero-copy file responses.
+
+Usage:
+    python scripts/benchmarks/bench_serving.py --dir /tmp/bench
+    python scripts/benchmarks/bench_serving.py --dir /mnt/uploaded_data --size-mb 512 --requests 20
+
+"stream" and "pathsend" call the app in-process through a minimal ASGI
+server that writes the response into a socket drained by a reader thread:
+in "stream" mode the body messages are written to the socket, in
+"pathsend" mode the server transmits the file with os.sendfile. CPU time
+covers the whole process (event loop, I/O threads, reader).
+
+"uvicorn-uvloop" and "uvicorn-sendfile" start the production launcher
+(one worker) and download over HTTP from a client in this process:
+SENDFILE=false runs uvloop + httptools with body blocks read on the I/O
+pool, SENDFILE=true the asyncio loop with the zerocopysend protocols
+(sendfile_http.py). CPU time is the server process's, from /proc (Linux).
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend" / "app"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+import routes.recording_complete  # noqa: E402
+from app.server import app  # noqa: E402
+
+LAUNCHER = Path(__file__).resolve().parents[2] / "backend" / "app" / "launcher.py"
+MODES = ("stream", "pathsend", "uvicorn-uvloop", "uvicorn-sendfile")
+
+
+def drain(sock: socket.socket):
+    while sock.recv(1024 * 1024):
+        pass
+
+
+async def download(path: str, mode: str, sock: socket.socket):
+    """Serve one GET through the app, writing the response to `sock`"""
+    loop = asyncio.get_running_loop()
+    extensions = {"http.response.pathsend": {}} if mode == "pathsend" else {}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("localhost", 80), "client": ("127.0.0.1", 1234),
+        "headers": [(b"host", b"localhost")], "extensions": extensions,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            await loop.sock_sendall(sock, message.get("body", b""))
+        elif message["type"] == "http.response.pathsend":
+            with open(message["path"], "rb") as f:
+                await loop.sock_sendfile(sock, f)
+
+    await app(scope, receive, send)
+
+
+def run(path: str, mode: str, requests: int, size: int) -> dict:
+    reader, writer = socket.socketpair()
+    writer.setblocking(False)
+    drainer = threading.Thread(target=drain, args=(reader,), daemon=True)
+    drainer.start()
+
+    async def serve_all():
+        for _ in range(requests):
+            await download(path, mode, writer)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_before = usage.ru_utime + usage.ru_stime
+    started = time.perf_counter()
+    asyncio.run(serve_all())
+    duration = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = usage.ru_utime + usage.ru_stime - cpu_before
+
+    writer.close()
+    drainer.join()
+    reader.close()
+    gigabytes = size * requests / (1024 ** 3)
+    return {
+        "mode": mode,
+        "mb_per_s": size * requests / (1024 * 1024) / duration if duration > 0 else 0.0,
+        "cpu_s_per_gb": cpu / gigabytes if gigabytes else 0.0
+    }
+
+
+def process_cpu(pid: int) -> float:
+    """User + system CPU seconds of a process"""
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run_uvicorn(path: str, mode: str, requests: int, size: int, upload_dir: Path) -> dict:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY="1", UPLOAD_DIR=str(upload_dir),
+        LOG_LEVEL="warning", SENDFILE="true" if mode == "uvicorn-sendfile" else "false"
+    )
+    server = subprocess.Popen([sys.executable, str(LAUNCHER)], cwd=LAUNCHER.parent, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{mode} server did not start")
+                time.sleep(0.2)
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        cpu_before = process_cpu(server.pid)
+        started = time.perf_counter()
+        for _ in range(requests):
+            conn.request("GET", path)
+            response = conn.getresponse()
+            received = 0
+            while data := response.read(1024 * 1024):
+                received += len(data)
+            assert response.status == 200 and received == size
+        duration = time.perf_counter() - started
+        cpu = process_cpu(server.pid) - cpu_before
+        conn.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    gigabytes = size * requests / (1024 ** 3)
+    return {
+        "mode": mode,
+        "mb_per_s": size * requests / (1024 * 1024) / duration if duration > 0 else 0.0,
+        "cpu_s_per_gb": cpu / gigabytes if gigabytes else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, required=True, help="Directory on the volume to serve from")
+    parser.add_argument("--size-mb", type=int, default=256, help="Recording size")
+    parser.add_argument("--requests", type=int, default=10, help="Downloads per mode")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    work_dir = args.dir / "serving-bench"
+    session_id = str(uuid.uuid4())
+    completed = work_dir / session_id / "completed"
+    completed.mkdir(parents=True)
+    size = args.size_mb * 1024 * 1024
+    block = os.urandom(1024 * 1024)
+    with open(completed / "bench.webm", "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(block)
+    routes.recording_complete.UPLOAD_DIR = work_dir
+    path = f"/recordings/{session_id}/bench.webm"
+
+    print(f"{args.requests} x {args.size_mb} MB from {work_dir}")
+    print(f"{'mode':<10} {'MB/s':>10} {'CPU s/GB':>10}")
+    try:
+        for mode in args.modes:
+            if mode.startswith("uvicorn"):
+                result = run_uvicorn(path, mode, args.requests, size, work_dir)
+            else:
+                result = run(path, mode, args.requests, size)
+            print(f"{result['mode']:<10} {result['mb_per_s']:>10.1f} {result['cpu_s_per_gb']:>10.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
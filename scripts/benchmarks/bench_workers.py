@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Worker Scaling Load Test
+Requests/sec and latency of the production launcher at several worker counts.
+
+Usage:
+    python scripts/benchmarks/bench_workers.py
+    python scripts/benchmarks/bench_workers.py --workers 1 2 4 8 --connections 128 --duration 20
+
+For every worker count the launcher is started on a free port (with
+session leases on, as in production, and a temporary upload directory),
+then keep-alive connections spread over several client processes drive
+GET /health, the TUS chunk flow (POST create + PATCH body, one session
+per connection) and the same flow with creation-with-upload (one POST
+carrying the body) for --duration seconds each. Run it on a machine with at
+least as many cores as the largest worker count plus the client
+processes, or the client becomes the bottleneck.
+"""
+
+import argparse
+import asyncio
+import base64
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+LAUNCHER = Path(__file__).resolve().parents[2] / "backend" / "app" / "launcher.py"
+WORKLOADS = ("health", "patch", "create")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, upload_dir: Path) -> subprocess.Popen:
+    env = dict(
+        os.environ, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY=str(workers),
+        UPLOAD_DIR=str(upload_dir), SESSION_LEASES_ENABLED="true", LOG_LEVEL="warning",
+        LIMIT_CONCURRENCY="0"
+    )
+    server = subprocess.Popen([sys.executable, str(LAUNCHER)], cwd=LAUNCHER.parent, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            time.sleep(0.5 * workers)  # Let the remaining workers finish starting
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} worker(s) did not start")
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def metadata(**values) -> str:
+    return ",".join(f"{k} {base64.b64encode(str(v).encode()).decode()}" for k, v in values.items())
+
+
+async def request(reader, writer, method: str, path: str, headers: dict, body: bytes = b"") -> int:
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    head += "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+    writer.write(head.encode() + body)
+    status_line = await reader.readline()
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def connection(port: int, workload: str, chunk: bytes, until: float, latencies: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    session_id = str(uuid.uuid4())
+    tus = {"Tus-Resumable": "1.0.0"}
+    index = 0
+    try:
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            if workload == "health":
+                status = await request(reader, writer, "GET", "/health", {})
+                ok = status == 200
+            elif workload == "create":
+                status = await request(reader, writer, "POST", f"/files/{session_id}/chunks/", {
+                    **tus, "Upload-Length": str(len(chunk)), "Content-Type": "application/offset+octet-stream",
+                    "Upload-Metadata": metadata(chunkIndex=index, totalChunks=10 ** 6,
+                                                recordingName="load", format="webm")
+                }, chunk)
+                ok = status == 201
+                index += 1
+            else:
+                await request(reader, writer, "POST", f"/files/{session_id}/chunks/", {
+                    **tus, "Upload-Metadata": metadata(chunkIndex=index, totalChunks=10 ** 6,
+                                                       recordingName="load", format="webm")
+                })
+                status = await request(reader, writer, "PATCH", f"/files/{session_id}/chunks/{index}", {
+                    **tus, "Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"
+                }, chunk)
+                ok = status == 204
+                index += 1
+            if ok:
+                latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def client(port: int, workload: str, connections: int, chunk_size: int, duration: float) -> list:
+    latencies = []
+
+    async def run():
+        until = time.perf_counter() + duration
+        chunk = os.urandom(chunk_size)
+        await asyncio.gather(*(connection(port, workload, chunk, until, latencies) for _ in range(connections)))
+
+    asyncio.run(run())
+    return latencies
+
+
+def load(port: int, workload: str, args) -> tuple:
+    per_client = max(1, args.connections // args.clients)
+    with multiprocessing.Pool(args.clients) as pool:
+        results = pool.starmap(client, [(port, workload, per_client, args.chunk_size, args.duration)] * args.clients)
+    latencies = sorted(latency for result in results for latency in result)
+    if not latencies:
+        return 0.0, 0.0, 0.0
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / args.duration, statistics.median(latencies) * 1000, p99 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--connections", type=int, default=64, help="Concurrent keep-alive connections")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Client processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per workload")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="PATCH body size")
+    parser.add_argument("--dir", type=Path, default=None, help="Upload directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    print(f"{args.connections} connections over {args.clients} client process(es), "
+          f"{args.duration:.0f}s per workload, PATCH body {args.chunk_size} bytes, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'workload':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in args.workers:
+        upload_dir = Path(tempfile.mkdtemp(dir=args.dir))
+        port = free_port()
+        server = start_server(workers, port, upload_dir)
+        try:
+            for workload in WORKLOADS:
+                rate, p50, p99 = load(port, workload, args)
+                print(f"{workers:>7} {workload:<8} {rate:>9.0f} {p50:>8.1f} {p99:>8.1f}")
+        finally:
+            stop_server(server)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Unit Tests for the Recording Assembly Engine
+
+Tests ranged concatenation, copy method fallback and reporting.
+"""
+
+import errno
+import os
+import pytest
+
+from storage import AssemblyEngine
+
+
+@pytest.fixture
+def sources(temp_upload_dir):
+    """Two chunk files and one range inside a shared data file."""
+    (temp_upload_dir / "chunk_0.bin").write_bytes(b"first-")
+    (temp_upload_dir / "data.bin").write_bytes(b"xxsecond-yy")
+    (temp_upload_dir / "chunk_2.bin").write_bytes(b"third")
+    return [
+        (temp_upload_dir / "chunk_0.bin", 0, 6),
+        (temp_upload_dir / "data.bin", 2, 7),
+        (temp_upload_dir / "chunk_2.bin", 0, 5),
+    ]
+
+
+@pytest.mark.unit
+class TestAssemblyEngine:
+    """Test AssemblyEngine copies and fallbacks."""
+
+    @pytest.mark.parametrize("method", ["copy_file_range", "sendfile", "buffered"])
+    def test_each_method_concatenates_ranges(self, temp_upload_dir, sources, method):
+        """Test that every copy method produces the same recording."""
+        if method != "buffered" and not hasattr(os, method):
+            pytest.skip(f"os.{method} not available")
+        output = temp_upload_dir / "out.webm"
+
+        report = AssemblyEngine(methods=(method,)).copy(sources, output)
+
+        assert output.read_bytes() == b"first-second-third"
+        assert report["method"] == method
+        assert report["bytes"] == 18
+
+    def test_unsupported_method_falls_back(self, temp_upload_dir, sources, monkeypatch):
+        """Test that an unsupported copy_file_range falls back for the whole assembly."""
+        calls = []
+
+        def cross_device(*args):
+            calls.append(args)
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(os, "copy_file_range", cross_device, raising=False)
+        output = temp_upload_dir / "out.webm"
+
+        report = AssemblyEngine(methods=("copy_file_range", "buffered")).copy(sources, output)
+
+        assert output.read_bytes() == b"first-second-third"
+        assert report["method"] == "buffered"
+        assert len(calls) == 1
+
+    def test_short_source_raises(self, temp_upload_dir, sources):
+        """Test that a source shorter than its recorded size is an error."""
+        sources[2] = (sources[2][0], 0, 50)
+
+        with pytest.raises(IOError):
+            AssemblyEngine(methods=("buffered",)).copy(sources, temp_upload_dir / "out.webm")
+
+    def test_progress_and_stats(self, temp_upload_dir, sources):
+        """Test that progress is called per source and totals are kept."""
+        engine = AssemblyEngine(methods=("buffered",))
+        seen = []
+
+        engine.copy(sources, temp_upload_dir / "out.webm", progress=seen.append)
+        engine.record("rename", 100, 0.01)
+
+        assert seen == [0, 1, 2]
+        stats = engine.stats()
+        assert stats["assemblies"] == 2
+        assert stats["bytes"] == 118
+        assert stats["by_method"] == {"buffered": 1, "rename": 1}
+
+    @pytest.mark.parametrize("method", ["copy_file_range", "buffered"])
+    def test_parallel_copy_matches_sequential(self, temp_upload_dir, method):
+        """Test that disjoint ranges filled by several threads form the same file."""
+        if method != "buffered" and not hasattr(os, method):
+            pytest.skip(f"os.{method} not available")
+        sources = []
+        expected = b""
+        for i in range(20):
+            data = bytes([i]) * (100 + i * 37)
+            path = temp_upload_dir / f"chunk_{i}.bin"
+            path.write_bytes(data)
+            sources.append((path, 0, len(data)))
+            expected += data
+        output = temp_upload_dir / "out.webm"
+        seen = []
+
+        engine = AssemblyEngine(methods=(method,), workers=4, parallel_min_bytes=0)
+        report = engine.copy(sources, output, progress=seen.append)
+
+        assert output.read_bytes() == expected
+        assert report["workers"] == 4
+        assert report["bytes"] == len(expected)
+        assert sorted(seen) == list(range(20))
+
+    def test_small_copies_stay_sequential(self, temp_upload_dir, sources):
+        """Test that copies under parallel_min_bytes use one thread."""
+        engine = AssemblyEngine(workers=4, parallel_min_bytes=1024)
+
+        report = engine.copy(sources, temp_upload_dir / "out.webm")
+
+        assert report["workers"] == 1
+        assert (temp_upload_dir / "out.webm").read_bytes() == b"first-second-third"
@@ -0,0 +1,123 @@
+"""
+Unit Tests for the Durable Assembly Queue
+
+Tests deduplication, retries with backoff, recovery and the worker pool.
+"""
+
+import time
+import pytest
+
+from storage import AssemblyQueue
+
+
+class Handler:
+    """Records calls and fails the first `failures` of them."""
+
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+
+    def __call__(self, key, payload):
+        self.calls.append((key, payload))
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("missing chunks")
+
+
+def open_queue(temp_upload_dir, handler, **kwargs):
+    queue = AssemblyQueue(handler, **kwargs)
+    queue.open(temp_upload_dir / "queue.sqlite3")
+    return queue
+
+
+@pytest.mark.unit
+class TestAssemblyQueue:
+    """Test AssemblyQueue job lifecycle."""
+
+    def test_enqueue_deduplicates_by_key(self, temp_upload_dir):
+        """Test that a session is only queued once."""
+        queue = open_queue(temp_upload_dir, Handler())
+
+        assert queue.enqueue("s1", {"format": "webm"})
+        assert not queue.enqueue("s1", {"format": "webm"})
+        assert queue.stats()["queue_depth"] == 1
+
+    def test_successful_job_is_removed(self, temp_upload_dir):
+        """Test that a completed job leaves the queue."""
+        handler = Handler()
+        queue = open_queue(temp_upload_dir, handler)
+        queue.enqueue("s1", {"format": "webm"})
+
+        assert queue.run_pending() == 1
+        assert handler.calls == [("s1", {"format": "webm"})]
+        assert queue.job("s1") is None
+        assert queue.stats()["completed"] == 1
+
+    def test_failed_job_is_retried_with_backoff(self, temp_upload_dir):
+        """Test that a failure re-queues the job after a delay."""
+        queue = open_queue(temp_upload_dir, Handler(failures=1), retry_backoff=30)
+        queue.enqueue("s1", {})
+
+        assert queue.run_pending() == 1
+        job = queue.job("s1")
+        assert job["state"] == "queued"
+        assert job["run_after"] > time.time() + 20
+        assert job["last_error"] == "missing chunks"
+        assert queue.run_pending() == 0  # Still backing off
+
+        # A new trigger makes the job runnable immediately
+        queue.enqueue("s1", {})
+        assert queue.run_pending() == 1
+        assert queue.job("s1") is None
+
+    def test_job_fails_after_max_attempts(self, temp_upload_dir):
+        """Test that exhausted jobs are kept as failed and can be re-queued."""
+        queue = open_queue(temp_upload_dir, Handler(failures=5), max_attempts=2, retry_backoff=0)
+        queue.enqueue("s1", {})
+
+        assert queue.run_pending() == 2
+        assert queue.job("s1")["state"] == "failed"
+        assert queue.stats()["failed"] == 1
+        assert queue.enqueue("s1", {})
+
+    def test_enqueue_while_running_reruns(self, temp_upload_dir):
+        """Test that a trigger arriving mid-run is not lost."""
+        queue = None
+
+        def handler(key, payload):
+            if payload.get("first"):
+                assert not queue.enqueue(key, {})
+
+        queue = open_queue(temp_upload_dir, handler)
+        queue.enqueue("s1", {"first": True})
+
+        assert queue.run_pending() == 2
+        assert queue.job("s1") is None
+
+    def test_recover_requeues_interrupted_jobs(self, temp_upload_dir):
+        """Test that running jobs of a dead owner are recovered."""
+        crashed = open_queue(temp_upload_dir, Handler(), owner_id="old-pod:1")
+        crashed.enqueue("s1", {})
+        crashed._claim()
+        assert crashed.job("s1")["state"] == "running"
+
+        survivor = open_queue(temp_upload_dir, Handler(), owner_id="new-pod:1", stale_after=60)
+        assert survivor.recover() == 0  # Heartbeat still fresh
+        restarted = open_queue(temp_upload_dir, Handler(), owner_id="old-pod:1")
+        assert restarted.recover(include_own=True) == 1
+        assert restarted.job("s1")["state"] == "queued"
+
+    def test_workers_process_jobs(self, temp_upload_dir):
+        """Test that started workers pick up queued jobs."""
+        handler = Handler()
+        queue = AssemblyQueue(handler, workers=2, poll_interval=0.05)
+        queue.start(temp_upload_dir / "queue.sqlite3")
+        try:
+            for i in range(4):
+                queue.enqueue(f"s{i}", {})
+            deadline = time.time() + 5
+            while queue.stats()["completed"] < 4 and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            queue.stop()
+
+        assert sorted(key for key, _ in handler.calls) == ["s0", "s1", "s2", "s3"]
@@ -0,0 +1,67 @@
+"""
+Unit Tests for Chunk Batch Framing
+
+Tests parsing of length-prefixed chunk records from a streamed body.
+"""
+
+import asyncio
+import pytest
+
+from routes.chunk_batch import FRAME_HEADER, FrameReader, FramingError, encode_frames
+
+
+def pieces(data: bytes, size: int):
+    """Split data into stream pieces of `size` bytes."""
+    async def stream():
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+    return stream()
+
+
+async def read_all(stream):
+    reader = FrameReader(stream)
+    frames = []
+    while (frame := await reader.next_frame()) is not None:
+        index, size = frame
+        body = b"".join([data async for data in reader.body(size)])
+        frames.append((index, body))
+    return frames
+
+
+@pytest.mark.unit
+class TestFrameReader:
+    """Test FrameReader."""
+
+    CHUNKS = [(0, b"first"), (1, b""), (7, b"x" * 1000), (2, b"last")]
+
+    @pytest.mark.parametrize("piece_size", [1, 3, 8, 13, 4096])
+    def test_records_across_piece_boundaries(self, piece_size):
+        """Test that records parse the same however the stream is split."""
+        body = encode_frames(self.CHUNKS)
+        assert asyncio.run(read_all(pieces(body, piece_size))) == self.CHUNKS
+
+    def test_empty_body(self):
+        """Test that an empty body has no records."""
+        assert asyncio.run(read_all(pieces(b"", 1))) == []
+
+    def test_skip(self):
+        """Test that a skipped body is not returned and the next record follows."""
+        async def main():
+            reader = FrameReader(pieces(encode_frames(self.CHUNKS), 5))
+            index, size = await reader.next_frame()
+            await reader.skip(size)
+            return await reader.next_frame()
+
+        assert asyncio.run(main()) == (1, 0)
+
+    def test_truncated_header(self):
+        """Test that a partial record header is rejected."""
+        body = encode_frames([(0, b"ok")]) + FRAME_HEADER.pack(1, 4)[:5]
+        with pytest.raises(FramingError, match="header"):
+            asyncio.run(read_all(pieces(body, 4)))
+
+    def test_truncated_body(self):
+        """Test that a body shorter than its declared size is rejected."""
+        body = FRAME_HEADER.pack(3, 10) + b"short"
+        with pytest.raises(FramingError, match="5 bytes short"):
+            asyncio.run(read_all(pieces(body, 4)))
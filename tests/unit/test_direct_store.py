@@ -0,0 +1,77 @@
+"""
+Unit Tests for the Direct Session Data File
+
+Tests offset reservation, the binary index and in-place finalization.
+"""
+
+import pytest
+
+from storage import DirectDataFile
+
+
+def write_chunk(direct_file, chunk_index, data):
+    """Reserve, write and commit one chunk; returns its offset."""
+    offset = direct_file.reserve(chunk_index, len(data))
+    writer = direct_file.open_writer(offset)
+    try:
+        writer.write(data)
+    finally:
+        writer.close()
+    direct_file.commit(chunk_index, offset, len(data))
+    return offset
+
+
+@pytest.mark.unit
+class TestDirectDataFile:
+    """Test the DirectDataFile layout."""
+
+    def test_reservations_are_contiguous(self, temp_upload_dir):
+        """Test that each reservation starts where the previous one ended."""
+        direct_file = DirectDataFile(temp_upload_dir / "s1", preallocate_bytes=0)
+
+        assert direct_file.reserve(0, 10) == 0
+        assert direct_file.reserve(1, 5) == 10
+        direct_file.commit(0, 0, 10)
+        assert direct_file.reserve(2, 7) == 15
+
+    def test_only_committed_chunks_are_listed(self, temp_upload_dir):
+        """Test that a reservation without commit is not treated as stored."""
+        direct_file = DirectDataFile(temp_upload_dir / "s1")
+        write_chunk(direct_file, 0, b"a" * 4)
+        direct_file.reserve(1, 4)
+
+        assert direct_file.committed() == {0: (0, 4)}
+
+    def test_in_order_chunks_finalize_by_rename(self, temp_upload_dir):
+        """Test that in-order chunks become the recording without a copy."""
+        direct_file = DirectDataFile(temp_upload_dir / "s1")
+        write_chunk(direct_file, 0, b"first-")
+        write_chunk(direct_file, 1, b"second")
+        target = temp_upload_dir / "s1" / "completed" / "out.webm"
+
+        committed = direct_file.committed()
+        assert direct_file.finalize_in_place([committed[0], committed[1]], target)
+        assert target.read_bytes() == b"first-second"
+        assert not direct_file.data_path.exists()
+
+    def test_out_of_order_chunks_are_not_renamed(self, temp_upload_dir):
+        """Test that a non-contiguous layout is left for a copy."""
+        direct_file = DirectDataFile(temp_upload_dir / "s1")
+        write_chunk(direct_file, 1, b"second")
+        write_chunk(direct_file, 0, b"first-")
+        target = temp_upload_dir / "out.webm"
+
+        committed = direct_file.committed()
+        assert not direct_file.finalize_in_place([committed[0], committed[1]], target)
+        assert not target.exists()
+        assert direct_file.data_path.exists()
+
+    def test_torn_index_record_is_dropped(self, temp_upload_dir):
+        """Test that a partial trailing record does not shift later records."""
+        direct_file = DirectDataFile(temp_upload_dir / "s1")
+        write_chunk(direct_file, 0, b"abc")
+        with open(direct_file.index_path, "ab") as index:
+            index.write(b"\x01\x02")
+
+        assert direct_file.reserve(1, 2) == 3
+        assert direct_file.committed() == {0: (0, 3)}
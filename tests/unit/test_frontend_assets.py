@@ -0,0 +1,110 @@
+"""
+Unit Tests for Frontend Assets
+
+Tests precompression, Accept-Encoding negotiation, hashed URLs and 304s.
+"""
+
+import gzip
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from routes.frontend_assets import AssetBundle, negotiate
+
+SCRIPT = b"console.log('waveforge');\n" * 200
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    """A bundle with one entry point referencing one hashed script."""
+    (tmp_path / "index.html").write_text('<script src="./app.js"></script><link href="./manifest.json">')
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    (tmp_path / "manifest.json").write_text("{}")
+    return AssetBundle(
+        {
+            "/": (tmp_path / "index.html", "text/html"),
+            "/app.js": (tmp_path / "app.js", "application/javascript"),
+            "/manifest.json": (tmp_path / "manifest.json", "application/json"),
+            "/missing.js": (tmp_path / "missing.js", "application/javascript"),
+        },
+        entrypoints=["/"],
+        hashed=["/app.js"]
+    )
+
+
+@pytest.fixture
+def client(bundle):
+    app = FastAPI()
+
+    @app.get("/{name:path}")
+    async def serve(request: Request, name: str):
+        return bundle.response(request, "/" + name)
+
+    return TestClient(app)
+
+
+@pytest.mark.unit
+class TestNegotiate:
+    """Test Accept-Encoding negotiation."""
+
+    def test_preference_and_quality(self):
+        """Test that br beats gzip and q=0 excludes an encoding."""
+        available = {"identity", "gzip", "br"}
+        assert negotiate("gzip, deflate, br", available) == "br"
+        assert negotiate("gzip, br;q=0", available) == "gzip"
+        assert negotiate("*", {"identity", "gzip"}) == "gzip"
+        assert negotiate(None, available) == "identity"
+
+
+@pytest.mark.unit
+class TestAssetBundle:
+    """Test serving frontend files from memory."""
+
+    def test_entrypoint_references_hashed_urls(self, bundle, client):
+        """Test that index.html points at content-hashed URLs of hashed files only."""
+        digest = bundle.get("/app.js").digest
+        body = client.get("/", headers={"Accept-Encoding": "identity"}).text
+
+        assert f'"/app.js?v={digest}"' in body
+        assert '"./manifest.json"' in body
+
+    def test_gzip_variant(self, client):
+        """Test that a gzip-accepting client gets the precompressed body."""
+        response = client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(SCRIPT)
+        assert response.content == SCRIPT
+
+    def test_small_files_stay_uncompressed(self, bundle):
+        """Test that files below the threshold have no compressed variants."""
+        assert list(bundle.get("/manifest.json").variants) == ["identity"]
+
+    def test_cache_policy(self, bundle, client):
+        """Test that hashed URLs are immutable and plain URLs revalidate."""
+        digest = bundle.get("/app.js").digest
+
+        assert "immutable" in client.get(f"/app.js?v={digest}").headers["cache-control"]
+        assert client.get("/app.js?v=stale").headers["cache-control"] == "no-cache"
+        assert client.get("/").headers["cache-control"] == "no-cache"
+
+    def test_revalidation_returns_304(self, client):
+        """Test that a matching If-None-Match gets 304 for any variant."""
+        etag = client.get("/", headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+        response = client.get("/", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_missing_file(self, client):
+        """Test that a configured but missing file returns 404."""
+        assert client.get("/missing.js").status_code == 404
+
+    def test_files_read_once(self, bundle, client, tmp_path):
+        """Test that later requests are served from memory."""
+        client.get("/app.js")
+        (tmp_path / "app.js").write_bytes(b"changed")
+
+        assert client.get("/app.js").content == SCRIPT
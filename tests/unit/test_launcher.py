@@ -0,0 +1,92 @@
+"""
+Unit Tests for the Production Launcher
+
+Tests CPU detection, worker sizing and the uvicorn options.
+"""
+
+import pytest
+
+import launcher
+
+
+@pytest.mark.unit
+class TestAvailableCpus:
+    """Test cgroup-aware CPU detection."""
+
+    def test_cgroup_v2_quota(self, tmp_path):
+        """Test that a cpu.max quota limits the CPU count."""
+        (tmp_path / "cpu.max").write_text("150000 100000\n")
+        assert launcher.available_cpus(tmp_path) == min(1.5, launcher.available_cpus(tmp_path / "none"))
+
+    def test_cgroup_v1_quota(self, tmp_path):
+        """Test the cfs_quota_us / cfs_period_us fallback."""
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+        assert launcher.available_cpus(tmp_path) == 0.5
+
+    def test_unlimited_quota(self, tmp_path):
+        """Test that "max" and a missing cgroup fall back to the affinity mask."""
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+        assert launcher.available_cpus(tmp_path) == launcher.available_cpus(tmp_path / "none") >= 1
+
+
+@pytest.mark.unit
+class TestWorkerCount:
+    """Test worker sizing."""
+
+    def test_one_worker_per_cpu(self):
+        """Test that fractional CPUs round up and the count is capped."""
+        assert launcher.worker_count(0, cpus=0.5, leases_enabled=True) == 1
+        assert launcher.worker_count(0, cpus=2.5, leases_enabled=True) == 3
+        assert launcher.worker_count(0, cpus=64, leases_enabled=True) == launcher.MAX_WORKERS
+
+    def test_single_worker_without_leases(self, monkeypatch):
+        """Test that uncoordinated workers are not started automatically, and that this is logged."""
+        events = []
+        monkeypatch.setattr(launcher.log, "info", lambda event, msg, **fields: events.append(event))
+        assert launcher.worker_count(0, cpus=8, leases_enabled=False) == 1
+        assert events == ["launcher_single_worker"]
+
+    def test_explicit_concurrency(self):
+        """Test that WEB_CONCURRENCY overrides the automatic count."""
+        assert launcher.worker_count(6, cpus=1, leases_enabled=True) == 6
+        assert launcher.worker_count(2, cpus=8, leases_enabled=False) == 2
+
+
+@pytest.mark.unit
+class TestServerOptions:
+    """Test the options passed to uvicorn."""
+
+    def test_options(self):
+        """Test limits, drain timeout and protocol selection."""
+        options = launcher.server_options(workers=3)
+        assert options["workers"] == 3
+        assert options["loop"] == launcher.select_loop()
+        assert options["http"] == launcher.select_http()
+        assert options["timeout_graceful_shutdown"] == launcher.GRACEFUL_SHUTDOWN_TIMEOUT
+        assert options["backlog"] == launcher.BACKLOG
+        assert (launcher.APP_DIR / "server.py").exists()
+
+    def test_sendfile_protocols(self):
+        """Test that SENDFILE selects the asyncio loop and the zero-copy protocols."""
+        assert launcher.select_loop(sendfile=True) == "asyncio"
+        assert launcher.select_loop(sendfile=False) in ("uvloop", "asyncio")
+        assert launcher.select_http(sendfile=False) in ("httptools", "h11")
+        module, name = launcher.select_http(sendfile=True).split(":")
+        assert module == "sendfile_http"
+        assert name in ("SendfileHttpToolsProtocol", "SendfileH11Protocol")
+
+    def test_untested_uvicorn_uses_stock_protocols(self, monkeypatch):
+        """Test that SENDFILE is ignored on a uvicorn release the protocols were not tested with."""
+        monkeypatch.setattr(launcher.sendfile_http, "uvicorn_supported", lambda: False)
+        assert launcher.select_http(sendfile=True) in ("httptools", "h11")
+        assert launcher.select_loop(sendfile=True) == launcher.select_loop(sendfile=False)
+
+    def test_zero_limits_disable(self, monkeypatch):
+        """Test that 0 disables the concurrency limit and worker recycling."""
+        monkeypatch.setattr(launcher, "LIMIT_CONCURRENCY", 0)
+        monkeypatch.setattr(launcher, "MAX_REQUESTS", 0)
+        options = launcher.server_options(workers=1)
+        assert options["limit_concurrency"] is None
+        assert options["limit_max_requests"] is None
@@ -0,0 +1,123 @@
+"""
+Unit Tests for Prometheus Metrics
+
+Tests the per-thread metric types, text exposition and the /metrics route.
+"""
+
+import io
+import threading
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+
+from observability import MetricsRegistry, stats_collector
+
+
+@pytest.mark.unit
+class TestMetricTypes:
+    """Test counters, histograms and collectors."""
+
+    def test_counter_sums_thread_shards(self):
+        """Test that increments from many threads are all counted."""
+        counter = MetricsRegistry().counter("test_total", "Test", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(1, ("a",))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value(("a",)) == 4000
+
+    def test_histogram_exposition(self):
+        """Test cumulative buckets, count and sum in the text format."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, ("/x",))
+
+        text = registry.render()
+
+        assert "# TYPE test_seconds histogram" in text
+        assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{route="/x",le="1.0"} 3' in text
+        assert 'test_seconds_bucket{route="/x",le="+Inf"} 4' in text
+        assert 'test_seconds_count{route="/x"} 4' in text
+        assert 'test_seconds_sum{route="/x"} 6.05' in text
+
+    def test_stats_collector(self):
+        """Test that numeric stats fields become gauges or counters."""
+        registry = MetricsRegistry()
+        registry.register(stats_collector(
+            "pool", lambda: {"running": 2, "done": 7, "wait_total": 1.5, "owner": "x"},
+            counters=("done", "wait_total")
+        ))
+
+        text = registry.render()
+
+        assert "# TYPE pool_running gauge\npool_running 2" in text
+        assert "# TYPE pool_done_total counter\npool_done_total 7" in text
+        assert "# TYPE pool_wait_total counter\npool_wait_total 1.5" in text
+        assert "owner" not in text
+
+    def test_stats_collector_buckets(self):
+        """Test that a per-bucket counts field becomes a cumulative histogram."""
+        registry = MetricsRegistry()
+        registry.register(stats_collector(
+            "lease", lambda: {
+                "wait_seconds_total": 2.5,
+                "wait_seconds_buckets": {"0.1": 3, "1.0": 0, "+Inf": 1},
+            },
+            counters=("wait_seconds_total",)
+        ))
+
+        text = registry.render()
+
+        assert "# TYPE lease_wait_seconds histogram" in text
+        assert 'lease_wait_seconds_bucket{le="0.1"} 3' in text
+        assert 'lease_wait_seconds_bucket{le="1.0"} 3' in text
+        assert 'lease_wait_seconds_bucket{le="+Inf"} 4' in text
+        assert "lease_wait_seconds_count 4" in text
+        assert "lease_wait_seconds_sum 2.5" in text
+        assert "# TYPE lease_wait_seconds_total counter" in text
+
+    def test_label_escaping(self):
+        """Test that quotes and backslashes in label values are escaped."""
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test", ("path",)).inc(1, ('a"b\\c',))
+        assert 'test_total{path="a\\"b\\\\c"} 1' in registry.render()
+
+
+@pytest.mark.unit
+class TestMetricsEndpoint:
+    """Test GET /metrics."""
+
+    def test_upload_is_instrumented(self, temp_upload_dir, monkeypatch):
+        """Test that a chunk upload shows up in ingest, route and storage metrics."""
+        import routes.tus_upload
+        from app.server import app
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+        client = TestClient(app, base_url="http://testserver")
+
+        client.post(
+            "/upload/chunk",
+            data={"session_id": str(uuid.uuid4()), "chunk_index": "0", "total_chunks": "2"},
+            files={"file": ("chunk", io.BytesIO(b"x" * 100), "audio/webm")},
+        )
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'waveforge_ingested_bytes_total{endpoint="upload_chunk"}' in text
+        assert 'waveforge_http_request_duration_seconds_count{method="POST",route="/upload/chunk",status="200"}' in text
+        assert "waveforge_storage_call_duration_seconds_bucket" in text
+        assert "waveforge_sessions_active" in text
+        assert "waveforge_sessions_hits_total" in text
+        assert "waveforge_assembly_queue_queue_depth" in text
+        assert "waveforge_assembly_engine_duration_seconds_total" in text
+        assert 'waveforge_session_leases_wait_seconds_bucket{le="+Inf"}' in text
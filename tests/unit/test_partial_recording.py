@@ -0,0 +1,81 @@
+"""
+Unit Tests for Incremental Recording Assembly
+
+Tests watermark persistence, prefix extension and finishing.
+"""
+
+import pytest
+
+from storage import AssemblyEngine, PartialRecording
+
+
+@pytest.fixture
+def chunks(temp_upload_dir):
+    """Four chunk files; `present` controls which ones have arrived."""
+    paths = []
+    for i, data in enumerate([b"aa", b"bbb", b"c", b"dddd"]):
+        path = temp_upload_dir / f"chunk_{i}.bin"
+        path.write_bytes(data)
+        paths.append((path, 0, len(data)))
+    return paths
+
+
+def locator(chunks, present):
+    return lambda i: chunks[i] if i in present else None
+
+
+@pytest.mark.unit
+class TestPartialRecording:
+    """Test PartialRecording extension and finish."""
+
+    def test_extend_stops_at_first_gap(self, temp_upload_dir, chunks):
+        """Test that only the contiguous prefix is appended."""
+        partial = PartialRecording(temp_upload_dir / "s1", AssemblyEngine())
+
+        assert partial.extend(locator(chunks, {0, 1, 3})) == 2
+        assert partial.watermark() == (2, 5)
+        assert partial.data_path.read_bytes() == b"aabbb"
+
+        # Chunk 2 arrives: the prefix now extends through chunk 3
+        assert partial.extend(locator(chunks, {0, 1, 2, 3})) == 2
+        assert partial.watermark() == (4, 10)
+
+    def test_extend_respects_limit(self, temp_upload_dir, chunks):
+        """Test that chunks past total_chunks are not appended."""
+        partial = PartialRecording(temp_upload_dir / "s1", AssemblyEngine())
+
+        assert partial.extend(locator(chunks, {0, 1, 2, 3}), limit=3) == 3
+        assert partial.watermark() == (3, 6)
+
+    def test_finish_copies_only_the_tail(self, temp_upload_dir, chunks):
+        """Test that finishing appends the chunks after the watermark and renames."""
+        partial = PartialRecording(temp_upload_dir / "s1", AssemblyEngine())
+        partial.extend(locator(chunks, {0, 1}))
+        target = temp_upload_dir / "s1" / "completed" / "out.webm"
+
+        report = partial.finish(chunks, target)
+
+        assert target.read_bytes() == b"aabbbcdddd"
+        assert report["bytes"] == 5
+        assert not partial.dir.exists()
+
+    def test_torn_tail_is_truncated(self, temp_upload_dir, chunks):
+        """Test that bytes written after the watermark (crash) are dropped."""
+        partial = PartialRecording(temp_upload_dir / "s1", AssemblyEngine())
+        partial.extend(locator(chunks, {0}))
+        with open(partial.data_path, "ab") as f:
+            f.write(b"garbage")
+
+        partial.extend(locator(chunks, {0, 1}))
+
+        assert partial.data_path.read_bytes() == b"aabbb"
+
+    def test_changed_chunk_discards_partial(self, temp_upload_dir, chunks):
+        """Test that a prefix chunk that changed size invalidates the partial file."""
+        partial = PartialRecording(temp_upload_dir / "s1", AssemblyEngine())
+        partial.extend(locator(chunks, {0, 1}))
+        chunks[1][0].write_bytes(b"bbbbbb")
+        chunks[1] = (chunks[1][0], 0, 6)
+
+        assert partial.finish(chunks, temp_upload_dir / "out.webm") is None
+        assert not partial.dir.exists()
@@ -0,0 +1,428 @@
+"""
+Unit Tests for Ranged Recording Responses
+
+Tests Range parsing, 206/416 responses and conditional GET on /recordings.
+"""
+
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+
+from routes.ranged_response import ByteSource, parse_range_header
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def recording(temp_upload_dir, monkeypatch):
+    """A completed recording in <session>/completed/."""
+    import routes.recording_complete
+    monkeypatch.setattr(routes.recording_complete, "UPLOAD_DIR", temp_upload_dir)
+    session_id = str(uuid.uuid4())
+    completed = temp_upload_dir / session_id / "completed"
+    completed.mkdir(parents=True)
+    (completed / "take.webm").write_bytes(CONTENT)
+    return f"/recordings/{session_id}/take.webm"
+
+
+@pytest.fixture
+def test_client():
+    from app.server import app
+    return TestClient(app, base_url="http://testserver")
+
+
+@pytest.mark.unit
+class TestParseRangeHeader:
+    """Test Range header parsing."""
+
+    def test_forms(self):
+        """Test closed, open-ended and suffix ranges."""
+        assert parse_range_header("bytes=0-9", 100) == [(0, 9)]
+        assert parse_range_header("bytes=90-", 100) == [(90, 99)]
+        assert parse_range_header("bytes=-10", 100) == [(90, 99)]
+        assert parse_range_header("bytes=95-200", 100) == [(95, 99)]
+
+    def test_overlapping_ranges_are_merged(self):
+        """Test that overlapping and adjacent ranges are coalesced."""
+        assert parse_range_header("bytes=20-29,0-9,10-14,25-40", 100) == [(0, 14), (20, 40)]
+
+    def test_unsatisfiable_and_invalid(self):
+        """Test that unsatisfiable ranges give [] and bad syntax gives None."""
+        assert parse_range_header("bytes=100-", 100) == []
+        assert parse_range_header("bytes=5-1", 100) is None
+        assert parse_range_header("items=0-1", 100) is None
+        assert parse_range_header("bytes=a-b", 100) is None
+
+
+@pytest.mark.unit
+class TestByteSource:
+    """Test reads across segment boundaries."""
+
+    def test_read_spans_segments(self, temp_upload_dir):
+        """Test that a read crossing files returns the concatenated bytes."""
+        (temp_upload_dir / "a").write_bytes(b"0123")
+        (temp_upload_dir / "b").write_bytes(b"xx4567")
+        source = ByteSource([(temp_upload_dir / "a", 0, 4), (temp_upload_dir / "b", 2, 4)], '"e"', 0)
+
+        assert source.size == 8
+        assert source.read(2, 4) == b"2345"
+        assert source.read(6, 10) == b"67"
+
+
+@pytest.mark.unit
+class TestRecordingRanges:
+    """Test GET /recordings/{session_id}/{file_name}."""
+
+    def test_full_download(self, test_client, recording):
+        """Test that a plain GET returns the whole file with validators."""
+        response = test_client.get(recording)
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"].startswith('"')
+        assert "last-modified" in response.headers
+
+    def test_single_range(self, test_client, recording):
+        """Test that a single range returns 206 with Content-Range."""
+        response = test_client.get(recording, headers={"Range": "bytes=100-199"})
+
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == "bytes 100-199/1024"
+        assert response.headers["content-length"] == "100"
+
+    def test_multiple_ranges(self, test_client, recording):
+        """Test that several ranges return a multipart/byteranges body."""
+        response = test_client.get(recording, headers={"Range": "bytes=0-9,1000-"})
+
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        body = response.content
+        assert len(body) == int(response.headers["content-length"])
+        assert b"Content-Range: bytes 0-9/1024\r\n\r\n" + CONTENT[:10] + b"\r\n--" + boundary.encode() in body
+        assert body.endswith(CONTENT[1000:] + f"\r\n--{boundary}--\r\n".encode())
+
+    def test_unsatisfiable_range(self, test_client, recording):
+        """Test that a range past the end returns 416."""
+        response = test_client.get(recording, headers={"Range": "bytes=5000-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */1024"
+
+    def test_if_none_match(self, test_client, recording):
+        """Test that a matching ETag returns 304."""
+        etag = test_client.get(recording).headers["etag"]
+
+        response = test_client.get(recording, headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_if_modified_since(self, test_client, recording):
+        """Test that an unchanged file returns 304 for If-Modified-Since."""
+        last_modified = test_client.get(recording).headers["last-modified"]
+
+        response = test_client.get(recording, headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+
+    def test_if_range_mismatch_returns_full_file(self, test_client, recording):
+        """Test that a stale If-Range validator ignores the Range header."""
+        response = test_client.get(recording, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_if_range_match_returns_range(self, test_client, recording):
+        """Test that a current If-Range ETag keeps the range."""
+        etag = test_client.get(recording).headers["etag"]
+
+        response = test_client.get(recording, headers={"Range": "bytes=0-9", "If-Range": etag})
+
+        assert response.status_code == 206
+        assert response.content == CONTENT[:10]
+
+    def test_head_has_length_without_body(self, test_client, recording):
+        """Test that HEAD reports the size without sending the file."""
+        response = test_client.head(recording)
+
+        assert response.status_code == 200
+        assert response.headers["content-length"] == "1024"
+        assert response.content == b""
+
+    def test_path_outside_session_is_rejected(self, test_client, recording):
+        """Test that file names cannot escape the session directory."""
+        session_path = recording.rsplit("/", 1)[0]
+
+        assert test_client.get(f"{session_path}/..").status_code == 404
+
+
+@pytest.mark.unit
+class TestLivePlayback:
+    """Test GET /recordings/{session_id}/_live during an upload."""
+
+    @pytest.fixture
+    def live_client(self, temp_upload_dir, monkeypatch, test_client):
+        import routes.recording_complete
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.recording_complete, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.recording_complete, "LIVE_POLL_INTERVAL", 0.05)
+        return test_client
+
+    def upload(self, client, session_id, index, data):
+        import io
+        response = client.post(
+            "/upload/chunk",
+            data={"session_id": session_id, "chunk_index": str(index), "total_chunks": "3",
+                  "recording_name": "live", "format": "webm"},
+            files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+        )
+        assert response.status_code == 200
+
+    def test_serves_contiguous_prefix(self, live_client):
+        """Test that only the in-order prefix is visible, across chunk files."""
+        session_id = str(uuid.uuid4())
+        self.upload(live_client, session_id, 0, b"first-")
+        self.upload(live_client, session_id, 2, b"third")
+
+        response = live_client.get(f"/recordings/{session_id}/_live")
+
+        assert response.status_code == 200
+        assert response.content == b"first-"
+        assert response.headers["content-type"] == "audio/webm"
+        assert response.headers["x-recording-complete"] == "false"
+
+    def test_range_past_end_waits_then_416(self, live_client):
+        """Test that a caught-up reader long-polls and then gets 416."""
+        import time
+        session_id = str(uuid.uuid4())
+        self.upload(live_client, session_id, 0, b"first-")
+
+        started = time.monotonic()
+        response = live_client.get(f"/recordings/{session_id}/_live?wait=0.2", headers={"Range": "bytes=6-"})
+
+        assert response.status_code == 416
+        assert time.monotonic() - started >= 0.2
+
+    def test_prefix_grows_and_switches_to_completed_file(self, live_client):
+        """Test that new chunks extend the stream and the final file takes over."""
+        session_id = str(uuid.uuid4())
+        self.upload(live_client, session_id, 0, b"first-")
+        self.upload(live_client, session_id, 2, b"third")
+        self.upload(live_client, session_id, 1, b"second-")
+
+        response = live_client.get(f"/recordings/{session_id}/_live", headers={"Range": "bytes=6-"})
+
+        assert response.status_code == 206
+        assert response.content == b"second-third"
+        assert response.headers["x-recording-complete"] == "true"
+
+    def test_unknown_session(self, live_client):
+        """Test that an unknown session returns 404."""
+        assert live_client.get(f"/recordings/{uuid.uuid4()}/_live").status_code == 404
+
+    def test_recording_named_live_is_not_shadowed(self, live_client, temp_upload_dir):
+        """Test that a completed recording called "live" is served as a file."""
+        session_id = str(uuid.uuid4())
+        completed = temp_upload_dir / session_id / "completed"
+        completed.mkdir(parents=True)
+        (completed / "live").write_bytes(b"saved take")
+
+        response = live_client.get(f"/recordings/{session_id}/live")
+
+        assert response.status_code == 200
+        assert response.content == b"saved take"
+
+
+@pytest.mark.unit
+class TestManifestRecordings:
+    """Test RECORDING_MODE=manifest, where recordings are served from their chunks."""
+
+    @pytest.fixture
+    def manifest_client(self, temp_upload_dir, monkeypatch, test_client):
+        import routes.recording_complete
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.recording_complete, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.tus_upload, "RECORDING_MODE", "manifest")
+        monkeypatch.setattr(routes.tus_upload, "MANIFEST_COMPACT_ACCESSES", 2)
+        return test_client
+
+    def upload_all(self, client, session_id, chunks):
+        import io
+        for index, data in enumerate(chunks):
+            response = client.post(
+                "/upload/chunk",
+                data={"session_id": session_id, "chunk_index": str(index), "total_chunks": str(len(chunks)),
+                      "recording_name": "virtual", "format": "webm"},
+                files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+            )
+            assert response.status_code == 200
+
+    def test_assembly_writes_manifest_and_keeps_chunks(self, manifest_client, temp_upload_dir):
+        """Test that no bytes are copied when the recording completes."""
+        session_id = str(uuid.uuid4())
+        self.upload_all(manifest_client, session_id, [b"first-", b"second-", b"third"])
+
+        completed = temp_upload_dir / session_id / "completed"
+        assert not (completed / "virtual.webm").exists()
+        assert (completed / "virtual.webm.manifest.json").is_file()
+        assert (temp_upload_dir / session_id / "chunks" / "chunk_0.bin").exists()
+
+    def test_range_spans_chunks(self, manifest_client):
+        """Test that a range across chunk boundaries is served from the manifest."""
+        session_id = str(uuid.uuid4())
+        self.upload_all(manifest_client, session_id, [b"first-", b"second-", b"third"])
+
+        response = manifest_client.get(f"/recordings/{session_id}/virtual.webm", headers={"Range": "bytes=4-14"})
+
+        assert response.status_code == 206
+        assert response.content == b"t-second-th"
+        assert response.headers["content-range"] == "bytes 4-14/18"
+        assert response.headers["etag"].startswith('"m-')
+
+    def test_full_download_materializes(self, manifest_client, temp_upload_dir):
+        """Test that the first full GET builds the real file and drops the chunks."""
+        session_id = str(uuid.uuid4())
+        self.upload_all(manifest_client, session_id, [b"first-", b"second-", b"third"])
+
+        response = manifest_client.get(f"/recordings/{session_id}/virtual.webm")
+
+        assert response.status_code == 200
+        assert response.content == b"first-second-third"
+        completed = temp_upload_dir / session_id / "completed"
+        assert (completed / "virtual.webm").read_bytes() == b"first-second-third"
+        assert not (completed / "virtual.webm.manifest.json").exists()
+        assert not (temp_upload_dir / session_id / "chunks").exists()
+
+    def test_repeated_ranges_materialize(self, manifest_client, temp_upload_dir):
+        """Test that enough ranged reads compact the manifest into a file."""
+        session_id = str(uuid.uuid4())
+        self.upload_all(manifest_client, session_id, [b"first-", b"second-"])
+        url = f"/recordings/{session_id}/virtual.webm"
+        output = temp_upload_dir / session_id / "completed" / "virtual.webm"
+
+        manifest_client.get(url, headers={"Range": "bytes=0-3"})
+        assert not output.exists()
+        manifest_client.get(url, headers={"Range": "bytes=0-3"})
+        assert output.read_bytes() == b"first-second-"
+        import routes.recording_complete
+        assert str(output) not in routes.recording_complete.manifest_reads
+
+    def test_read_counts_are_bounded(self, manifest_client, temp_upload_dir, monkeypatch):
+        """Test that read counts of rarely read recordings are forgotten past MANIFEST_READS_MAX."""
+        from collections import OrderedDict
+        import routes.recording_complete
+        monkeypatch.setattr(routes.recording_complete, "manifest_reads", OrderedDict())
+        monkeypatch.setattr(routes.recording_complete, "MANIFEST_READS_MAX", 2)
+        sessions = [str(uuid.uuid4()) for _ in range(3)]
+        for session_id in sessions:
+            self.upload_all(manifest_client, session_id, [b"first-", b"second-"])
+            manifest_client.get(f"/recordings/{session_id}/virtual.webm", headers={"Range": "bytes=0-3"})
+
+        assert list(routes.recording_complete.manifest_reads) == [
+            str(temp_upload_dir / session_id / "completed" / "virtual.webm") for session_id in sessions[1:]
+        ]
+
+
+async def asgi_get(app, path, extensions, headers=()):
+    """Call the app directly and collect the messages it sends."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("testserver", 80), "client": ("127.0.0.1", 1234),
+        "headers": [(b"host", b"testserver"), *headers], "extensions": extensions,
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+@pytest.mark.unit
+class TestPathsend:
+    """Test that whole files are handed to servers offering http.response.pathsend."""
+
+    def test_full_file_uses_pathsend(self, recording, temp_upload_dir):
+        """Test that a full download sends the path instead of the bytes."""
+        import asyncio
+        from app.server import app
+        messages = asyncio.run(asgi_get(app, recording, {"http.response.pathsend": {}}))
+
+        assert messages[0]["status"] == 200
+        assert messages[1]["type"] == "http.response.pathsend"
+        assert messages[1]["path"].endswith("take.webm")
+        assert len(messages) == 2
+
+    def test_range_falls_back_to_body(self, recording):
+        """Test that a partial response streams the range as body messages."""
+        import asyncio
+        from app.server import app
+        messages = asyncio.run(asgi_get(
+            app, recording, {"http.response.pathsend": {}}, headers=[(b"range", b"bytes=10-19")]
+        ))
+
+        assert messages[0]["status"] == 206
+        assert b"".join(m["body"] for m in messages[1:]) == CONTENT[10:20]
+
+    def test_without_extension_streams_body(self, recording):
+        """Test the fallback when the server does not offer pathsend."""
+        import asyncio
+        from app.server import app
+        messages = asyncio.run(asgi_get(app, recording, {}))
+
+        assert all(m["type"] != "http.response.pathsend" for m in messages)
+        assert b"".join(m.get("body", b"") for m in messages[1:]) == CONTENT
+
+    def test_range_uses_zerocopysend(self, recording):
+        """Test that a single range is handed over as an open file when zerocopysend is offered."""
+        import asyncio
+        from app.server import app
+        messages = asyncio.run(asgi_get(
+            app, recording, {"http.response.pathsend": {}, "http.response.zerocopysend": {}},
+            headers=[(b"range", b"bytes=10-19")]
+        ))
+
+        assert messages[0]["status"] == 206
+        assert messages[1]["type"] == "http.response.zerocopysend"
+        assert (messages[1]["offset"], messages[1]["count"]) == (10, 10)
+        assert messages[1]["file"].name.endswith("take.webm")
+        assert messages[1]["file"].closed
+        assert len(messages) == 2
+
+    def test_manifest_recording_uses_pathsend(self, temp_upload_dir, monkeypatch, test_client):
+        """Test that a manifest recording is sent via pathsend once the first full GET materialized it."""
+        import asyncio
+        import io
+        import routes.recording_complete
+        import routes.tus_upload
+        from app.server import app
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.recording_complete, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(routes.tus_upload, "RECORDING_MODE", "manifest")
+        session_id = str(uuid.uuid4())
+        response = test_client.post(
+            "/upload/chunk",
+            data={"session_id": session_id, "chunk_index": "0", "total_chunks": "1",
+                  "recording_name": "virtual", "format": "webm"},
+            files={"file": ("chunk", io.BytesIO(CONTENT), "audio/webm")},
+        )
+        assert response.status_code == 200
+        url = f"/recordings/{session_id}/virtual.webm"
+        assert test_client.get(url).content == CONTENT
+
+        messages = asyncio.run(asgi_get(app, url, {"http.response.pathsend": {}}))
+
+        assert messages[0]["status"] == 200
+        assert messages[1]["type"] == "http.response.pathsend"
+        assert messages[1]["path"].endswith("virtual.webm")
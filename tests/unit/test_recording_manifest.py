@@ -0,0 +1,56 @@
+"""
+Unit Tests for Recording Manifests
+
+Tests writing, loading and materializing manifest-backed recordings.
+"""
+
+import pytest
+
+from storage import AssemblyEngine, RecordingManifest
+
+
+@pytest.fixture
+def segments(temp_upload_dir):
+    """Two chunk files and their (path, offset, size) segments."""
+    chunks = temp_upload_dir / "chunks"
+    chunks.mkdir()
+    (chunks / "chunk_0.bin").write_bytes(b"hello ")
+    (chunks / "chunk_1.bin").write_bytes(b"xxworld")
+    return [(chunks / "chunk_0.bin", 0, 6), (chunks / "chunk_1.bin", 2, 5)]
+
+
+@pytest.mark.unit
+class TestRecordingManifest:
+    """Test the RecordingManifest layout."""
+
+    def test_write_and_load(self, temp_upload_dir, segments):
+        """Test that segments round-trip with relative paths and a fixed ETag."""
+        manifest = RecordingManifest(temp_upload_dir / "completed" / "take.webm", temp_upload_dir)
+
+        assert manifest.write(segments) == 11
+        data = manifest.load()
+
+        assert data["size"] == 11
+        assert data["segments"][0]["path"] == "chunks/chunk_0.bin"
+        assert [s["start"] for s in data["segments"]] == [0, 6]
+        assert manifest.segments(data) == segments
+        assert manifest.load()["etag"] == data["etag"]
+
+    def test_missing_manifest(self, temp_upload_dir):
+        """Test that a recording without a manifest loads as None."""
+        manifest = RecordingManifest(temp_upload_dir / "take.webm", temp_upload_dir)
+        assert not manifest.exists()
+        assert manifest.load() is None
+        assert manifest.materialize(AssemblyEngine()) is None
+
+    def test_materialize(self, temp_upload_dir, segments):
+        """Test that materializing writes the real file and drops the manifest."""
+        output = temp_upload_dir / "completed" / "take.webm"
+        manifest = RecordingManifest(output, temp_upload_dir)
+        manifest.write(segments)
+
+        report = manifest.materialize(AssemblyEngine())
+
+        assert report["bytes"] == 11
+        assert output.read_bytes() == b"hello world"
+        assert not manifest.exists()
@@ -0,0 +1,133 @@
+"""
+Unit Tests for the Zero-Copy HTTP Protocols
+
+Runs uvicorn with the sendfile protocols on a local port and checks the
+framing of zerocopysend and pathsend bodies over keep-alive connections.
+"""
+
+import asyncio
+import http.client
+import socket
+import threading
+from contextlib import contextmanager
+import pytest
+import uvicorn
+
+import sendfile_http
+
+PROTOCOLS = [sendfile_http.SendfileH11Protocol]
+if sendfile_http.SendfileHttpToolsProtocol is not None:
+    PROTOCOLS.append(sendfile_http.SendfileHttpToolsProtocol)
+
+
+def make_app(path, sends):
+    """ASGI app sending `path` with the extension named by the request path."""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        extensions = scope.get("extensions", {})
+        kind = scope["path"].strip("/")
+        sends.append(kind)
+        size = b"10" if kind == "range" else str(path.stat().st_size).encode()
+        headers = [] if kind == "chunked" else [(b"content-length", size)]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if kind == "pathsend":
+            assert "http.response.pathsend" in extensions
+            await send({"type": "http.response.pathsend", "path": str(path)})
+        else:
+            assert "http.response.zerocopysend" in extensions
+            with open(path, "rb") as f:
+                offset, count = (5, 10) if kind == "range" else (0, None)
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": offset,
+                            "count": count, "more_body": kind == "chunked"})
+            if kind == "chunked":
+                await send({"type": "http.response.body", "body": b"tail", "more_body": False})
+    return app
+
+
+@contextmanager
+def serve(app, protocol):
+    """Run `app` under uvicorn with `protocol` on a free port; yields the port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, loop="asyncio",
+                            http=protocol, lifespan="off", log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve()))
+    thread.start()
+    while not server.started:
+        threading.Event().wait(0.01)
+    try:
+        yield port
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+@pytest.fixture(params=PROTOCOLS, ids=lambda p: p.__name__)
+def served(request, tmp_path):
+    """Serve the test app with one sendfile protocol; yields (port, file data, sends)."""
+    data = bytes(range(256)) * 1024
+    path = tmp_path / "file.bin"
+    path.write_bytes(data)
+    sends = []
+    with serve(make_app(path, sends), request.param) as port:
+        yield port, data, sends
+
+
+@pytest.mark.unit
+class TestSendfileProtocols:
+    """Test zero-copy bodies under uvicorn."""
+
+    def test_bodies_over_one_connection(self, served):
+        """Test full, ranged, chunked and pathsend bodies back to back on a keep-alive connection."""
+        port, data, sends = served
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        try:
+            expected = {
+                "full": data, "range": data[5:15], "chunked": data + b"tail", "pathsend": data,
+            }
+            for kind, body in expected.items():
+                conn.request("GET", f"/{kind}")
+                response = conn.getresponse()
+                assert response.status == 200
+                assert response.read() == body
+        finally:
+            conn.close()
+        assert sends == list(expected)
+
+    @pytest.mark.parametrize("protocol", PROTOCOLS, ids=lambda p: p.__name__)
+    def test_changed_cycle_falls_back(self, protocol):
+        """Test that a request cycle without the expected attributes gets the stock path."""
+        offered = []
+
+        async def app(scope, receive, send):
+            if scope["type"] != "http":
+                return
+            offered.append(set(scope.get("extensions", {})))
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        changed = type("Changed" + protocol.__name__, (protocol,), {
+            "cycle_attributes": protocol.cycle_attributes + ("attribute_removed_upstream",)
+        })
+        with serve(app, changed) as port:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            try:
+                for _ in range(2):
+                    conn.request("GET", "/")
+                    assert conn.getresponse().read() == b"ok"
+            finally:
+                conn.close()
+        assert changed.cycle_compatible is False
+        assert len(offered) == 2
+        assert all(not extensions & set(sendfile_http.ZEROCOPY_EXTENSIONS) for extensions in offered)
+
+    def test_uvicorn_versions(self):
+        """Test the tested-release gate."""
+        assert sendfile_http.uvicorn_supported(uvicorn.__version__)
+        assert sendfile_http.uvicorn_supported("0.38.2")
+        assert not sendfile_http.uvicorn_supported("0.37.0")
+        assert not sendfile_http.uvicorn_supported("1.0.0")
+        assert not sendfile_http.uvicorn_supported("dev")
@@ -124,3 +124,40 @@ class TestConfigEndpoint:
         assert "chunk_size" in config
         assert "upload_methods" in config
         assert "tus" in config["upload_methods"]
+
+
+@pytest.mark.unit
+class TestSecurityHeaders:
+    """Test the pure ASGI security header middleware."""
+    
+    def test_headers_on_json_response(self, test_client):
+        """Test that every security header is set once."""
+        response = test_client.get("/health")
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "default-src 'self'" in response.headers["content-security-policy"]
+        assert len(response.headers.get_list("x-frame-options")) == 1
+    
+    def test_headers_on_cors_preflight(self, test_client):
+        """Test that preflights answered by CORSMiddleware get the headers too."""
+        response = test_client.options(
+            "/files/abc/chunks/",
+            headers={"Origin": "http://localhost:8000", "Access-Control-Request-Method": "PATCH"},
+        )
+        assert response.status_code == 200
+        assert response.headers["strict-transport-security"].startswith("max-age=")
+    
+    def test_same_named_header_is_replaced(self):
+        """Test that a header set by the app is replaced, not duplicated."""
+        from fastapi import FastAPI, Response
+        from app.server import SecurityHeadersMiddleware
+        
+        inner = FastAPI()
+        
+        @inner.get("/")
+        async def index():
+            return Response("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+        
+        inner.add_middleware(SecurityHeadersMiddleware)
+        response = TestClient(inner).get("/")
+        assert response.headers.get_list("x-frame-options") == ["DENY"]
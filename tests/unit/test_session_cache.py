@@ -0,0 +1,129 @@
+"""
+Unit Tests for the Session State Cache
+
+Tests LRU behaviour, hit/miss accounting and write-behind persistence.
+"""
+
+import pytest
+
+from storage import SessionCache, SessionJournal
+
+
+def new_session(total_chunks=3):
+    return {
+        "recording_name": "cache_test",
+        "format": "webm",
+        "total_chunks": total_chunks,
+        "uploaded_chunks": set(),
+        "chunk_sizes": {},
+        "client_metadata": {}
+    }
+
+
+@pytest.mark.unit
+class TestSessionCache:
+    """Test the SessionCache write-behind LRU."""
+
+    def test_hit_and_miss_counters(self, temp_upload_dir):
+        """Test that the second lookup of a session is served from memory."""
+        store = SessionJournal(temp_upload_dir / "s1")
+        store.compact(new_session())
+        cache = SessionCache(max_entries=4, flush_interval=60)
+
+        first = cache.get(store)
+        second = cache.get(store)
+
+        assert first is second
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_chunk_records_are_written_behind(self, temp_upload_dir):
+        """Test that chunk records stay in memory until flushed."""
+        store = SessionJournal(temp_upload_dir / "s2")
+        cache = SessionCache(max_entries=4, flush_interval=60)
+        session = cache.put(store, new_session())
+
+        session["uploaded_chunks"].add(0)
+        session["chunk_sizes"]["0"] = 42
+        cache.record_chunk(store, session, 0, 42)
+        assert not store.exists()
+        assert cache.stats()["dirty"] == 1
+
+        cache.flush(store)
+        assert store.load()["chunk_sizes"] == {"0": 42}
+        assert cache.stats()["dirty"] == 0
+
+    def test_zero_interval_is_write_through(self, temp_upload_dir):
+        """Test that a flush interval of 0 persists every change immediately."""
+        store = SessionJournal(temp_upload_dir / "s3")
+        cache = SessionCache(max_entries=4, flush_interval=0)
+        session = cache.put(store, new_session())
+
+        session["uploaded_chunks"].add(1)
+        session["chunk_sizes"]["1"] = 7
+        cache.record_chunk(store, session, 1, 7)
+
+        assert store.load()["uploaded_chunks"] == {1}
+
+    def test_eviction_flushes_dirty_sessions(self, temp_upload_dir):
+        """Test that the least recently used session is persisted on eviction."""
+        cache = SessionCache(max_entries=1, flush_interval=60)
+        store_a = SessionJournal(temp_upload_dir / "a")
+        store_b = SessionJournal(temp_upload_dir / "b")
+
+        session_a = cache.put(store_a, new_session())
+        cache.mark_header_dirty(store_a, session_a)
+        cache.put(store_b, new_session())
+
+        assert store_a.exists()
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 1
+
+    def test_discard_drops_pending_changes(self, temp_upload_dir):
+        """Test that discarded sessions are not written back."""
+        store = SessionJournal(temp_upload_dir / "s4")
+        cache = SessionCache(max_entries=4, flush_interval=60)
+        session = cache.put(store, new_session())
+        cache.mark_header_dirty(store, session)
+
+        cache.discard(store)
+        cache.flush_all()
+
+        assert not store.exists()
+
+    def test_deferred_eviction_waits_for_the_flusher(self, temp_upload_dir):
+        """Test that without inline flushing an evicted session is written by flush_due, not by the evicting call."""
+        cache = SessionCache(max_entries=1, flush_interval=60, inline_flush=False)
+        store_a = SessionJournal(temp_upload_dir / "a")
+        store_b = SessionJournal(temp_upload_dir / "b")
+
+        session_a = cache.put(store_a, new_session())
+        cache.mark_header_dirty(store_a, session_a)
+        cache.put(store_b, new_session())
+
+        assert not store_a.exists()
+        assert cache.is_due(store_a)
+        cache.flush_due()
+        assert store_a.exists()
+        assert not cache.is_dirty(store_a)
+        assert cache.stats()["dirty"] == 0
+
+    def test_lookup_brings_back_an_evicted_session(self, temp_upload_dir):
+        """Test that a session evicted with pending changes is not reloaded stale from disk."""
+        cache = SessionCache(max_entries=1, flush_interval=60, inline_flush=False)
+        store_a = SessionJournal(temp_upload_dir / "a")
+        store_a.compact(new_session())
+        store_b = SessionJournal(temp_upload_dir / "b")
+
+        session_a = cache.get(store_a)
+        session_a["uploaded_chunks"].add(0)
+        session_a["chunk_sizes"]["0"] = 5
+        cache.record_chunk(store_a, session_a, 0, 5)
+        cache.put(store_b, new_session())
+
+        assert cache.get(store_a) is session_a
+        session_a["uploaded_chunks"].add(1)
+        session_a["chunk_sizes"]["1"] = 6
+        cache.record_chunk(store_a, session_a, 1, 6)
+        cache.flush_all()
+        assert store_a.load()["chunk_sizes"] == {"0": 5, "1": 6}
@@ -0,0 +1,97 @@
+"""
+Unit Tests for the Journaled Session Store
+
+Tests header/journal layout, replay and compaction of session state.
+"""
+
+import json
+import pytest
+from datetime import datetime
+
+from storage import SessionJournal
+
+
+@pytest.fixture
+def session_info():
+    """Minimal session dict as created by the upload routes."""
+    return {
+        "recording_name": "journal_test",
+        "format": "webm",
+        "total_chunks": 3,
+        "uploaded_chunks": set(),
+        "started_at": datetime.now().isoformat(),
+        "chunk_sizes": {},
+        "client_metadata": {}
+    }
+
+
+@pytest.mark.unit
+class TestSessionJournal:
+    """Test the SessionJournal storage layout."""
+
+    def test_load_missing_session(self, temp_upload_dir):
+        """Test that an unknown session loads as None."""
+        assert SessionJournal(temp_upload_dir / "missing").load() is None
+
+    def test_append_keeps_header_small(self, temp_upload_dir, session_info):
+        """Test that chunk records go to the journal, not the header."""
+        store = SessionJournal(temp_upload_dir / "s1")
+        store.write_header(session_info)
+
+        for i in range(3):
+            session_info["uploaded_chunks"].add(i)
+            session_info["chunk_sizes"][str(i)] = 100 + i
+            store.append_chunk(session_info, i, 100 + i)
+
+        header = json.loads(store.header_path.read_text())
+        assert "uploaded_chunks" not in header
+        assert "chunk_sizes" not in header
+        assert store.journal_path.read_text().splitlines() == ["0 100", "1 101", "2 102"]
+
+        loaded = store.load()
+        assert loaded["uploaded_chunks"] == {0, 1, 2}
+        assert loaded["chunk_sizes"] == {"0": 100, "1": 101, "2": 102}
+        assert loaded["recording_name"] == "journal_test"
+
+    def test_torn_record_is_ignored(self, temp_upload_dir, session_info):
+        """Test that a partially written trailing record is skipped on replay."""
+        store = SessionJournal(temp_upload_dir / "s2")
+        session_info["uploaded_chunks"].add(0)
+        session_info["chunk_sizes"]["0"] = 10
+        store.append_chunk(session_info, 0, 10)
+
+        with open(store.journal_path, "a") as f:
+            f.write("1 4")
+
+        loaded = store.load()
+        assert loaded["uploaded_chunks"] == {0}
+
+    def test_compact_writes_snapshot(self, temp_upload_dir, session_info):
+        """Test that compaction folds the journal back into the header."""
+        store = SessionJournal(temp_upload_dir / "s3")
+        for i in range(2):
+            session_info["uploaded_chunks"].add(i)
+            session_info["chunk_sizes"][str(i)] = 50
+            store.append_chunk(session_info, i, 50)
+
+        store.compact(store.load())
+
+        assert not store.journal_path.exists()
+        header = json.loads(store.header_path.read_text())
+        assert header["uploaded_chunks"] == [0, 1]
+        assert store.load()["chunk_sizes"] == {"0": 50, "1": 50}
+
+    def test_legacy_snapshot_continues_as_journal(self, temp_upload_dir, session_info):
+        """Test that a full session_info.json keeps its chunks once journaled."""
+        store = SessionJournal(temp_upload_dir / "s4")
+        session_info["uploaded_chunks"] = {0, 1}
+        session_info["chunk_sizes"] = {"0": 5, "1": 5}
+        store.compact(session_info)
+
+        session = store.load()
+        session["uploaded_chunks"].add(2)
+        session["chunk_sizes"]["2"] = 7
+        store.append_chunk(session, 2, 7)
+        store.write_header(session)
+
+        assert store.load()["uploaded_chunks"] == {0, 1, 2}
@@ -0,0 +1,189 @@
+"""
+Unit Tests for Cross-Replica Session Leases
+
+Tests lease exclusion, expiry, fencing tokens and acquisition metrics,
+and how locked_session holds session leases.
+Two LeaseManager instances with different owner ids stand in for two pods.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+
+from storage import LeaseManager, LeaseUnavailable
+
+
+@pytest.fixture
+def pods():
+    return (
+        LeaseManager(owner_id="pod-a", ttl=30, retry_interval=0.001),
+        LeaseManager(owner_id="pod-b", ttl=30, retry_interval=0.001),
+    )
+
+
+@pytest.mark.unit
+class TestLeaseManager:
+    """Test LeaseManager semantics."""
+
+    def test_lease_excludes_other_owner(self, temp_upload_dir, pods):
+        """Test that a held lease blocks another replica until released."""
+        pod_a, pod_b = pods
+        lease = pod_a.acquire(temp_upload_dir, "session")
+
+        assert pod_b.try_acquire(temp_upload_dir, "session") is None
+        with pytest.raises(LeaseUnavailable):
+            pod_b.acquire(temp_upload_dir, "session", timeout=0.01)
+
+        pod_a.release(lease)
+        assert pod_b.try_acquire(temp_upload_dir, "session") is not None
+
+    def test_expired_lease_is_fenced(self, temp_upload_dir, pods):
+        """Test that an expired lease can be taken over and fences the old holder."""
+        pod_a, pod_b = pods
+        old = pod_a.acquire(temp_upload_dir, "assembly", ttl=0.01)
+        time.sleep(0.02)
+
+        new = pod_b.acquire(temp_upload_dir, "assembly")
+
+        assert new.token == old.token + 1
+        assert not pod_a.is_current(old)
+        assert not pod_a.renew(old)
+        assert pod_b.is_current(new)
+
+    def test_handed_over_flag(self, temp_upload_dir, pods):
+        """Test that reacquiring after another owner reports a handover."""
+        pod_a, pod_b = pods
+        pod_a.release(pod_a.acquire(temp_upload_dir, "session"))
+        again = pod_a.acquire(temp_upload_dir, "session")
+        assert not again.handed_over
+        pod_a.release(again)
+
+        pod_b.release(pod_b.acquire(temp_upload_dir, "session"))
+        assert pod_a.changed_elsewhere(temp_upload_dir, "session")
+        assert pod_a.acquire(temp_upload_dir, "session").handed_over
+
+    def test_acquisition_metrics(self, temp_upload_dir, pods):
+        """Test that acquisitions, contention and failures are counted."""
+        pod_a, pod_b = pods
+        pod_a.acquire(temp_upload_dir, "session")
+        pod_b.try_acquire(temp_upload_dir, "session")
+
+        stats_a = pod_a.stats()
+        stats_b = pod_b.stats()
+        assert stats_a["acquired"] == 1
+        assert stats_b["failed"] == 1
+        assert stats_b["contended"] == 1
+        assert sum(stats_a["wait_seconds_buckets"].values()) == 1
+
+    def test_lease_files_lock_independently(self, temp_upload_dir, pods):
+        """Test that threads only wait on each other for the same lease file."""
+        pod_a, _ = pods
+        acquired = []
+        with pod_a._thread_lock(pod_a.lease_path(temp_upload_dir / "one", "session")):
+            thread = threading.Thread(
+                target=lambda: acquired.append(pod_a.acquire(temp_upload_dir / "two", "session"))
+            )
+            thread.start()
+            thread.join(timeout=5)
+        assert len(acquired) == 1
+
+    def test_contended_wait_frees_io_threads(self, temp_upload_dir, pods):
+        """Test that waiting for a busy lease does not hold the I/O pool."""
+        from storage import IOExecutor
+        pod_a, pod_b = pods
+        pod_a.acquire(temp_upload_dir, "session")
+        io = IOExecutor(max_workers=1)
+
+        async def main():
+            waiter = asyncio.create_task(pod_b.acquire_async(io.run, temp_upload_dir, "session", timeout=0.5))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            assert await io.run(lambda: "unrelated") == "unrelated"
+            elapsed = time.monotonic() - started
+            with pytest.raises(LeaseUnavailable):
+                await waiter
+            return elapsed
+
+        try:
+            assert asyncio.run(main()) < 0.2
+        finally:
+            io.shutdown()
+        assert pod_b.stats()["failed"] == 1
+
+
+@pytest.mark.unit
+class TestSessionLeaseHolding:
+    """Test that locked_session keeps the session lease across a request burst."""
+
+    @pytest.fixture
+    def leased(self, temp_upload_dir, pods, monkeypatch):
+        import routes.tus_upload as tus
+        monkeypatch.setattr(tus, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(tus, "SESSION_LEASES_ENABLED", True)
+        monkeypatch.setattr(tus, "SESSION_LEASE_HOLD", 0.05)
+        monkeypatch.setattr(tus, "session_leases", pods[0])
+        monkeypatch.setattr(tus, "held_leases", {})
+        return tus
+
+    def test_burst_reuses_lease_until_idle(self, leased, temp_upload_dir, pods):
+        """Test that a burst acquires the lease once and it is released when idle."""
+        pod_a, pod_b = pods
+        session_dir = temp_upload_dir / "burst"
+
+        async def main():
+            for _ in range(3):
+                async with leased.locked_session("burst"):
+                    pass
+            assert pod_b.try_acquire(session_dir, "session") is None
+            await asyncio.sleep(0.06)
+            await leased.maintain_session_leases()
+
+        asyncio.run(main())
+        assert pod_a.stats()["acquired"] == 1
+        assert leased.held_leases == {}
+        assert pod_b.try_acquire(session_dir, "session") is not None
+
+    def test_lost_lease_drops_cached_state(self, leased, temp_upload_dir, pods):
+        """Test that a lease taken over after expiry is not reused."""
+        pod_a, pod_b = pods
+
+        async def main():
+            async with leased.locked_session("fenced"):
+                pass
+            lease = leased.held_leases[str(temp_upload_dir / "fenced")]
+            pod_a.renew(lease, ttl=0.01)  # Let it expire so the other pod can take over
+            time.sleep(0.02)
+            pod_b.release(pod_b.acquire(temp_upload_dir / "fenced", "session"))
+            async with leased.locked_session("fenced"):
+                return leased.held_leases[str(temp_upload_dir / "fenced")]
+
+        new_lease = asyncio.run(main())
+        assert new_lease.handed_over
+        assert pod_a.stats()["acquired"] == 2
+
+    def test_assembly_does_not_flush_without_the_lease(self, leased, temp_upload_dir, pods, monkeypatch):
+        """Test that assembly defers instead of writing cached state while another replica holds the session."""
+        pod_a, pod_b = pods
+        monkeypatch.setattr(pod_a, "acquire_timeout", 0.05)
+        monkeypatch.setattr(leased.session_cache, "flush_interval", 3600)
+        session_id = "contended"
+        info = {"total_chunks": 2, "uploaded_chunks": {0}, "chunk_sizes": {"0": 4},
+                "recording_name": "rec", "format": "webm", "client_metadata": {}}
+        leased.save_session_info(session_id, info)
+        store = leased.get_session_store(session_id)
+        on_disk = leased.SessionJournal(store.session_dir).load()
+        info["uploaded_chunks"].add(1)
+        info["chunk_sizes"]["1"] = 4
+        leased.session_cache.record_chunk(store, info, 1, 4)
+        pod_b.acquire(store.session_dir, "session")
+
+        async def main():
+            leased.bind_event_loop()
+            return await asyncio.get_running_loop().run_in_executor(
+                None, leased._assemble_chunks, session_id, "rec", "webm"
+            )
+
+        assert asyncio.run(main()) is False
+        assert leased.SessionJournal(store.session_dir).load() == on_disk
+        assert pod_a.try_acquire(store.session_dir, "assembly") is not None
@@ -0,0 +1,147 @@
+"""
+Unit Tests for Session Concurrency Control
+
+Tests per-session locking and single-flight assembly scheduling.
+"""
+
+import asyncio
+import io
+import pytest
+from fastapi import BackgroundTasks
+
+from storage import SessionLockRegistry, SingleFlight
+
+
+@pytest.mark.unit
+class TestSessionLockRegistry:
+    """Test the SessionLockRegistry."""
+
+    def test_same_session_is_serialized(self):
+        """Test that critical sections for one session never overlap."""
+        registry = SessionLockRegistry()
+        active = []
+        overlaps = []
+
+        async def worker(key):
+            async with registry.lock(key):
+                if key in active:
+                    overlaps.append(key)
+                active.append(key)
+                await asyncio.sleep(0.01)
+                active.remove(key)
+
+        async def main():
+            await asyncio.gather(*(worker("s1") for _ in range(5)))
+
+        asyncio.run(main())
+        assert overlaps == []
+
+    def test_different_sessions_run_in_parallel(self):
+        """Test that different sessions do not wait on each other."""
+        registry = SessionLockRegistry()
+        inside = set()
+        seen_together = []
+
+        async def worker(key):
+            async with registry.lock(key):
+                inside.add(key)
+                await asyncio.sleep(0.01)
+                seen_together.append(len(inside))
+                inside.discard(key)
+
+        async def main():
+            await asyncio.gather(worker("a"), worker("b"))
+
+        asyncio.run(main())
+        assert max(seen_together) == 2
+
+    def test_idle_locks_are_evicted(self):
+        """Test that unused locks are removed from the registry."""
+        registry = SessionLockRegistry(idle_ttl=0, sweep_interval=0)
+
+        async def main():
+            async with registry.lock("a"):
+                pass
+            async with registry.lock("b"):
+                pass
+
+        asyncio.run(main())
+        assert len(registry) == 0
+
+
+@pytest.mark.unit
+class TestSingleFlightAssembly:
+    """Test that at most one assembly per session is in flight."""
+
+    def test_single_flight(self):
+        """Test acquire/release semantics."""
+        flights = SingleFlight()
+        assert flights.try_acquire("s1")
+        assert not flights.try_acquire("s1")
+        assert flights.try_acquire("s2")
+        flights.release("s1")
+        assert flights.try_acquire("s1")
+
+    def test_schedule_assembly_deduplicates(self):
+        """Test that a second schedule for the same session is rejected."""
+        from routes.tus_upload import schedule_assembly, assembly_flights
+
+        tasks = BackgroundTasks()
+        try:
+            assert schedule_assembly(tasks, "dedup-session", "rec", "webm")
+            assert not schedule_assembly(tasks, "dedup-session", "rec", "webm")
+            assert len(tasks.tasks) == 1
+        finally:
+            assembly_flights.release("dedup-session")
+
+    def test_concurrent_chunk_uploads_keep_all_chunks(self, temp_upload_dir, monkeypatch):
+        """Test that parallel uploads to one session do not drop chunks."""
+        import httpx
+        import routes.tus_upload
+        from app.server import app
+
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+        session_id = "parallel-session"
+
+        async def upload(client, index):
+            return await client.post(
+                "/upload/chunk",
+                data={"session_id": session_id, "chunk_index": str(index), "total_chunks": "20"},
+                files={"file": ("chunk", io.BytesIO(b"x" * 100), "audio/webm")}
+            )
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                return await asyncio.gather(*(upload(client, i) for i in range(10)))
+
+        responses = asyncio.run(main())
+        assert all(r.status_code == 200 for r in responses)
+
+        session = routes.tus_upload.load_session_info(session_id)
+        assert session["uploaded_chunks"] == set(range(10))
+
+    def test_assembly_updates_session_under_lock(self, temp_upload_dir, monkeypatch):
+        """Test that the assembled snapshot waits for the session lock on the request loop."""
+        import routes.tus_upload as tus
+        monkeypatch.setattr(tus, "UPLOAD_DIR", temp_upload_dir)
+        monkeypatch.setattr(tus, "event_loop", None)
+        session_id = "locked-assembly"
+        (temp_upload_dir / session_id / "chunks").mkdir(parents=True)
+        (temp_upload_dir / session_id / "chunks" / "chunk_0.bin").write_bytes(b"data")
+        tus.save_session_info(session_id, {
+            "total_chunks": 1, "uploaded_chunks": {0}, "chunk_sizes": {"0": 4},
+            "recording_name": "rec", "format": "webm", "client_metadata": {}
+        })
+
+        async def main():
+            tus.bind_event_loop()
+            async with tus.session_locks.lock(session_id):
+                assembly = asyncio.get_running_loop().run_in_executor(None, tus.assemble_chunks, session_id, "rec", "webm")
+                await asyncio.sleep(0.2)
+                assert not tus.load_session_info(session_id).get("assembled")
+            return await assembly
+
+        assert asyncio.run(main())
+        assert tus.load_session_info(session_id)["assembled"]
+        assert (temp_upload_dir / session_id / "completed" / "rec.webm").read_bytes() == b"data"
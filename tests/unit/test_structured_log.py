@@ -0,0 +1,103 @@
+"""
+Unit Tests for Structured Logging
+
+Tests JSON formatting, per-event sampling, rate limiting and level checks.
+"""
+
+import json
+import logging
+import pytest
+
+from observability import log as structured_log
+from observability.log import EventSampler, JsonFormatter, StructuredLogger
+
+
+class ListHandler(logging.Handler):
+    """Collects formatted records in memory."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.setFormatter(JsonFormatter())
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def logger(monkeypatch):
+    """A StructuredLogger writing JSON lines to a list, through the queue handler's preparation."""
+    monkeypatch.setattr(structured_log, "sampler", EventSampler({}, 0))
+    target = ListHandler()
+    queue_handler = structured_log._QueueHandler(None)
+    queue_handler.enqueue = lambda record: target.handle(record)
+    base = logging.getLogger(f"waveforge.test.{id(target)}")
+    base.propagate = False
+    base.setLevel(logging.INFO)
+    base.addHandler(queue_handler)
+    return StructuredLogger(base), target
+
+
+@pytest.mark.unit
+class TestStructuredLogger:
+    """Test the structured logger output."""
+
+    def test_json_fields(self, logger):
+        """Test that event, message and keyword fields end up in one JSON object."""
+        log, target = logger
+        log.info("chunk_saved", "Saved chunk", session_id="s1", chunk=3, size=100)
+
+        entry = json.loads(target.lines[0])
+        assert entry["event"] == "chunk_saved"
+        assert entry["msg"] == "Saved chunk"
+        assert entry["level"] == "info"
+        assert (entry["session_id"], entry["chunk"], entry["size"]) == ("s1", 3, 100)
+
+    def test_exception_text(self, logger):
+        """Test that the traceback is carried as a separate field."""
+        log, target = logger
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.exception("assembly_failed", "Error assembling chunks", session_id="s1")
+
+        entry = json.loads(target.lines[0])
+        assert entry["msg"] == "Error assembling chunks"
+        assert "ValueError: boom" in entry["exc"]
+
+    def test_level_is_honoured(self, logger):
+        """Test that records below the logger level are not emitted."""
+        log, target = logger
+        log.debug("metadata_saved", "Metadata saved")
+        assert target.lines == []
+
+
+@pytest.mark.unit
+class TestEventSampler:
+    """Test sampling and rate limiting per event."""
+
+    def test_sampling_rate(self):
+        """Test that a rate of 0 drops and unlisted events pass with no sample field."""
+        sampler = EventSampler({"chunk_uploaded": 0.0}, 0)
+        assert sampler.admit("chunk_uploaded") is None
+        assert sampler.admit("assembly_complete") == {}
+
+    def test_sampled_records_carry_rate(self, monkeypatch):
+        """Test that kept samples report their rate so counts can be scaled."""
+        monkeypatch.setattr(structured_log.random, "random", lambda: 0.0)
+        sampler = EventSampler({"chunk_uploaded": 0.25}, 0)
+        assert sampler.admit("chunk_uploaded") == {"sample_rate": 0.25}
+
+    def test_rate_limit_reports_suppressed(self, monkeypatch):
+        """Test that the token bucket caps an event and reports what it dropped."""
+        now = [100.0]
+        monkeypatch.setattr(structured_log.time, "monotonic", lambda: now[0])
+        sampler = EventSampler({}, 2)
+
+        results = [sampler.admit("chunk_saved") for _ in range(5)]
+        assert results[:2] == [{}, {}]
+        assert results[2:] == [None, None, None]
+
+        now[0] += 1.0
+        assert sampler.admit("chunk_saved") == {"suppressed": 3}
+        assert sampler.admit("other_event") == {}
@@ -0,0 +1,663 @@
+"""
+Unit Tests for TUS Upload Routes
+
+Tests chunk ingestion through the TUS PATCH and custom upload endpoints.
+"""
+
+import base64
+import io
+import json
+import time
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+
+
+def tus_metadata(**values):
+    """Encode a TUS Upload-Metadata header."""
+    return ",".join(
+        f"{key} {base64.b64encode(str(value).encode()).decode()}"
+        for key, value in values.items()
+    )
+
+
+@pytest.fixture
+def test_client(temp_upload_dir, monkeypatch):
+    """Create a test client with uploads going to a temporary directory."""
+    import routes.tus_upload
+    from app.server import app
+
+    monkeypatch.setattr(routes.tus_upload, "UPLOAD_DIR", temp_upload_dir)
+    return TestClient(app, base_url="http://testserver")
+
+
+@pytest.fixture
+def session_id():
+    return str(uuid.uuid4())
+
+
+def create_chunk(client, session_id, chunk_index, total_chunks=2):
+    response = client.post(
+        f"/files/{session_id}/chunks/",
+        headers={
+            "Tus-Resumable": "1.0.0",
+            "Upload-Metadata": tus_metadata(
+                chunkIndex=chunk_index, totalChunks=total_chunks,
+                recordingName="tus_test", format="webm"
+            ),
+        },
+    )
+    assert response.status_code == 201
+    return response.headers["Location"]
+
+
+@pytest.mark.unit
+class TestStreamingIngestion:
+    """Test that chunk bodies are streamed to disk with a size limit."""
+
+    def test_patch_streams_body_to_disk(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that a body larger than one block is written completely."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "UPLOAD_BLOCK_SIZE", 1024)
+
+        location = create_chunk(test_client, session_id, 0)
+        body = bytes(range(256)) * 40  # 10 KB, several blocks
+
+        response = test_client.patch(
+            location, content=body,
+            headers={"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"},
+        )
+
+        assert response.status_code == 204
+        assert response.headers["Upload-Offset"] == str(len(body))
+        chunk_file = temp_upload_dir / session_id / "chunks" / "chunk_0.bin"
+        assert chunk_file.read_bytes() == body
+
+    def test_patch_rejects_oversized_body(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that bodies over MAX_CHUNK_BODY_SIZE are rejected with 413."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "MAX_CHUNK_BODY_SIZE", 100)
+
+        location = create_chunk(test_client, session_id, 0)
+        response = test_client.patch(
+            location, content=b"x" * 101,
+            headers={"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"},
+        )
+
+        assert response.status_code == 413
+        chunk_file = temp_upload_dir / session_id / "chunks" / "chunk_0.bin"
+        assert not chunk_file.exists() or chunk_file.stat().st_size == 0
+
+    def test_custom_upload_rejects_oversized_file(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that the custom endpoint leaves no partial chunk behind on 413."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "MAX_CHUNK_BODY_SIZE", 100)
+
+        response = test_client.post(
+            "/upload/chunk",
+            data={"session_id": session_id, "chunk_index": "0", "total_chunks": "2"},
+            files={"file": ("chunk", io.BytesIO(b"x" * 101), "audio/webm")},
+        )
+
+        assert response.status_code == 413
+        assert not (temp_upload_dir / session_id / "chunks" / "chunk_0.bin").exists()
+
+
+@pytest.mark.unit
+class TestDirectStorage:
+    """Test STORAGE_MODE=direct, where chunks go straight into one data file."""
+
+    def upload_custom(self, client, session_id, chunk_index, data, total_chunks=2):
+        return client.post(
+            "/upload/chunk",
+            data={
+                "session_id": session_id, "chunk_index": str(chunk_index),
+                "total_chunks": str(total_chunks), "recording_name": "direct_test", "format": "webm",
+            },
+            files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+        )
+
+    def test_in_order_chunks_are_renamed_into_place(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that in-order chunks are assembled without per-chunk files."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", "direct")
+
+        assert self.upload_custom(test_client, session_id, 0, b"first-").status_code == 200
+        assert not (temp_upload_dir / session_id / "chunks" / "chunk_0.bin").exists()
+        assert self.upload_custom(test_client, session_id, 1, b"second").status_code == 200
+
+        output = temp_upload_dir / session_id / "completed" / "direct_test.webm"
+        assert output.read_bytes() == b"first-second"
+        assert not (temp_upload_dir / session_id / "direct").exists()
+
+    def test_out_of_order_chunks_are_copied_in_order(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that chunks arriving out of order still assemble correctly."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", "direct")
+
+        location = create_chunk(test_client, session_id, 1)
+        response = test_client.patch(
+            location, content=b"second",
+            headers={"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"},
+        )
+        assert response.status_code == 204
+        assert test_client.head(location).headers["Upload-Offset"] == "6"
+
+        location = create_chunk(test_client, session_id, 0)
+        response = test_client.patch(
+            location, content=b"first-",
+            headers={"Upload-Offset": "0", "Content-Type": "application/offset+octet-stream"},
+        )
+        assert response.status_code == 204
+
+        output = temp_upload_dir / session_id / "completed" / "tus_test.webm"
+        assert output.read_bytes() == b"first-second"
+
+    def test_stored_chunk_is_reported(self, test_client, session_id, monkeypatch):
+        """Test that verify and duplicate uploads see chunks in the data file."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", "direct")
+
+        self.upload_custom(test_client, session_id, 0, b"abcd", total_chunks=3)
+
+        verify = test_client.get(f"/api/verify/{session_id}/0").json()
+        assert verify["exists"] is True
+        assert verify["size"] == 4
+        duplicate = self.upload_custom(test_client, session_id, 0, b"abcd", total_chunks=3)
+        assert duplicate.json()["status"] == "chunk_already_exists"
+
+
+@pytest.mark.unit
+class TestCreationWithUpload:
+    """Test the TUS creation-with-upload extension and OPTIONS discovery."""
+
+    def create_with_body(self, client, session_id, chunk_index, data, total_chunks=2, upload_length=None):
+        return client.post(
+            f"/files/{session_id}/chunks/", content=data,
+            headers={
+                "Tus-Resumable": "1.0.0",
+                "Upload-Length": str(len(data) if upload_length is None else upload_length),
+                "Content-Type": "application/offset+octet-stream",
+                "Upload-Metadata": tus_metadata(
+                    chunkIndex=chunk_index, totalChunks=total_chunks,
+                    recordingName="tus_test", format="webm"
+                ),
+            },
+        )
+
+    def test_discovery(self, test_client):
+        """Test that OPTIONS /files/ advertises version, extensions and size limit."""
+        import routes.tus_upload
+
+        response = test_client.options("/files/")
+
+        assert response.status_code == 204
+        assert response.headers["Tus-Version"] == "1.0.0"
+        assert "creation-with-upload" in response.headers["Tus-Extension"].split(",")
+        assert response.headers["Tus-Max-Size"] == str(routes.tus_upload.MAX_CHUNK_BODY_SIZE)
+
+    @pytest.mark.parametrize("storage_mode", ["chunks", "direct"])
+    def test_post_stores_chunks(self, test_client, session_id, temp_upload_dir, monkeypatch, storage_mode):
+        """Test that one POST per chunk is enough to complete a recording."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", storage_mode)
+
+        for index, data in enumerate([b"first-", b"second"]):
+            response = self.create_with_body(test_client, session_id, index, data)
+            assert response.status_code == 201
+            assert response.headers["Upload-Offset"] == str(len(data))
+
+        output = temp_upload_dir / session_id / "completed" / "tus_test.webm"
+        assert output.read_bytes() == b"first-second"
+
+    def test_partial_body_is_resumed_with_patch(self, test_client, session_id, temp_upload_dir):
+        """Test that a chunk is not complete until Upload-Length bytes are stored."""
+        response = self.create_with_body(test_client, session_id, 0, b"abc", total_chunks=1, upload_length=6)
+        assert response.status_code == 201
+        assert response.headers["Upload-Offset"] == "3"
+        assert test_client.get(f"/api/verify/{session_id}", params={"chunks": "0"}).json()["missing"] == [0]
+
+        response = test_client.patch(
+            response.headers["Location"], content=b"def",
+            headers={"Upload-Offset": "3", "Content-Type": "application/offset+octet-stream"},
+        )
+        assert response.status_code == 204
+        assert (temp_upload_dir / session_id / "completed" / "tus_test.webm").read_bytes() == b"abcdef"
+
+    def test_repeated_post_returns_stored_offset(self, test_client, session_id, temp_upload_dir):
+        """Test that re-sending a stored chunk does not append it twice."""
+        self.create_with_body(test_client, session_id, 0, b"abcd", total_chunks=3)
+        response = self.create_with_body(test_client, session_id, 0, b"abcd", total_chunks=3)
+
+        assert response.status_code == 201
+        assert response.headers["Upload-Offset"] == "4"
+        assert (temp_upload_dir / session_id / "chunks" / "chunk_0.bin").read_bytes() == b"abcd"
+
+    def test_rejects_oversized_upload_length(self, test_client, session_id, monkeypatch):
+        """Test that an Upload-Length over Tus-Max-Size is rejected before any write."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "MAX_CHUNK_BODY_SIZE", 100)
+
+        response = self.create_with_body(test_client, session_id, 0, b"x" * 101)
+
+        assert response.status_code == 413
+
+
+@pytest.mark.unit
+class TestRawUpload:
+    """Test POST /upload/chunk/{session_id}/{chunk_index} with a raw body."""
+
+    def upload(self, client, session_id, chunk_index, data, **headers):
+        return client.post(
+            f"/upload/chunk/{session_id}/{chunk_index}", content=data,
+            headers={"Content-Type": "application/octet-stream", **headers},
+        )
+
+    @pytest.mark.parametrize("storage_mode", ["chunks", "direct"])
+    def test_raw_chunks_assemble(self, test_client, session_id, temp_upload_dir, monkeypatch, storage_mode):
+        """Test that raw bodies and header metadata produce the recording."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", storage_mode)
+        headers = {"X-Total-Chunks": "2", "X-Recording-Name": "K%C3%BCche", "X-Format": "webm"}
+
+        first = self.upload(test_client, session_id, 0, b"first-", **headers)
+        assert first.json() == {"status": "chunk_received", "chunk_index": 0, "session_id": session_id, "size": 6}
+        assert self.upload(test_client, session_id, 1, b"second", **headers).status_code == 200
+
+        output = temp_upload_dir / session_id / "completed" / "Küche.webm"
+        assert output.read_bytes() == b"first-second"
+
+    def test_duplicate_chunk(self, test_client, session_id):
+        """Test that a repeated chunk is reported and not rewritten."""
+        self.upload(test_client, session_id, 0, b"data", **{"X-Total-Chunks": "3"})
+        duplicate = self.upload(test_client, session_id, 0, b"other")
+        assert duplicate.json()["status"] == "chunk_already_exists"
+
+    def test_unrecorded_chunk_file_is_recorded(self, test_client, session_id, temp_upload_dir):
+        """Test that a chunk on disk but missing from the session counts on retry."""
+        chunk_dir = temp_upload_dir / session_id / "chunks"
+        chunk_dir.mkdir(parents=True)
+        (chunk_dir / "chunk_0.bin").write_bytes(b"first-")  # Written before a crash
+
+        retry = self.upload(test_client, session_id, 0, b"first-", **{"X-Total-Chunks": "2"})
+        assert retry.json()["status"] == "chunk_already_exists"
+        assert test_client.get(f"/api/verify/{session_id}", params={"chunks": "0"}).json()["missing"] == []
+        self.upload(test_client, session_id, 1, b"second", **{"X-Total-Chunks": "2"})
+
+        output = temp_upload_dir / session_id / "completed" / "recording.webm"
+        assert output.read_bytes() == b"first-second"
+
+    def test_oversized_body(self, test_client, session_id, monkeypatch):
+        """Test that a Content-Length above MAX_CHUNK_BODY_SIZE is rejected."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "MAX_CHUNK_BODY_SIZE", 4)
+        assert self.upload(test_client, session_id, 0, b"too large").status_code == 413
+
+
+@pytest.mark.unit
+class TestStreamUpload:
+    """Test WebSocket ingestion on /ws/upload/{session_id}."""
+
+    def test_stream_acks_and_assembles(self, test_client, session_id, temp_upload_dir):
+        """Test acks with the durable in-order prefix, status, then assembly on the final metadata."""
+        from routes.chunk_batch import encode_frames
+
+        with test_client.websocket_connect(f"/ws/upload/{session_id}?recording_name=live&format=webm") as ws:
+            ws.send_bytes(encode_frames([(0, b"aa")]))
+            ack = ws.receive_json()
+            assert ack["type"] == "ack"
+            assert ack["results"] == [{"chunk_index": 0, "status": "chunk_received", "size": 2}]
+            assert (ack["contiguous_chunks"], ack["durable_offset"]) == (1, 2)
+
+            ws.send_bytes(encode_frames([(2, b"c")]))
+            assert ws.receive_json()["contiguous_chunks"] == 1
+            ws.send_bytes(encode_frames([(1, b"bbb"), (0, b"aa")]))
+            ack = ws.receive_json()
+            assert [r["status"] for r in ack["results"]] == ["chunk_received", "chunk_already_exists"]
+            assert (ack["contiguous_chunks"], ack["durable_offset"]) == (3, 6)
+
+            status = test_client.get(f"/files/{session_id}/status").json()
+            assert status["uploaded_chunks"] == 3
+            assert status["recording_name"] == "live"
+
+            ws.send_json({"type": "metadata", "totalChunks": 3})
+            assert ws.receive_json()["type"] == "ack"
+
+            # Assembly updates the session on the stream's event loop, so keep it running
+            output = temp_upload_dir / session_id / "completed" / "live.webm"
+            deadline = time.monotonic() + 5
+            while not output.exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        assert output.read_bytes() == b"aabbbc"
+
+    def test_stream_only_session_assembles_and_renames(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test a session uploaded only over the stream: finish() assembles it, saving renames it."""
+        import routes.recording_complete
+        from routes.chunk_batch import encode_frames
+
+        monkeypatch.setattr(routes.recording_complete, "UPLOAD_DIR", temp_upload_dir)
+
+        completed = temp_upload_dir / session_id / "completed"
+        with test_client.websocket_connect(f"/ws/upload/{session_id}?recording_name={session_id}&format=ogg") as ws:
+            ws.send_bytes(encode_frames([(0, b"aa"), (1, b"bbb")]))
+            assert ws.receive_json()["contiguous_chunks"] == 2
+            ws.send_json({"type": "metadata", "totalChunks": 2, "recordingName": session_id, "format": "ogg"})
+            assert ws.receive_json()["type"] == "ack"
+
+            deadline = time.monotonic() + 5
+            while not (completed / f"{session_id}.ogg.meta.json").exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        assert test_client.get(f"/recordings/{session_id}/{session_id}.ogg").content == b"aabbb"
+
+        response = test_client.post("/recording/complete", data={
+            "session_id": session_id,
+            "file_name": "Take 1.ogg",
+            "metadata": json.dumps({"name": "Take 1", "extension": "ogg"})
+        })
+        assert response.status_code == 200
+        assert test_client.get(f"/recordings/{session_id}/{session_id}.ogg").status_code == 404
+        assert json.loads((completed / "Take 1.ogg.meta.json").read_text())["file_name"] == "Take 1.ogg"
+        assert test_client.get(f"/recordings/{session_id}/Take 1.ogg").content == b"aabbb"
+
+    def test_complete_while_assembling_asks_for_a_retry(self, test_client, session_id):
+        """Test that a completion signal racing an in-flight assembly gets a 409 to retry."""
+        from routes.tus_upload import assembly_flights
+
+        create_chunk(test_client, session_id, 0)
+        assert assembly_flights.try_acquire(session_id)
+        try:
+            response = test_client.post("/recording/complete", data={
+                "session_id": session_id, "file_name": "Take 1.webm"
+            })
+        finally:
+            assembly_flights.release(session_id)
+        assert response.status_code == 409
+        assert response.headers["retry-after"] == "2"
+
+    def test_bad_messages_keep_the_stream_open(self, test_client, session_id):
+        """Test that malformed records and metadata are reported without closing."""
+        from routes.chunk_batch import FRAME_HEADER, encode_frames
+
+        with test_client.websocket_connect(f"/ws/upload/{session_id}") as ws:
+            ws.send_bytes(encode_frames([(0, b"ok")]) + FRAME_HEADER.pack(1, 10))
+            error = ws.receive_json()
+            assert error["type"] == "error"
+            assert error["results"] == [{"chunk_index": 0, "status": "chunk_received", "size": 2}]
+            assert error["contiguous_chunks"] == 1
+
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+
+            ws.send_bytes(encode_frames([(1, b"next")]))
+            assert ws.receive_json()["contiguous_chunks"] == 2
+
+    def test_ack_follows_session_write(self, test_client, session_id, monkeypatch):
+        """Test that acked chunks are on disk, not only in the write-behind cache."""
+        import routes.tus_upload
+        from routes.chunk_batch import encode_frames
+        monkeypatch.setattr(routes.tus_upload.session_cache, "flush_interval", 3600)
+
+        with test_client.websocket_connect(f"/ws/upload/{session_id}") as ws:
+            ws.send_bytes(encode_frames([(0, b"aa"), (1, b"b")]))
+            assert ws.receive_json()["durable_offset"] == 3
+
+            routes.tus_upload.session_cache.discard(routes.tus_upload.get_session_store(session_id))
+            assert test_client.get(f"/files/{session_id}/status").json()["uploaded_chunks"] == 2
+
+    def test_commit_failure_is_reported(self, test_client, session_id, monkeypatch):
+        """Test that a session update error becomes an error reply without acking, and a resend recovers."""
+        import routes.tus_upload
+        from fastapi import HTTPException
+        from routes.chunk_batch import encode_frames
+        commit = routes.tus_upload.commit_chunk_batch
+        failures = [HTTPException(status_code=503, detail="Session is busy on another replica")]
+
+        async def flaky_commit(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return await commit(*args, **kwargs)
+
+        monkeypatch.setattr(routes.tus_upload, "commit_chunk_batch", flaky_commit)
+
+        with test_client.websocket_connect(f"/ws/upload/{session_id}") as ws:
+            ws.send_bytes(encode_frames([(0, b"aa")]))
+            error = ws.receive_json()
+            assert (error["type"], error["status"]) == ("error", 503)
+            assert error["results"] == []
+            assert error["contiguous_chunks"] == 0
+
+            ws.send_bytes(encode_frames([(0, b"aa")]))
+            ack = ws.receive_json()
+            assert ack["type"] == "ack"
+            assert (ack["contiguous_chunks"], ack["durable_offset"]) == (1, 2)
+
+
+@pytest.mark.unit
+class TestBatchVerify:
+    """Test GET /api/verify/{session_id}?chunks=... answered from session state."""
+
+    def upload(self, client, session_id, chunk_index, data, total_chunks=10):
+        response = client.post(
+            "/upload/chunk",
+            data={"session_id": session_id, "chunk_index": str(chunk_index),
+                  "total_chunks": str(total_chunks), "recording_name": "verify", "format": "webm"},
+            files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+        )
+        assert response.status_code == 200
+
+    def test_ranges_and_lists(self, test_client, session_id):
+        """Test that present chunks report their size and the rest are missing."""
+        for index in (0, 1, 2, 5):
+            self.upload(test_client, session_id, index, b"x" * (index + 1))
+
+        result = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-3,5,7"}).json()
+        assert result["chunks"] == {"0": 1, "1": 2, "2": 3, "5": 6}
+        assert result["missing"] == [3, 7]
+
+    def test_no_chunk_files_are_touched(self, test_client, session_id, temp_upload_dir):
+        """Test that verifying does not stat or create chunk paths."""
+        self.upload(test_client, session_id, 0, b"data")
+        for chunk in (temp_upload_dir / session_id / "chunks").iterdir():
+            chunk.unlink()
+
+        result = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0"}).json()
+        assert result["chunks"] == {"0": 4}
+        unknown = test_client.get("/api/verify/unknown-session", params={"chunks": "0-9"}).json()
+        assert unknown["missing"] == list(range(10))
+        assert not (temp_upload_dir / "unknown-session").exists()
+
+    def test_reported_chunks_are_persisted(self, test_client, session_id, temp_upload_dir):
+        """Test that chunks still pending in the write-behind cache are written before they are reported."""
+        from routes.tus_upload import get_session_store, session_cache
+        from storage import SessionJournal
+
+        self.upload(test_client, session_id, 0, b"data")
+        store = get_session_store(session_id)
+        info = session_cache.get(store)
+        info['uploaded_chunks'].add(1)
+        info['chunk_sizes']['1'] = 3
+        session_cache.record_chunk(store, info, 1, 3)
+        assert session_cache.is_dirty(store)
+
+        result = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-1"}).json()
+        assert result["chunks"] == {"0": 4, "1": 3}
+        assert not session_cache.is_dirty(store)
+        assert 1 in SessionJournal(temp_upload_dir / session_id).load()['uploaded_chunks']
+
+    def test_invalid_or_oversized_requests(self, test_client, session_id, monkeypatch):
+        """Test that malformed specs and batches over VERIFY_BATCH_MAX are rejected."""
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "VERIFY_BATCH_MAX", 100)
+
+        for spec in ("a", "5-2", "-1", "0-100"):
+            response = test_client.get(f"/api/verify/{session_id}", params={"chunks": spec})
+            assert response.status_code == 400, spec
+        assert test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-99"}).status_code == 200
+
+
+@pytest.mark.unit
+class TestBatchUpload:
+    """Test POST /upload/batch/{session_id} with framed chunk records."""
+
+    def upload(self, client, session_id, body, total_chunks=3):
+        from routes.chunk_batch import MEDIA_TYPE
+        return client.post(
+            f"/upload/batch/{session_id}", content=body, headers={"Content-Type": MEDIA_TYPE},
+            params={"total_chunks": total_chunks, "recording_name": "batch", "format": "webm"},
+        )
+
+    @pytest.mark.parametrize("storage_mode", ["chunks", "direct"])
+    def test_batch_assembles_recording(self, test_client, session_id, temp_upload_dir, monkeypatch, storage_mode):
+        """Test that one batch stores every chunk and completes the session."""
+        import routes.tus_upload
+        from routes.chunk_batch import encode_frames
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", storage_mode)
+
+        response = self.upload(test_client, session_id, encode_frames([(2, b"c"), (0, b"aa"), (1, b"bbb")]))
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"chunk_index": 2, "status": "chunk_received", "size": 1},
+            {"chunk_index": 0, "status": "chunk_received", "size": 2},
+            {"chunk_index": 1, "status": "chunk_received", "size": 3},
+        ]
+        output = temp_upload_dir / session_id / "completed" / "batch.webm"
+        assert output.read_bytes() == b"aabbbc"
+
+    def test_known_chunks_are_skipped(self, test_client, session_id):
+        """Test that chunks the session has, or that repeat in the batch, are not rewritten."""
+        from routes.chunk_batch import encode_frames
+        self.upload(test_client, session_id, encode_frames([(0, b"aa")]), total_chunks=5)
+
+        response = self.upload(test_client, session_id, encode_frames([(0, b"XX"), (1, b"b"), (1, b"b")]), total_chunks=5)
+        statuses = [(r["chunk_index"], r["status"]) for r in response.json()["results"]]
+        assert statuses == [(0, "chunk_already_exists"), (1, "chunk_received"), (1, "chunk_already_exists")]
+        verify = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-2"}).json()
+        assert verify["chunks"] == {"0": 2, "1": 1}
+
+    def test_truncated_batch_keeps_stored_chunks(self, test_client, session_id):
+        """Test that records before a malformed one are committed and reported."""
+        from routes.chunk_batch import FRAME_HEADER, encode_frames
+        body = encode_frames([(0, b"aa")]) + FRAME_HEADER.pack(1, 100) + b"short"
+
+        response = self.upload(test_client, session_id, body)
+        assert response.status_code == 400
+        assert response.json()["status"] == "batch_incomplete"
+        assert response.json()["results"] == [{"chunk_index": 0, "status": "chunk_received", "size": 2}]
+        verify = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-1"}).json()
+        assert verify["chunks"] == {"0": 2}
+        assert verify["missing"] == [1]
+
+    @pytest.mark.parametrize("storage_mode", ["chunks", "direct"])
+    def test_disconnect_mid_batch_keeps_stored_chunks(self, test_client, session_id, temp_upload_dir,
+                                                      monkeypatch, storage_mode):
+        """Test that a client gone mid-record gets the committed prefix and a 400, not a 500."""
+        import asyncio
+        import routes.tus_upload
+        from app.server import app
+        from routes.chunk_batch import FRAME_HEADER, MEDIA_TYPE, encode_frames
+        monkeypatch.setattr(routes.tus_upload, "STORAGE_MODE", storage_mode)
+
+        messages = [
+            {"type": "http.request", "body": encode_frames([(0, b"aa")]) + FRAME_HEADER.pack(1, 100) + b"part",
+             "more_body": True},
+            {"type": "http.disconnect"},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": f"/upload/batch/{session_id}", "raw_path": f"/upload/batch/{session_id}".encode(),
+            "query_string": b"total_chunks=3", "root_path": "", "client": ("127.0.0.1", 1234),
+            "server": ("testserver", 80),
+            "headers": [(b"host", b"testserver"), (b"content-type", MEDIA_TYPE.encode())],
+        }
+        asyncio.run(app(scope, receive, send))
+
+        start = next(m for m in sent if m["type"] == "http.response.start")
+        assert start["status"] == 400
+        body = json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+        assert body["status"] == "batch_incomplete"
+        assert body["results"] == [{"chunk_index": 0, "status": "chunk_received", "size": 2}]
+        verify = test_client.get(f"/api/verify/{session_id}", params={"chunks": "0-1"}).json()
+        assert verify["chunks"] == {"0": 2}
+        assert verify["missing"] == [1]
+        assert not (temp_upload_dir / session_id / "chunks" / "chunk_1.bin").exists()
+
+    def test_oversized_record(self, test_client, session_id, monkeypatch):
+        """Test that a record over MAX_CHUNK_BODY_SIZE stops the batch with 413."""
+        import routes.tus_upload
+        from routes.chunk_batch import encode_frames
+        monkeypatch.setattr(routes.tus_upload, "MAX_CHUNK_BODY_SIZE", 4)
+
+        response = self.upload(test_client, session_id, encode_frames([(0, b"ok"), (1, b"too large")]))
+        assert response.status_code == 413
+        assert [r["chunk_index"] for r in response.json()["results"]] == [0]
+
+
+@pytest.mark.unit
+class TestAssemblyQueueRouting:
+    """Test that completed sessions go to the durable queue when enabled."""
+
+    def test_last_chunk_enqueues_assembly(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test that assembly is queued, not run in the request."""
+        import routes.tus_upload
+        queue = routes.tus_upload.AssemblyQueue(routes.tus_upload.run_assembly_job)
+        queue.open(temp_upload_dir / "queue.sqlite3")
+        monkeypatch.setattr(routes.tus_upload, "ASSEMBLY_QUEUE_ENABLED", True)
+        monkeypatch.setattr(routes.tus_upload, "assembly_queue", queue)
+
+        for index, data in enumerate([b"first-", b"second"]):
+            response = test_client.post(
+                "/upload/chunk",
+                data={"session_id": session_id, "chunk_index": str(index), "total_chunks": "2",
+                      "recording_name": "queued", "format": "webm"},
+                files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+            )
+            assert response.status_code == 200
+
+        output = temp_upload_dir / session_id / "completed" / "queued.webm"
+        assert not output.exists()
+        assert queue.job(session_id)["state"] == "queued"
+
+        assert queue.run_pending() == 1
+        assert output.read_bytes() == b"first-second"
+
+
+@pytest.mark.unit
+class TestIncrementalAssembly:
+    """Test that the in-order prefix is assembled while the upload runs."""
+
+    def test_finalize_copies_only_out_of_order_tail(self, test_client, session_id, temp_upload_dir, monkeypatch):
+        """Test the watermark advances with the prefix and finalize copies the rest."""
+        import json
+        import routes.tus_upload
+        monkeypatch.setattr(routes.tus_upload, "INCREMENTAL_ASSEMBLY", True)
+        partial = routes.tus_upload.get_partial_recording(session_id)
+
+        def upload(index, data):
+            response = test_client.post(
+                "/upload/chunk",
+                data={"session_id": session_id, "chunk_index": str(index), "total_chunks": "4",
+                      "recording_name": "incremental", "format": "webm"},
+                files={"file": ("chunk", io.BytesIO(data), "audio/webm")},
+            )
+            assert response.status_code == 200
+
+        upload(0, b"aa")
+        upload(2, b"c")
+        assert partial.watermark() == (1, 2)
+        upload(1, b"bbb")
+        assert partial.watermark() == (3, 6)
+        upload(3, b"dddd")
+
+        completed = temp_upload_dir / session_id / "completed"
+        assert (completed / "incremental.webm").read_bytes() == b"aabbbcdddd"
+        meta = json.loads((completed / "incremental.webm.meta.json").read_text())
+        assert meta["assembly"]["bytes"] == 4
+        assert not partial.dir.exists()